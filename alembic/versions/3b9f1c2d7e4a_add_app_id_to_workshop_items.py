@@ -0,0 +1,50 @@
+"""add app_id to workshop_items
+
+Revision ID: 3b9f1c2d7e4a
+Revises: 725eac1c59a7
+Create Date: 2026-10-19 10:12:41.318204
+
+"""
+
+from collections.abc import Sequence
+import os
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = "3b9f1c2d7e4a"
+down_revision: str | Sequence[str] | None = "725eac1c59a7"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "workshop_items",
+        sa.Column("app_id", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    )
+    op.create_index(op.f("ix_workshop_items_app_id"), "workshop_items", ["app_id"], unique=False)
+
+    # 迁移前只支持单个 App，已有数据归属于当时配置的 STEAM_WORKSHOP_SYNC_APP_ID
+    app_id = os.getenv("STEAM_WORKSHOP_SYNC_APP_ID", "").strip()
+    if app_id and "," not in app_id:
+        op.execute(
+            sa.text("UPDATE workshop_items SET app_id = :app_id WHERE app_id IS NULL").bindparams(app_id=app_id)
+        )
+
+    # 没有 app_id 的项目不会计入任何 App 的统计，也不会被按 App 查询到，不允许静默留下
+    missing = op.get_bind().execute(sa.text("SELECT COUNT(*) FROM workshop_items WHERE app_id IS NULL")).scalar()
+    if missing:
+        raise RuntimeError(
+            f"workshop_items 中有 {missing} 行无法确定 app_id："
+            "请将 STEAM_WORKSHOP_SYNC_APP_ID 设置为迁移前监控的单个 App ID 后重新执行迁移"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_workshop_items_app_id"), table_name="workshop_items")
+    op.drop_column("workshop_items", "app_id")
@@ -0,0 +1,43 @@
+"""create download_manifest
+
+Revision ID: 8d41e0a6c5f3
+Revises: 3b9f1c2d7e4a
+Create Date: 2026-10-19 11:02:17.904532
+
+"""
+
+from collections.abc import Sequence
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+# revision identifiers, used by Alembic.
+revision: str = "8d41e0a6c5f3"
+down_revision: str | Sequence[str] | None = "3b9f1c2d7e4a"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "download_manifest",
+        sa.Column("item_id", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("app_id", sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column("version", sa.DateTime(), nullable=True),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("checksums", sa.JSON(), nullable=True),
+        sa.Column("path", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("downloaded_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("item_id"),
+    )
+    op.create_index(op.f("ix_download_manifest_app_id"), "download_manifest", ["app_id"], unique=False)
+    op.create_index(op.f("ix_download_manifest_item_id"), "download_manifest", ["item_id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_download_manifest_item_id"), table_name="download_manifest")
+    op.drop_index(op.f("ix_download_manifest_app_id"), table_name="download_manifest")
+    op.drop_table("download_manifest")
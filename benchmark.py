@@ -0,0 +1,254 @@
+"""
+端到端吞吐基准测试
+
+在本地模拟的 Steam 创意工坊（spiders/mock_server.py）与一次性数据库上运行完整的同步循环，
+输出各阶段耗时、吞吐量与内存峰值（JSON），用于在不同提交之间比较优化效果：
+
+    python benchmark.py --items 3000 --cycles 2 --output bench.json
+    python benchmark.py --items 3000 --compare bench.json
+
+默认使用临时目录中的 SQLite；--database-url 可以指向一个空的 PostgreSQL 数据库（会在其中建表）。
+"""
+
+import argparse
+from collections.abc import Callable
+import functools
+import inspect
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from spiders.mock_server import MockSteamServer, MockWorkshop
+from utils.log import configure_logging, get_logger
+
+logger = get_logger(__name__)
+
+
+def current_rss() -> int | None:
+    """当前常驻内存（字节），不支持的平台返回 None"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss() -> int:
+    """进程的内存峰值（字节）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 的单位是字节，Linux 是 KB
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def git_commit() -> str | None:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip() or None
+
+
+class StageTimer:
+    """按阶段累计函数调用次数与耗时"""
+
+    def __init__(self) -> None:
+        self.calls: dict[str, int] = {}
+        self.seconds: dict[str, float] = {}
+
+    def timed(self, stage: str, func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.calls[stage] = self.calls.get(stage, 0) + 1
+                self.seconds[stage] = self.seconds.get(stage, 0.0) + time.perf_counter() - started
+
+        return wrapper
+
+    def wrap(self, owner, name: str, stage: str) -> None:
+        """替换 owner（类或模块）上的函数，静态方法保持为静态方法"""
+        original = inspect.getattr_static(owner, name)
+        if isinstance(original, staticmethod):
+            setattr(owner, name, staticmethod(self.timed(stage, original.__func__)))
+        else:
+            setattr(owner, name, self.timed(stage, original))
+
+    def report(self, total_seconds: float) -> dict:
+        return {
+            stage: {
+                "calls": self.calls[stage],
+                "seconds": round(self.seconds[stage], 4),
+                "mean_ms": round(self.seconds[stage] / self.calls[stage] * 1000, 3),
+                "share": round(self.seconds[stage] / total_seconds, 4) if total_seconds else 0.0,
+            }
+            for stage in sorted(self.calls)
+        }
+
+
+def configure_environment(args: argparse.Namespace, base_url: str, workdir: str) -> None:
+    """在导入 database 等模块之前设置环境变量"""
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'benchmark.db')}"
+    os.environ["STEAM_WORKSHOP_SYNC_DATABASE_URL"] = database_url
+    os.environ["STEAM_WORKSHOP_SYNC_BASE_URL"] = base_url
+    os.environ["STEAM_WORKSHOP_SYNC_REQUEST_DELAY"] = "0"
+    os.environ["STEAM_WORKSHOP_SYNC_HTTP_MODE"] = "live"
+    os.environ["STEAM_WORKSHOP_SYNC_DOWNLOAD_DIR"] = os.path.join(workdir, "downloads")
+    os.environ.pop("STEAM_WORKSHOP_SYNC_PROXIES", None)
+
+
+def run(args: argparse.Namespace) -> dict:
+    """
+    运行基准测试
+
+    Returns:
+        dict: 测试结果
+    """
+    workshop = MockWorkshop(items=args.items, page_size=args.page_size, app_id=args.app_id)
+    server = MockSteamServer(workshop, latency=args.latency, throttle_rate=args.throttle_rate, retry_after=0)
+
+    with tempfile.TemporaryDirectory(prefix="steam-workshop-bench-") as workdir, server:
+        configure_environment(args, server.url, workdir)
+
+        # 以下模块在导入时读取环境变量
+        import database
+        from parsers.workshop import WorkshopParser
+        from spiders.workshop import Wrokshop
+        import workers.app_crawler as app_crawler
+        from workers.fast_lane import KnownItems
+
+        database.init_db()
+
+        timer = StageTimer()
+        timer.wrap(Wrokshop, "_do_request", "request")
+        timer.wrap(WorkshopParser, "parser_items_card", "parse_listing")
+        timer.wrap(WorkshopParser, "parser_items_info", "parse_details")
+        timer.wrap(app_crawler, "sync_workshop_item", "db_upsert")
+
+        crawler = app_crawler.AppCrawler(
+            args.app_id,
+            KnownItems(),
+            page_delay=0,
+            cycle_delay=0,
+            update_feed_pages=args.update_feed_pages,
+        )
+
+        cycles = []
+        started = time.perf_counter()
+        for cycle in range(1, args.cycles + 1):
+            if cycle > 1 and args.churn:
+                workshop.publish(args.churn)
+            processed_before = crawler.stats.processed
+            pages_before = crawler.stats.pages
+            cycle_started = time.perf_counter()
+            for _ in crawler.crawl_cycle():
+                pass
+            cycles.append(
+                {
+                    "cycle": cycle,
+                    "seconds": round(time.perf_counter() - cycle_started, 4),
+                    "items": crawler.stats.processed - processed_before,
+                    "pages": crawler.stats.pages - pages_before,
+                    "rss_bytes": current_rss(),
+                }
+            )
+            logger.warning(f"⏱️  第 {cycle} 轮: {cycles[-1]['items']} 个项目，{cycles[-1]['seconds']:.2f}秒")
+        total_seconds = time.perf_counter() - started
+        crawler.workshop.transport.close()
+        database.engine.dispose()
+
+    items = crawler.stats.processed
+    stages = timer.report(total_seconds)
+    db_seconds = timer.seconds.get("db_upsert", 0.0)
+    return {
+        "label": args.label,
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "database": "sqlite" if not args.database_url else args.database_url.split(":", 1)[0],
+        "params": {
+            "items": args.items,
+            "page_size": args.page_size,
+            "cycles": args.cycles,
+            "churn": args.churn,
+            "latency": args.latency,
+            "throttle_rate": args.throttle_rate,
+            "update_feed_pages": args.update_feed_pages,
+        },
+        "totals": {
+            "seconds": round(total_seconds, 4),
+            "items": items,
+            "failed": crawler.stats.failed,
+            "pages": crawler.stats.pages,
+            "requests": server.stats.requests,
+            "throttled": server.stats.throttled,
+            "items_per_second": round(items / total_seconds, 2) if total_seconds else 0.0,
+            "requests_per_item": round(server.stats.requests / items, 3) if items else None,
+            "db_ms_per_item": round(db_seconds / items * 1000, 3) if items else None,
+        },
+        "stages": stages,
+        "cycles": cycles,
+        "peak_rss_bytes": peak_rss(),
+    }
+
+
+def compare(result: dict, baseline: dict) -> dict:
+    """与基准结果比较，返回各项指标的相对变化（正数表示变大）"""
+
+    def change(new, old):
+        return round((new - old) / old, 4) if new is not None and old else None
+
+    deltas = {
+        "items_per_second": change(result["totals"]["items_per_second"], baseline["totals"]["items_per_second"]),
+        "requests_per_item": change(result["totals"]["requests_per_item"], baseline["totals"]["requests_per_item"]),
+        "db_ms_per_item": change(result["totals"]["db_ms_per_item"], baseline["totals"]["db_ms_per_item"]),
+        "peak_rss_bytes": change(result["peak_rss_bytes"], baseline["peak_rss_bytes"]),
+    }
+    for stage, stats in result["stages"].items():
+        if stage in baseline["stages"]:
+            deltas[f"{stage}.mean_ms"] = change(stats["mean_ms"], baseline["stages"][stage]["mean_ms"])
+    return {"baseline": baseline.get("commit") or baseline.get("label"), "changes": deltas}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端吞吐基准测试（本地模拟服务 + 一次性数据库）")
+    parser.add_argument("--items", type=int, default=3000, help="模拟的 item 数量")
+    parser.add_argument("--pages", type=int, default=None, help="模拟的列表页数（优先于 --items）")
+    parser.add_argument("--page-size", type=int, default=30, help="每页条目数")
+    parser.add_argument("--cycles", type=int, default=1, help="同步轮数，第二轮起为更新已有项目")
+    parser.add_argument("--churn", type=int, default=0, help="每轮之间新发布的 item 数")
+    parser.add_argument("--latency", type=float, default=0.0, help="模拟服务每个请求的延迟（秒）")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="模拟服务返回 429 的比例（0-1）")
+    parser.add_argument("--update-feed-pages", type=int, default=0, help="每轮读取的更新流页数")
+    parser.add_argument("--app-id", default="294100")
+    parser.add_argument("--database-url", default=None, help="一次性数据库地址，默认使用临时 SQLite")
+    parser.add_argument("--label", default=None, help="结果的标签")
+    parser.add_argument("--output", default=None, help="结果写入的文件，默认输出到标准输出")
+    parser.add_argument("--compare", default=None, help="与之前的结果文件比较")
+    parser.add_argument("--log-level", default="WARNING", help="爬虫日志级别，默认只输出警告")
+    args = parser.parse_args()
+    if args.pages:
+        args.items = args.pages * args.page_size
+
+    configure_logging(level=args.log_level)
+    result = run(args)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            result["comparison"] = compare(result, json.load(f))
+
+    output = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        logger.warning(f"📊 结果已写入 {args.output}: {result['totals']['items_per_second']} 个/秒")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,10 @@ from datetime import datetime
 import os
 
 from dotenv import load_dotenv
+from models.download import DownloadRecord
 from models.workshop import WorkshopItem
-from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel import Session, SQLModel, create_engine, func, select
+from utils.formater import utcnow
 from utils.log import get_logger
 
 load_dotenv()
@@ -35,6 +37,21 @@ def save_workshop_item(item: WorkshopItem, exist_ok: bool = False) -> WorkshopIt
     Returns:
         WorkshopItem: 保存的数据库对象
     """
+    saved, _, _ = sync_workshop_item(item, exist_ok=exist_ok)
+    return saved
+
+
+def sync_workshop_item(item: WorkshopItem, exist_ok: bool = True) -> tuple[WorkshopItem, bool, bool]:
+    """
+    保存单个 WorkshopItem 到数据库，并返回该项目是否发生了变更
+
+    Args:
+        item: WorkshopItem 对象
+        exist_ok: 如果为 True，当记录已存在时会更新；如果为 False，当记录已存在时直接返回
+
+    Returns:
+        tuple: (保存的数据库对象, 是否为新增项目或 updated_at 发生了变化, 是否为新增项目)
+    """
 
     db = get_db()
 
@@ -44,25 +61,26 @@ def save_workshop_item(item: WorkshopItem, exist_ok: bool = False) -> WorkshopIt
 
         if existing:
             if not exist_ok:
-                return existing
+                return existing, False, False
 
+            changed = existing.updated_at != item.updated_at
             update_data = item.model_dump(exclude={"id", "synced_at"})
             for key, value in update_data.items():
                 setattr(existing, key, value)
-            existing.synced_at = datetime.utcnow()
+            existing.synced_at = utcnow()
 
             db.commit()
             db.refresh(existing)
-            logger.info(f"更新 WorkshopItem: {item.id} - {item.title}")
-            return existing
+            logger.info("更新 WorkshopItem: %s - %s", item.id, item.title)
+            return existing, changed, False
         else:
             # 创建新记录
-            item.synced_at = datetime.utcnow()
+            item.synced_at = utcnow()
             db.add(item)
             db.commit()
             db.refresh(item)
-            logger.info(f"保存新 WorkshopItem: {item.id} - {item.title}")
-            return item
+            logger.info("保存新 WorkshopItem: %s - %s", item.id, item.title)
+            return item, True, True
 
     except Exception as e:
         db.rollback()
@@ -114,6 +132,99 @@ def get_workshop_item(item_id: str) -> WorkshopItem | None:
         db.close()
 
 
+def get_workshop_item_ids() -> set[str]:
+    """
+    获取数据库中所有 WorkshopItem 的 ID
+
+    Returns:
+        set[str]: 已入库的项目 ID 集合
+    """
+    db = get_db()
+    try:
+        return set(db.exec(select(WorkshopItem.id)).all())
+    finally:
+        db.close()
+
+
+def count_workshop_items(app_id: str) -> int:
+    """
+    获取数据库中某个 App 的 WorkshopItem 数量
+
+    Args:
+        app_id: Steam Workshop APP ID
+
+    Returns:
+        int: 已入库的项目数
+    """
+    db = get_db()
+    try:
+        statement = select(func.count()).select_from(WorkshopItem).where(WorkshopItem.app_id == app_id)
+        return db.exec(statement).one()
+    finally:
+        db.close()
+
+
+def get_workshop_item_versions(item_ids: list[str]) -> dict[str, datetime | None]:
+    """
+    批量获取 WorkshopItem 的版本，即 updated_at，从未更新过的项目为 created_at
+
+    Args:
+        item_ids: Workshop Item ID 列表
+
+    Returns:
+        dict: {item_id: 版本}，数据库中不存在的项目不包含在结果中
+    """
+    db = get_db()
+    try:
+        version = func.coalesce(WorkshopItem.updated_at, WorkshopItem.created_at)
+        statement = select(WorkshopItem.id, version).where(WorkshopItem.id.in_(item_ids))
+        return dict(db.exec(statement).all())
+    finally:
+        db.close()
+
+
+def get_download_records(item_ids: list[str]) -> dict[str, DownloadRecord]:
+    """
+    批量获取下载清单记录
+
+    Args:
+        item_ids: Workshop Item ID 列表
+
+    Returns:
+        dict: {item_id: DownloadRecord}
+    """
+    db = get_db()
+    try:
+        statement = select(DownloadRecord).where(DownloadRecord.item_id.in_(item_ids))
+        return {record.item_id: record for record in db.exec(statement).all()}
+    finally:
+        db.close()
+
+
+def save_download_record(record: DownloadRecord) -> DownloadRecord:
+    """
+    保存下载清单记录，已存在时覆盖
+
+    Args:
+        record: DownloadRecord 对象
+
+    Returns:
+        DownloadRecord: 保存的数据库对象
+    """
+    db = get_db()
+    try:
+        saved = db.merge(record)
+        db.commit()
+        db.refresh(saved)
+        return saved
+    except Exception as e:
+        db.rollback()
+        logger.error(f"保存下载记录失败: {e}")
+        raise
+    finally:
+        db.close()
+
+
 def init_db():
     """初始化数据库表"""
 
@@ -0,0 +1,316 @@
+from datetime import UTC, datetime
+import hashlib
+import json
+import lzma
+import os
+from pathlib import Path
+import shutil
+import threading
+import time
+
+from downloader.finalize import swap_directory
+from downloader.store import ContentStore
+from downloader.usage import forget_used, last_used, mark_used
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+try:
+    # Python 3.14+
+    from compression import zstd as _zstd
+
+    def _zstd_compress(data: bytes, level: int) -> bytes:
+        return _zstd.compress(data, level=level)
+
+    def _zstd_decompress(data: bytes) -> bytes:
+        return _zstd.decompress(data)
+
+except ImportError:
+    try:
+        import zstandard as _zstd
+
+        def _zstd_compress(data: bytes, level: int) -> bytes:
+            return _zstd.ZstdCompressor(level=level).compress(data)
+
+        def _zstd_decompress(data: bytes) -> bytes:
+            return _zstd.ZstdDecompressor().decompress(data)
+
+    except ImportError:
+        _zstd = None
+
+CODEC_ZSTD = "zstd"
+CODEC_XZ = "xz"
+# 默认依赖中没有 zstandard，此时使用标准库的 xz：压缩率相近，但压缩明显更慢
+DEFAULT_CODEC = CODEC_ZSTD if _zstd is not None else CODEC_XZ
+
+# 大文件按块独立压缩，读取文件的一部分时只需解压对应的块
+CHUNK_SIZE = 4 * 1024 * 1024
+
+
+def compress(data: bytes, codec: str, level: int = 3) -> bytes:
+    """用指定的编码压缩一个块"""
+    if codec == CODEC_ZSTD:
+        if _zstd is None:
+            raise RuntimeError("未安装 zstd 支持（需要 Python 3.14+ 或 zstandard 包）")
+        return _zstd_compress(data, level)
+    if codec == CODEC_XZ:
+        return lzma.compress(data, preset=min(level, 9))
+    raise ValueError(f"未知的压缩编码: {codec}")
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    """解压一个块"""
+    if codec == CODEC_ZSTD:
+        if _zstd is None:
+            raise RuntimeError("未安装 zstd 支持（需要 Python 3.14+ 或 zstandard 包）")
+        return _zstd_decompress(data)
+    if codec == CODEC_XZ:
+        return lzma.decompress(data)
+    raise ValueError(f"未知的压缩编码: {codec}")
+
+
+class ColdArchive:
+    """
+    冷数据归档
+
+    很少被访问的 mod 被打包成 <item_id>.pack：每个文件按块独立压缩后顺序写入，
+    <item_id>.json 索引记录每个块的偏移与长度。读取单个文件只需 seek 到对应的块解压，
+    需要完整目录时再解包回下载目录（rehydrate）。
+    """
+
+    def __init__(
+        self,
+        archive_dir: str,
+        download_dir: str,
+        codec: str = DEFAULT_CODEC,
+        level: int = 3,
+        store: ContentStore | None = None,
+    ) -> None:
+        """
+        Args:
+            archive_dir: 归档目录
+            download_dir: mod 下载目录
+            codec: 压缩编码（zstd 或 xz）
+            level: 压缩级别
+            store: 内容寻址存储，归档后一并删除其中的版本
+        """
+        self.archive_dir = Path(archive_dir)
+        self.download_dir = Path(download_dir)
+        self.codec = codec
+        self.level = level
+        self.store = store
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        if codec == CODEC_XZ and _zstd is None:
+            logger.info(f"🗜️  冷数据归档使用 xz 压缩（安装 zstandard 或使用 Python 3.14+ 可改用更快的 zstd）: {archive_dir}")
+        else:
+            logger.info(f"🗜️  冷数据归档使用 {codec} 压缩: {archive_dir}")
+
+    def pack_path(self, item_id: str) -> Path:
+        return self.archive_dir / f"{item_id}.pack"
+
+    def index_path(self, item_id: str) -> Path:
+        return self.archive_dir / f"{item_id}.json"
+
+    def is_archived(self, item_id: str) -> bool:
+        return self.index_path(item_id).exists()
+
+    def load_index(self, item_id: str) -> dict:
+        """读取归档索引"""
+        with open(self.index_path(item_id), encoding="utf-8") as f:
+            return json.load(f)
+
+    def members(self, item_id: str) -> list[str]:
+        """归档中的文件列表（相对路径）"""
+        return list(self.load_index(item_id)["files"])
+
+    def archive(self, item_id: str) -> dict:
+        """
+        归档本地的 mod，并从下载目录中删除
+
+        Args:
+            item_id: Workshop item ID
+
+        Returns:
+            dict: 归档索引
+        """
+        source = self.download_dir / item_id
+        pack = self.pack_path(item_id)
+        temp_pack = pack.with_name(f".{pack.name}.tmp")
+
+        files = {}
+        original_size = 0
+        with open(temp_pack, "wb") as out:
+            for path in sorted(source.rglob("*")):
+                if not path.is_file():
+                    continue
+                digest = hashlib.sha256()
+                chunks = []
+                size = 0
+                with open(path, "rb") as f:
+                    while chunk := f.read(CHUNK_SIZE):
+                        digest.update(chunk)
+                        size += len(chunk)
+                        frame = compress(chunk, self.codec, self.level)
+                        chunks.append([out.tell(), len(frame), len(chunk)])
+                        out.write(frame)
+                files[path.relative_to(source).as_posix()] = {
+                    "size": size,
+                    "sha256": digest.hexdigest(),
+                    "mtime": path.stat().st_mtime,
+                    "chunks": chunks,
+                }
+                original_size += size
+            out.flush()
+            os.fsync(out.fileno())
+
+        index = {
+            "item_id": item_id,
+            "codec": self.codec,
+            "size": original_size,
+            "packed_size": temp_pack.stat().st_size,
+            "archived_at": datetime.now(UTC).isoformat(),
+            "files": files,
+        }
+        temp_index = self.index_path(item_id).with_name(f".{item_id}.json.tmp")
+        with open(temp_index, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False)
+
+        # 先替换数据文件再替换索引，索引存在即表示归档完整
+        os.replace(temp_pack, pack)
+        os.replace(temp_index, self.index_path(item_id))
+        self._remove_local(item_id)
+
+        ratio = index["packed_size"] / original_size if original_size else 1.0
+        logger.info(f"🧊 mod {item_id} 已归档: {original_size} -> {index['packed_size']} 字节 ({ratio:.0%})")
+        return index
+
+    def _remove_local(self, item_id: str) -> None:
+        path = self.download_dir / item_id
+        if path.is_symlink():
+            path.unlink()
+            if self.store is not None:
+                self.store.remove(item_id)
+        elif path.exists():
+            shutil.rmtree(path)
+        forget_used(self.download_dir, item_id)
+
+    def read_member(self, item_id: str, member: str) -> bytes:
+        """
+        读取归档中的单个文件，不解包整个 mod
+
+        Args:
+            item_id: Workshop item ID
+            member: 文件的相对路径（/ 分隔）
+
+        Returns:
+            bytes: 文件内容
+
+        Raises:
+            KeyError: 归档中没有该文件
+        """
+        index = self.load_index(item_id)
+        entry = index["files"][member]
+        data = bytearray()
+        with open(self.pack_path(item_id), "rb") as f:
+            for offset, length, _ in entry["chunks"]:
+                f.seek(offset)
+                data += decompress(f.read(length), index["codec"])
+        return bytes(data)
+
+    def rehydrate(self, item_id: str, keep_archive: bool = False) -> Path:
+        """
+        将归档的 mod 解包回下载目录，并校验每个文件的 sha256
+
+        Args:
+            item_id: Workshop item ID
+            keep_archive: 是否保留归档文件
+
+        Returns:
+            Path: 下载目录中的 mod 目录
+        """
+        index = self.load_index(item_id)
+        target = self.download_dir / item_id
+        staging = self.download_dir / f".{item_id}.rehydrate"
+        if staging.exists():
+            shutil.rmtree(staging)
+        staging.mkdir(parents=True)
+
+        try:
+            with open(self.pack_path(item_id), "rb") as pack:
+                for member, entry in index["files"].items():
+                    path = staging / member
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    digest = hashlib.sha256()
+                    with open(path, "wb") as out:
+                        for offset, length, _ in entry["chunks"]:
+                            pack.seek(offset)
+                            chunk = decompress(pack.read(length), index["codec"])
+                            digest.update(chunk)
+                            out.write(chunk)
+                    if digest.hexdigest() != entry["sha256"]:
+                        raise OSError(f"归档中的文件 {member} 校验失败")
+                    os.utime(path, (entry["mtime"], entry["mtime"]))
+            swap_directory(staging, target)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        if not keep_archive:
+            self.discard(item_id)
+        mark_used(self.download_dir, item_id)
+        logger.info(f"🔥 mod {item_id} 已从归档恢复")
+        return target
+
+    def ensure_local(self, item_id: str) -> Path | None:
+        """
+        获取 mod 的本地目录，已归档时透明地解包，并记录一次使用（用于 LRU 淘汰与空闲归档）
+
+        Returns:
+            Path | None: mod 目录，本地和归档中都没有时返回 None
+        """
+        path = self.download_dir / item_id
+        if path.is_dir():
+            mark_used(self.download_dir, item_id)
+            return path
+        with self._lock:
+            if path.is_dir():
+                mark_used(self.download_dir, item_id)
+                return path
+            if self.is_archived(item_id):
+                return self.rehydrate(item_id)
+        return None
+
+    def discard(self, item_id: str) -> None:
+        """删除 mod 的归档（例如重新下载了新版本）"""
+        self.index_path(item_id).unlink(missing_ok=True)
+        self.pack_path(item_id).unlink(missing_ok=True)
+
+    def archive_idle(self, idle_seconds: float, exclude: set[str] | None = None) -> list[str]:
+        """
+        归档超过 idle_seconds 未被访问的 mod
+
+        Args:
+            idle_seconds: 最近使用（见 downloader.usage.last_used）距今的秒数阈值
+            exclude: 不归档的 item IDs（例如置顶的 mod）
+
+        Returns:
+            list[str]: 归档的 item IDs
+        """
+        exclude = exclude or set()
+        cutoff = time.time() - idle_seconds
+        archived = []
+        if not self.download_dir.is_dir():
+            return archived
+
+        for path in sorted(self.download_dir.iterdir()):
+            if path.name.startswith(".") or path.name in exclude or not path.is_dir():
+                continue
+            if last_used(self.download_dir, path.name) > cutoff:
+                continue
+            try:
+                self.archive(path.name)
+                archived.append(path.name)
+            except OSError as e:
+                logger.error(f"归档 mod {path.name} 失败: {e}")
+        return archived
@@ -0,0 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+from pathlib import Path
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def file_checksum(path: str | Path) -> str:
+    """计算单个文件的 sha256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def compute_checksums(directory: str | Path, workers: int = 1) -> dict[str, str]:
+    """
+    计算目录下所有文件的 sha256
+
+    hashlib 在计算大块数据时会释放 GIL，多个线程可以同时读取并计算不同的文件。
+
+    Args:
+        directory: mod 目录
+        workers: 并发计算的线程数
+
+    Returns:
+        dict: {相对路径: sha256}，路径统一使用 / 分隔
+    """
+    directory = Path(directory)
+    files = [path for path in sorted(directory.rglob("*")) if path.is_file()]
+
+    if workers > 1 and len(files) > 1:
+        with ThreadPoolExecutor(max_workers=min(workers, len(files)), thread_name_prefix="checksum") as executor:
+            checksums = list(executor.map(file_checksum, files))
+    else:
+        checksums = [file_checksum(path) for path in files]
+
+    return {path.relative_to(directory).as_posix(): checksum for path, checksum in zip(files, checksums)}
+
+
+def directory_size(directory: str | Path) -> int:
+    """计算目录下所有文件的总字节数"""
+    return sum(entry.stat().st_size for entry in Path(directory).rglob("*") if entry.is_file())
@@ -0,0 +1,249 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
+import os
+from pathlib import Path
+import threading
+import time
+
+import requests
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+DETAILS_URL = "https://api.steampowered.com/ISteamRemoteStorage/GetPublishedFileDetails/v1/"
+
+_CHUNK_SIZE = 1024 * 1024
+# 网络读取的块大小，连接中断时最多丢失一个块的进度
+_STREAM_CHUNK_SIZE = 64 * 1024
+# 进度文件的最短保存间隔（秒）
+_SAVE_INTERVAL = 1.0
+
+
+def file_details_form(item_ids: list[str]) -> dict:
+    """构造 GetPublishedFileDetails 的 POST 表单"""
+    data = {"itemcount": len(item_ids)}
+    for index, item_id in enumerate(item_ids):
+        data[f"publishedfileids[{index}]"] = item_id
+    return data
+
+
+def parse_file_details(response: requests.Response) -> dict[str, dict]:
+    """
+    解析 GetPublishedFileDetails 的响应
+
+    Returns:
+        dict: {item_id: 接口返回的详情}，查询失败的 item 不在结果中
+    """
+    details = {}
+    for entry in response.json().get("response", {}).get("publishedfiledetails", []):
+        # result 为 1 表示成功
+        if entry.get("result") == 1:
+            details[str(entry["publishedfileid"])] = entry
+    return details
+
+
+class DownloadError(Exception):
+    """HTTP 直接下载失败"""
+
+
+class RangedDownloader:
+    """
+    基于 HTTP Range 的可续传下载器
+
+    数据先写入 <dest>.part，进度保存在 <dest>.part.json 中，中断后再次下载同一个 URL 时从断点继续。
+    服务器支持 Range 且文件较大时拆成多个分段并发下载。完成后校验大小（及 sha256）再重命名为目标文件。
+    """
+
+    def __init__(
+        self,
+        session: requests.Session | None = None,
+        segments: int = 4,
+        min_segment_size: int = 8 * 1024 * 1024,
+        timeout: float = 30,
+        max_retries: int = 3,
+    ) -> None:
+        """
+        Args:
+            session: requests 会话，默认新建
+            segments: 单个文件的最大并发分段数
+            min_segment_size: 每个分段的最小字节数，小文件不拆分
+            timeout: 请求超时（秒）
+            max_retries: 单个分段连接中断后的重试次数（从断点继续）
+        """
+        self.session = session or requests.Session()
+        self.segments = max(segments, 1)
+        self.min_segment_size = min_segment_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+
+    def probe(self, url: str) -> tuple[int | None, bool]:
+        """
+        查询文件大小以及服务器是否支持 Range
+
+        Returns:
+            tuple: (文件大小，未知时为 None, 是否支持 Range)
+        """
+        response = self.session.get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=self.timeout)
+        try:
+            response.raise_for_status()
+            if response.status_code == 206:
+                content_range = response.headers.get("Content-Range", "")
+                total = content_range.rpartition("/")[2]
+                return (int(total) if total.isdigit() else None), True
+            length = response.headers.get("Content-Length")
+            return (int(length) if length and length.isdigit() else None), False
+        finally:
+            response.close()
+
+    def plan_segments(self, size: int) -> list[list[int]]:
+        """将文件拆分为 [start, end, done] 分段（end 为闭区间）"""
+        count = max(min(self.segments, size // self.min_segment_size), 1)
+        step = -(-size // count)
+        return [[start, min(start + step, size) - 1, 0] for start in range(0, size, step)] or [[0, -1, 0]]
+
+    @staticmethod
+    def _load_state(state_path: Path, url: str, size: int | None) -> dict | None:
+        try:
+            with open(state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get("url") != url or state.get("size") != size:
+            return None
+        return state
+
+    @staticmethod
+    def _save_state(state_path: Path, state: dict) -> None:
+        temp = state_path.with_name(state_path.name + ".tmp")
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(temp, state_path)
+
+    def _fetch_segment(self, url: str, part: Path, segment: list[int], save) -> None:
+        start, end, _ = segment
+        attempts = 0
+        while start + segment[2] <= end:
+            offset = start + segment[2]
+            try:
+                response = self.session.get(
+                    url, headers={"Range": f"bytes={offset}-{end}"}, stream=True, timeout=self.timeout
+                )
+                with response:
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        raise DownloadError(f"服务器未按 Range 返回数据（{response.status_code}）")
+                    with open(part, "r+b") as f:
+                        f.seek(offset)
+                        for chunk in response.iter_content(_STREAM_CHUNK_SIZE):
+                            chunk = chunk[: end + 1 - (start + segment[2])]
+                            f.write(chunk)
+                            segment[2] += len(chunk)
+                            save()
+                            if start + segment[2] > end:
+                                break
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+                attempts += 1
+                if attempts > self.max_retries:
+                    raise
+                resume = start + segment[2]
+                logger.warning(f"分段 {start}-{end} 下载中断，从 {resume} 继续（{attempts}/{self.max_retries}）: {e}")
+                continue
+
+            if start + segment[2] <= end:
+                # 连接正常结束但数据不完整
+                attempts += 1
+                if attempts > self.max_retries:
+                    raise DownloadError(f"分段 {start}-{end} 数据不完整")
+
+    def _fetch_whole(self, url: str, part: Path) -> None:
+        response = self.session.get(url, stream=True, timeout=self.timeout)
+        with response:
+            response.raise_for_status()
+            with open(part, "wb") as f:
+                for chunk in response.iter_content(_STREAM_CHUNK_SIZE):
+                    f.write(chunk)
+
+    def download(
+        self,
+        url: str,
+        dest: str | Path,
+        expected_size: int | None = None,
+        expected_sha256: str | None = None,
+    ) -> str:
+        """
+        下载文件到 dest
+
+        Args:
+            url: 文件地址
+            dest: 目标路径
+            expected_size: 期望的文件大小（字节）
+            expected_sha256: 期望的 sha256
+
+        Returns:
+            str: 文件的 sha256
+
+        Raises:
+            DownloadError: 大小或校验和不匹配
+        """
+        dest = Path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        part = dest.with_name(dest.name + ".part")
+        state_path = dest.with_name(dest.name + ".part.json")
+
+        size, ranged = self.probe(url)
+        if expected_size is not None and size is not None and size != expected_size:
+            raise DownloadError(f"服务器返回的大小 {size} 与期望的 {expected_size} 不一致")
+
+        if ranged and size is not None:
+            state = self._load_state(state_path, url, size) if part.exists() else None
+            if state is None:
+                state = {"url": url, "size": size, "segments": self.plan_segments(size)}
+                with open(part, "wb") as f:
+                    f.truncate(size)
+            else:
+                done = sum(segment[2] for segment in state["segments"])
+                logger.info(f"从断点继续下载 {dest.name}: {done}/{size} 字节")
+
+            lock = threading.Lock()
+            last_saved = [0.0]
+
+            def save(force: bool = False) -> None:
+                # 进度只会落后于实际写入的数据，续传时最多重复下载一小段
+                with lock:
+                    now = time.monotonic()
+                    if force or now - last_saved[0] >= _SAVE_INTERVAL:
+                        self._save_state(state_path, state)
+                        last_saved[0] = now
+
+            save(force=True)
+            pending = [segment for segment in state["segments"] if segment[0] + segment[2] <= segment[1]]
+            if len(pending) > 1:
+                with ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix="http-segment") as executor:
+                    for future in [executor.submit(self._fetch_segment, url, part, s, save) for s in pending]:
+                        future.result()
+            elif pending:
+                self._fetch_segment(url, part, pending[0], save)
+        else:
+            # 不支持 Range 时只能整体重新下载
+            self._fetch_whole(url, part)
+
+        actual_size = part.stat().st_size
+        if expected_size is not None and actual_size != expected_size:
+            part.unlink(missing_ok=True)
+            state_path.unlink(missing_ok=True)
+            raise DownloadError(f"下载的文件大小 {actual_size} 与期望的 {expected_size} 不一致")
+
+        digest = hashlib.sha256()
+        with open(part, "rb") as f:
+            while chunk := f.read(_CHUNK_SIZE):
+                digest.update(chunk)
+        checksum = digest.hexdigest()
+        if expected_sha256 is not None and checksum != expected_sha256.lower():
+            part.unlink(missing_ok=True)
+            state_path.unlink(missing_ok=True)
+            raise DownloadError(f"sha256 校验失败: {checksum}")
+
+        os.replace(part, dest)
+        state_path.unlink(missing_ok=True)
+        return checksum
@@ -0,0 +1,112 @@
+import ctypes
+import ctypes.util
+import os
+from pathlib import Path
+import shutil
+import threading
+
+from downloader.checksum import compute_checksums
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# linux/fs.h
+_RENAME_EXCHANGE = 1 << 1
+_AT_FDCWD = -100
+
+_renameat2 = None
+if hasattr(os, "uname") and os.uname().sysname == "Linux":
+    try:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        _renameat2 = _libc.renameat2
+        _renameat2.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+        _renameat2.restype = ctypes.c_int
+    except (AttributeError, OSError, TypeError):
+        # glibc < 2.28 或非 glibc 环境
+        _renameat2 = None
+
+
+def exchange_paths(first: str | Path, second: str | Path) -> bool:
+    """
+    原子地交换两个路径（Linux renameat2 RENAME_EXCHANGE）
+
+    Returns:
+        bool: 是否交换成功；平台或文件系统不支持时返回 False
+    """
+    if _renameat2 is None:
+        return False
+
+    result = _renameat2(_AT_FDCWD, os.fsencode(first), _AT_FDCWD, os.fsencode(second), _RENAME_EXCHANGE)
+    if result != 0:
+        logger.debug(f"renameat2 交换失败: {os.strerror(ctypes.get_errno())}")
+        return False
+    return True
+
+
+def _remove(path: Path) -> None:
+    if path.is_symlink():
+        path.unlink()
+    else:
+        shutil.rmtree(path)
+
+
+def swap_directory(staging: Path, target: Path) -> None:
+    """
+    用 staging 目录替换 target 目录
+
+    target 不存在时直接重命名；存在时优先原子交换两者，读者看到的要么是旧目录、要么是新目录。
+    不支持交换时退化为两次重命名，中间只有极短的时间 target 不存在，但不会出现半写入的目录。
+    """
+    if not target.exists() and not target.is_symlink():
+        os.replace(staging, target)
+        return
+
+    if exchange_paths(staging, target):
+        # 交换后 staging 中是旧版本
+        _remove(staging)
+        return
+
+    retired = target.with_name(f".{target.name}.old.{threading.get_ident()}")
+    os.replace(target, retired)
+    os.replace(staging, target)
+    _remove(retired)
+
+
+def stage_download(source_dir: str | Path, target_dir: str | Path) -> Path:
+    """
+    将下载完成的 mod 移动到目标旁边的暂存目录
+
+    暂存目录与目标位于同一目录（同一文件系统），之后的替换只是重命名，不会复制文件。
+
+    Returns:
+        Path: 暂存目录
+    """
+    target_dir = Path(target_dir)
+    staging = target_dir.with_name(f".{target_dir.name}.staging.{threading.get_ident()}")
+    if staging.exists():
+        shutil.rmtree(staging)
+    shutil.move(str(source_dir), staging)
+    return staging
+
+
+def finalize_download(source_dir: str | Path, target_dir: str | Path, checksum_workers: int = 1) -> dict[str, str]:
+    """
+    完成下载：暂存、并发计算校验和，再原子替换目标目录
+
+    Args:
+        source_dir: Steam CMD 下载的 mod 目录
+        target_dir: 下载目录中的 mod 目录
+        checksum_workers: 并发计算校验和的线程数
+
+    Returns:
+        dict: {相对路径: sha256} 校验和清单
+    """
+    target_dir = Path(target_dir)
+    staging = stage_download(source_dir, target_dir)
+    try:
+        checksums = compute_checksums(staging, workers=checksum_workers)
+        swap_directory(staging, target_dir)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return checksums
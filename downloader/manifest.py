@@ -0,0 +1,94 @@
+import os
+
+from database import get_download_records, get_workshop_item_versions, save_download_record
+from downloader.archive import ColdArchive
+from downloader.checksum import compute_checksums, directory_size
+from models.download import DownloadRecord
+from utils.formater import utcnow
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class DownloadManifest:
+    """
+    下载清单
+
+    记录每个 mod 下载时对应的 Workshop 版本（updated_at，从未更新过的项目为 created_at）、大小和文件校验和，
+    用于跳过本地副本已经是最新版本的 mod。
+    """
+
+    def __init__(self, download_dir: str, archive: ColdArchive | None = None) -> None:
+        """
+        Args:
+            download_dir: mod 下载目录
+            archive: 冷数据归档，已归档的 mod 视为本地副本存在（使用前需通过 ColdArchive.ensure_local 恢复）
+        """
+        self.download_dir = download_dir
+        self.archive = archive
+
+    def has_local_copy(self, item_id: str) -> bool:
+        """下载目录或冷数据归档中是否有该 mod"""
+        if os.path.isdir(os.path.join(self.download_dir, item_id)):
+            return True
+        return self.archive is not None and self.archive.is_archived(item_id)
+
+    def stale_items(self, item_ids: list[str]) -> list[str]:
+        """
+        筛选需要下载的 mod
+
+        本地目录（或归档）存在、且清单中的版本不早于数据库中版本的 mod 会被跳过。
+        数据库中没有版本信息的 mod 一律视为需要下载。
+
+        Args:
+            item_ids: Workshop item IDs
+
+        Returns:
+            list[str]: 需要下载的 item IDs（保持原顺序）
+        """
+        records = get_download_records(item_ids)
+        versions = get_workshop_item_versions(item_ids)
+
+        stale = []
+        for item_id in item_ids:
+            record = records.get(item_id)
+            version = versions.get(item_id)
+            if (
+                record is not None
+                and record.version is not None
+                and version is not None
+                and record.version >= version
+                and self.has_local_copy(item_id)
+            ):
+                continue
+            stale.append(item_id)
+
+        return stale
+
+    def record(
+        self, item_id: str, app_id: str | None = None, checksums: dict[str, str] | None = None
+    ) -> DownloadRecord:
+        """
+        记录刚下载完成的 mod
+
+        Args:
+            item_id: Workshop item ID
+            app_id: Steam Workshop APP ID
+            checksums: 完成下载时已计算的校验和，为空时重新计算
+
+        Returns:
+            DownloadRecord: 保存的清单记录
+        """
+        path = os.path.join(self.download_dir, item_id)
+        version = get_workshop_item_versions([item_id]).get(item_id)
+
+        record = DownloadRecord(
+            item_id=item_id,
+            app_id=app_id,
+            version=version,
+            size=directory_size(path),
+            checksums=checksums if checksums is not None else compute_checksums(path),
+            path=path,
+            downloaded_at=utcnow(),
+        )
+        return save_download_record(record)
@@ -0,0 +1,118 @@
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from pathlib import Path
+import queue
+
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# download(item_ids, install_dir, throttle_kbps) -> {item_id: 是否成功}
+DownloadFunc = Callable[[list[str], str, int | None], dict[str, bool]]
+
+
+def worker_throttle(bandwidth_kbps: int, worker_bandwidth_kbps: int, workers: int = 1) -> int | None:
+    """
+    计算单个 SteamCMD 进程的限速
+
+    SteamCMD 的限速在进程启动时固定，之后启动的 worker 无法让已运行的 worker 降速，
+    因此总带宽按 worker 总数均分（而不是启动时的活跃数），保证同时运行时合计不超过上限，
+    再与单 worker 上限取较小值。
+
+    Args:
+        bandwidth_kbps: 所有 worker 的总带宽上限（KB/s），0 表示不限制
+        worker_bandwidth_kbps: 单个 worker 的带宽上限（KB/s），0 表示不限制
+        workers: 同时运行的 SteamCMD 进程数
+
+    Returns:
+        int | None: 限速（KB/s），None 表示不限速
+    """
+    limits = []
+    if worker_bandwidth_kbps > 0:
+        limits.append(worker_bandwidth_kbps)
+    if bandwidth_kbps > 0:
+        limits.append(max(bandwidth_kbps // workers, 1))
+    return min(limits) if limits else None
+
+
+class DownloadPool:
+    """
+    SteamCMD 并发下载池
+
+    同时运行多个 SteamCMD 进程，每个 worker 使用独立的 force_install_dir，
+    避免多个进程争用同一个安装目录的锁与临时文件。
+    """
+
+    def __init__(
+        self,
+        download: DownloadFunc,
+        install_root: str,
+        workers: int = 2,
+        bandwidth_kbps: int = 0,
+        worker_bandwidth_kbps: int = 0,
+    ) -> None:
+        """
+        Args:
+            download: 实际执行下载的函数，一次下载一批 mod，通常为 Wrokshop.download_mods_batch
+            install_root: worker 安装目录的根目录，每个 worker 使用其中的 worker-<n> 子目录
+            workers: 并发的 SteamCMD 进程数
+            bandwidth_kbps: 所有 worker 的总带宽上限（KB/s），0 表示不限制
+            worker_bandwidth_kbps: 单个 worker 的带宽上限（KB/s），0 表示不限制
+        """
+        if workers < 1:
+            raise ValueError("workers 必须大于等于 1")
+
+        self.download = download
+        self.workers = workers
+        self.bandwidth_kbps = bandwidth_kbps
+        self.worker_bandwidth_kbps = worker_bandwidth_kbps
+
+        self._install_dirs: queue.Queue[str] = queue.Queue()
+        for index in range(workers):
+            install_dir = Path(install_root) / f"worker-{index}"
+            install_dir.mkdir(parents=True, exist_ok=True)
+            self._install_dirs.put(str(install_dir.resolve()))
+
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="steamcmd")
+
+    def worker_throttle(self) -> int | None:
+        """单个 worker 的限速（KB/s），None 表示不限速"""
+        return worker_throttle(self.bandwidth_kbps, self.worker_bandwidth_kbps, self.workers)
+
+    def _run(self, item_ids: list[str]) -> dict[str, bool]:
+        # worker 数与安装目录数相同，这里不会阻塞
+        install_dir = self._install_dirs.get()
+        try:
+            return self.download(item_ids, install_dir, self.worker_throttle())
+        except Exception as e:
+            logger.error(f"mod {', '.join(item_ids)} 下载时发生异常: {e}")
+            return dict.fromkeys(item_ids, False)
+        finally:
+            self._install_dirs.put(install_dir)
+
+    def submit(self, item_ids: list[str]) -> Future:
+        """提交一批下载任务，由同一个 Steam CMD 会话执行"""
+        return self._executor.submit(self._run, item_ids)
+
+    def download_all(self, batches: Iterable[list[str]]) -> Iterator[tuple[str, bool]]:
+        """
+        并发下载多批 mod，按完成顺序逐个产出结果
+
+        Args:
+            batches: 每批 Workshop item IDs，单个 mod 下载时每批只有一个 ID
+
+        Yields:
+            tuple: (item_id, 是否成功)
+        """
+        futures = [self.submit(batch) for batch in batches]
+        for future in as_completed(futures):
+            yield from future.result().items()
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self) -> "DownloadPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
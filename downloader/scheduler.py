@@ -0,0 +1,335 @@
+from collections.abc import Callable
+import heapq
+import itertools
+from pathlib import Path
+import re
+import shutil
+import threading
+import time
+
+from downloader.archive import ColdArchive
+from downloader.checksum import directory_size
+from downloader.store import ContentStore
+from downloader.usage import forget_used, last_used, mark_used
+from models.workshop import WorkshopItem
+from pydantic import BaseModel
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# download(app_id, item_ids) -> {item_id: 是否成功}
+AppDownloadFunc = Callable[[str, list[str]], dict[str, bool]]
+
+PRIORITY_RATING = "rating"
+PRIORITY_SIZE = "size"
+
+
+class DownloadTask(BaseModel):
+    """下载队列中的一项，只保存排序与配额需要的字段，不持有数据库对象"""
+
+    item_id: str
+    app_id: str
+    rating: int = 0
+    size: int = 0
+    pinned: bool = False
+
+
+class DownloadScheduler:
+    """
+    同步驱动的下载队列
+
+    同步时 updated_at 发生变化的项目被加入优先队列，后台线程按优先级逐批下载：
+    置顶项目最先，其余按评分（高者优先）或大小（小者优先）排序。
+    设置了磁盘配额时，下载前按最近访问时间淘汰未置顶的 mod，腾出所需空间。
+    """
+
+    def __init__(
+        self,
+        download: AppDownloadFunc,
+        download_dir: str,
+        quota_bytes: int = 0,
+        pinned: set[str] | None = None,
+        priority: str = PRIORITY_RATING,
+        batch_size: int = 1,
+        store: ContentStore | None = None,
+        archive: ColdArchive | None = None,
+        archive_after: float = 0,
+    ) -> None:
+        """
+        Args:
+            download: 下载一个 App 下若干 mod 的函数
+            download_dir: mod 下载目录
+            quota_bytes: 下载目录的磁盘配额（字节），0 表示不限制
+            pinned: 置顶的 item IDs，优先下载且不会被淘汰
+            priority: 非置顶项目的排序方式，rating 或 size
+            batch_size: 每次下载的 mod 数量（同一 App）
+            store: 内容寻址存储，淘汰时一并删除其中的版本
+            archive: 冷数据归档，设置后被淘汰的 mod 会压缩归档而不是直接删除
+            archive_after: 空闲时归档超过该秒数未被访问的 mod，0 表示不主动归档
+        """
+        if priority not in (PRIORITY_RATING, PRIORITY_SIZE):
+            raise ValueError(f"未知的下载优先级: {priority}")
+
+        self.download = download
+        self.download_dir = Path(download_dir)
+        self.quota_bytes = quota_bytes
+        self.pinned = pinned or set()
+        self.priority = priority
+        self.batch_size = max(batch_size, 1)
+        self.store = store
+        self.archive = archive
+        self.archive_after = archive_after
+        self._last_archive_pass = 0.0
+
+        # 堆中的条目可能已被更新的任务取代，以 _tasks 中的版本为准（惰性删除）
+        self._heap: list[tuple[tuple, int, str]] = []
+        self._tasks: dict[str, tuple[int, DownloadTask]] = {}
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        # 本地 mod 的大小缓存 {item_id: bytes}，首次检查配额时扫描
+        self._sizes: dict[str, int] | None = None
+        self._downloading: set[str] = set()
+
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _sort_key(self, task: DownloadTask) -> tuple:
+        if self.priority == PRIORITY_SIZE:
+            return (not task.pinned, task.size)
+        return (not task.pinned, -task.rating)
+
+    def enqueue(self, item: WorkshopItem) -> None:
+        """将项目加入下载队列，重复加入时以最新信息为准"""
+        task = DownloadTask(
+            item_id=item.id,
+            app_id=item.app_id or "",
+            rating=item.rating or 0,
+            size=item.file_size or 0,
+            pinned=item.id in self.pinned,
+        )
+        if not task.app_id:
+            logger.warning(f"mod {item.id} 缺少 app_id，无法加入下载队列")
+            return
+
+        with self._condition:
+            seq = next(self._counter)
+            self._tasks[task.item_id] = (seq, task)
+            heapq.heappush(self._heap, (self._sort_key(task), seq, task.item_id))
+            self._condition.notify()
+
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._tasks)
+
+    def _pop(self) -> DownloadTask | None:
+        while self._heap:
+            _, seq, item_id = heapq.heappop(self._heap)
+            entry = self._tasks.get(item_id)
+            if entry is not None and entry[0] == seq:
+                del self._tasks[item_id]
+                return entry[1]
+        return None
+
+    def next_batch(self) -> list[DownloadTask]:
+        """取出优先级最高的一批任务，同一批中的 mod 属于同一个 App"""
+        with self._condition:
+            first = self._pop()
+            if first is None:
+                return []
+
+            batch = [first]
+            deferred = []
+            while len(batch) < self.batch_size:
+                task = self._pop()
+                if task is None:
+                    break
+                if task.app_id == first.app_id:
+                    batch.append(task)
+                else:
+                    deferred.append(task)
+
+            for task in deferred:
+                seq = next(self._counter)
+                self._tasks[task.item_id] = (seq, task)
+                heapq.heappush(self._heap, (self._sort_key(task), seq, task.item_id))
+            return batch
+
+    def _local_sizes(self) -> dict[str, int]:
+        if self._sizes is None:
+            self._sizes = {}
+            if self.download_dir.is_dir():
+                for path in self.download_dir.iterdir():
+                    if path.is_dir() and not path.name.startswith("."):
+                        self._sizes[path.name] = directory_size(path)
+        return self._sizes
+
+    def usage(self) -> int:
+        """下载目录中 mod 的总字节数"""
+        return sum(self._local_sizes().values())
+
+    def _last_used(self, item_id: str) -> float:
+        return last_used(self.download_dir, item_id)
+
+    def evict(self, item_id: str) -> None:
+        """从下载目录（及内容存储）中删除 mod，设置了归档时改为压缩归档"""
+        path = self.download_dir / item_id
+        if self.archive is not None:
+            self.archive.archive(item_id)
+        elif path.is_symlink():
+            path.unlink()
+            if self.store is not None:
+                self.store.remove(item_id)
+        elif path.exists():
+            shutil.rmtree(path)
+        forget_used(self.download_dir, item_id)
+        self._local_sizes().pop(item_id, None)
+
+    def ensure_space(self, needed: int) -> bool:
+        """
+        按最近使用时间淘汰未置顶的 mod，直到能放下 needed 字节
+
+        Args:
+            needed: 即将下载的字节数
+
+        Returns:
+            bool: 是否有足够的空间
+        """
+        if self.quota_bytes <= 0:
+            return True
+
+        sizes = self._local_sizes()
+        candidates = sorted(
+            (item_id for item_id in sizes if item_id not in self.pinned and item_id not in self._downloading),
+            key=self._last_used,
+        )
+        evicted = 0
+        for item_id in candidates:
+            if self.usage() + needed <= self.quota_bytes:
+                break
+            logger.info(f"🗑️  磁盘配额不足，淘汰最久未使用的 mod {item_id}（{sizes[item_id]} 字节）")
+            self.evict(item_id)
+            evicted += 1
+
+        if evicted and self.store is not None:
+            self.store.gc()
+
+        return self.usage() + needed <= self.quota_bytes
+
+    def run_batch(self, batch: list[DownloadTask]) -> dict[str, bool]:
+        """腾出空间后下载一批 mod，并更新本地大小缓存"""
+        item_ids = [task.item_id for task in batch]
+        # 重新下载的 mod 会替换旧版本，旧版本占用的空间不计入，也不参与淘汰
+        self._downloading.update(item_ids)
+        try:
+            needed = sum(task.size - self._local_sizes().get(task.item_id, 0) for task in batch)
+            if not self.ensure_space(max(needed, 0)):
+                logger.warning(f"磁盘配额不足，跳过下载: {', '.join(item_ids)}")
+                return dict.fromkeys(item_ids, False)
+            results = self.download(batch[0].app_id, item_ids)
+        finally:
+            self._downloading.difference_update(item_ids)
+
+        for item_id, success in results.items():
+            path = self.download_dir / item_id
+            if success and path.is_dir():
+                self._local_sizes()[item_id] = directory_size(path)
+                mark_used(self.download_dir, item_id)
+        return results
+
+    def archive_idle(self) -> list[str]:
+        """归档长时间未被访问的 mod（置顶与正在下载的除外）"""
+        self._last_archive_pass = time.monotonic()
+        if self.archive is None or self.archive_after <= 0:
+            return []
+
+        archived = self.archive.archive_idle(self.archive_after, exclude=self.pinned | self._downloading)
+        for item_id in archived:
+            self._local_sizes().pop(item_id, None)
+        if archived and self.store is not None:
+            self.store.gc()
+        return archived
+
+    def _worker(self) -> None:
+        # 队列空闲时每小时检查一次需要归档的 mod
+        archive_interval = 3600.0 if self.archive is not None and self.archive_after > 0 else None
+        while not self._stop.is_set():
+            with self._condition:
+                while not self._heap and not self._stop.is_set():
+                    if archive_interval and time.monotonic() - self._last_archive_pass >= archive_interval:
+                        break
+                    self._condition.wait(archive_interval)
+            if self._stop.is_set():
+                break
+
+            if not self._heap:
+                try:
+                    self.archive_idle()
+                except Exception as e:
+                    logger.error(f"归档空闲 mod 失败: {e}")
+                continue
+
+            batch = self.next_batch()
+            if not batch:
+                continue
+            try:
+                self.run_batch(batch)
+            except Exception as e:
+                logger.error(f"自动下载 {', '.join(task.item_id for task in batch)} 失败: {e}")
+
+    def start(self) -> None:
+        """启动后台下载线程"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._worker, name="download-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"📥 自动下载已启动，当前占用 {self.usage()} 字节，配额 {self.quota_bytes or '不限'}")
+
+    def stop(self, timeout: float | None = None) -> None:
+        """停止后台下载线程（正在进行的下载会先完成）"""
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+def parse_pinned(value: str) -> set[str]:
+    """解析逗号分隔的置顶 item IDs"""
+    return {item_id.strip() for item_id in value.split(",") if item_id.strip()}
+
+
+# 配额单位，KB 与 KiB 同为 1024 进制（与 Steam 页面显示的大小一致）
+QUOTA_UNITS = {
+    "B": 1,
+    "KB": 1024,
+    "MB": 1024**2,
+    "GB": 1024**3,
+    "TB": 1024**4,
+    "KIB": 1024,
+    "MIB": 1024**2,
+    "GIB": 1024**3,
+    "TIB": 1024**4,
+}
+
+
+def parse_quota(value: str) -> int:
+    """
+    解析磁盘配额，例如 "500 GB"、"1.5TB"、"800GiB"、"0"
+
+    Args:
+        value: 数值加单位（B、KB、MB、GB、TB 或 KiB、MiB、GiB、TiB），纯数字按字节计
+
+    Returns:
+        int: 字节数
+
+    Raises:
+        ValueError: 无法解析或单位未知
+    """
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([a-zA-Z]*)\s*", value or "")
+    if match is None:
+        raise ValueError(f"无法解析的磁盘配额: {value!r}")
+    number, unit = match.groups()
+    multiplier = QUOTA_UNITS.get(unit.upper() or "B")
+    if multiplier is None:
+        raise ValueError(f"未知的磁盘配额单位: {unit!r}")
+    return int(float(number) * multiplier)
@@ -0,0 +1,351 @@
+from collections import deque
+from collections.abc import Callable
+import os
+import queue
+import re
+import signal
+import subprocess
+import threading
+import time
+
+from pydantic import BaseModel
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# Success. Downloaded item 123456 to "/path/steamapps/workshop/content/647960/123456" (1234 bytes)
+_SUCCESS_PATTERN = re.compile(r'Success\. Downloaded item (\d+) to "([^"]*)"(?: \((\d+) bytes\))?')
+# ERROR! Download item 123456 failed (Failure).
+_FAILURE_PATTERN = re.compile(r"ERROR! Download item (\d+) failed \(([^)]*)\)")
+# Downloading item 123456 ...
+_START_PATTERN = re.compile(r"Downloading item (\d+)")
+# Update state (0x61) downloading, progress: 45.23 (12345 / 27345)
+_PROGRESS_PATTERN = re.compile(r"state \(0x[0-9a-fA-F]+\) ([\w ]+?), progress: ([\d.]+) \((\d+) / (\d+)\)")
+# FAILED login with result code Invalid Password / Login Failure: Invalid Password
+_LOGIN_FAILURE_PATTERN = re.compile(r"FAILED (?:login|\(.*Password.*\))|Login Failure", re.IGNORECASE)
+_DISK_FULL_PATTERN = re.compile(r"Disk write failure|not enough disk space|No space left on device", re.IGNORECASE)
+
+# 下载失败的分类
+FAILURE_TIMEOUT = "timeout"
+FAILURE_STALLED = "stalled"
+FAILURE_LOGIN = "login_failed"
+FAILURE_ACCESS_DENIED = "access_denied"
+FAILURE_NOT_FOUND = "not_found"
+FAILURE_NO_CONNECTION = "no_connection"
+FAILURE_DISK_FULL = "disk_full"
+FAILURE_MISSING = "missing"
+FAILURE_UNKNOWN = "unknown"
+
+# SteamCMD 失败原因文本（小写）到分类的映射
+_FAILURE_REASONS = {
+    "timeout": FAILURE_TIMEOUT,
+    "file not found": FAILURE_NOT_FOUND,
+    "no match": FAILURE_NOT_FOUND,
+    "access denied": FAILURE_ACCESS_DENIED,
+    "no connection": FAILURE_NO_CONNECTION,
+    "service unavailable": FAILURE_NO_CONNECTION,
+    "disk write failure": FAILURE_DISK_FULL,
+    "disk full": FAILURE_DISK_FULL,
+}
+
+
+def build_command(
+    steamcmd_path: str,
+    install_dir: str,
+    appid: str,
+    item_ids: list[str],
+    username: str = "anonymous",
+    password: str = "",
+    guard_code: str = "",
+    validate: bool = True,
+    throttle_kbps: int | None = None,
+) -> list[str]:
+    """
+    构建 Steam CMD 命令，一次会话中下载多个 Workshop item
+
+    Steam CMD 每次启动都要自检更新并登录，把多个 +workshop_download_item 放进同一次调用，
+    这部分固定开销只需支付一次。
+
+    Args:
+        steamcmd_path: Steam CMD 可执行文件路径
+        install_dir: force_install_dir
+        appid: Steam Workshop APP ID
+        item_ids: Workshop item IDs
+        username: Steam 用户名
+        password: Steam 密码（匿名登录时为空）
+        guard_code: Steam Guard 验证码
+        validate: 是否校验已下载的文件
+        throttle_kbps: 下载限速（KB/s），None 表示不限速
+
+    Returns:
+        list[str]: 命令参数列表
+    """
+    cmd = [steamcmd_path, "+force_install_dir", install_dir]
+
+    if throttle_kbps:
+        cmd.extend(["+set_download_throttle", str(throttle_kbps)])
+
+    cmd.extend(["+login", username])
+
+    # 如果有密码，添加密码
+    if password:
+        cmd.append(password)
+        # 如果有 Steam Guard 代码，添加代码
+        if guard_code:
+            cmd.append(guard_code)
+
+    for item_id in item_ids:
+        cmd.extend(["+workshop_download_item", appid, item_id])
+        if validate:
+            cmd.append("validate")
+
+    cmd.append("+quit")
+    return cmd
+
+
+def classify_failure(reason: str) -> str:
+    """
+    将 SteamCMD 的失败原因文本归类
+
+    Args:
+        reason: 括号中的失败原因，例如 "Timeout"、"File Not Found"
+
+    Returns:
+        str: FAILURE_* 分类，无法识别时为 FAILURE_UNKNOWN
+    """
+    reason = reason.strip().lower()
+    for text, failure in _FAILURE_REASONS.items():
+        if text in reason:
+            return failure
+    return FAILURE_UNKNOWN
+
+
+class SteamCMDEvent(BaseModel):
+    """SteamCMD 输出中解析出的一条结构化事件"""
+
+    # downloading / progress / success / failed / error
+    state: str
+    item_id: str | None = None
+    bytes_done: int | None = None
+    bytes_total: int | None = None
+    percent: float | None = None
+    # 失败分类（FAILURE_*）
+    failure: str | None = None
+    line: str = ""
+
+
+def parse_line(line: str) -> SteamCMDEvent | None:
+    """
+    解析 SteamCMD 的一行输出
+
+    Args:
+        line: 单行输出
+
+    Returns:
+        SteamCMDEvent | None: 与下载相关的事件，无关的行返回 None
+    """
+    line = line.strip()
+    if not line:
+        return None
+
+    if match := _SUCCESS_PATTERN.search(line):
+        size = int(match.group(3)) if match.group(3) else None
+        return SteamCMDEvent(
+            state="success", item_id=match.group(1), bytes_done=size, bytes_total=size, percent=100.0, line=line
+        )
+    if match := _FAILURE_PATTERN.search(line):
+        failure = classify_failure(match.group(2))
+        return SteamCMDEvent(state="failed", item_id=match.group(1), failure=failure, line=line)
+    if match := _PROGRESS_PATTERN.search(line):
+        return SteamCMDEvent(
+            state="progress",
+            percent=float(match.group(2)),
+            bytes_done=int(match.group(3)),
+            bytes_total=int(match.group(4)),
+            line=line,
+        )
+    if match := _START_PATTERN.search(line):
+        return SteamCMDEvent(state="downloading", item_id=match.group(1), line=line)
+    if _LOGIN_FAILURE_PATTERN.search(line):
+        return SteamCMDEvent(state="error", failure=FAILURE_LOGIN, line=line)
+    if _DISK_FULL_PATTERN.search(line):
+        return SteamCMDEvent(state="error", failure=FAILURE_DISK_FULL, line=line)
+    return None
+
+
+class SteamCMDResult(BaseModel):
+    """一次 SteamCMD 会话的结果"""
+
+    results: dict[str, bool]
+    # 失败 item 的分类 {item_id: FAILURE_*}
+    failures: dict[str, str] = {}
+    returncode: int | None = None
+    # 进程被终止的原因（FAILURE_STALLED / FAILURE_TIMEOUT），正常退出时为 None
+    killed: str | None = None
+    # 最后若干行输出，便于排查失败
+    tail: list[str] = []
+
+
+class SteamCMDRunner:
+    """
+    流式运行 SteamCMD
+
+    逐行读取输出并解析为事件，不在内存中缓存完整输出。超过 stall_timeout 秒没有任何进展
+    （新的输出行，或 activity_probe 返回的值发生变化）时终止进程，不必等到总超时。
+    """
+
+    def __init__(
+        self,
+        stall_timeout: float = 300.0,
+        timeout: float | None = None,
+        on_event: Callable[[SteamCMDEvent], None] | None = None,
+        activity_probe: Callable[[], int] | None = None,
+        probe_interval: float = 5.0,
+        tail_lines: int = 50,
+    ) -> None:
+        """
+        Args:
+            stall_timeout: 无进展超时（秒），0 表示不检测
+            timeout: 总超时（秒），None 表示不限制
+            on_event: 每解析出一个事件时调用
+            activity_probe: 返回当前下载进度的函数（例如临时目录大小），值变化即视为有进展；
+                SteamCMD 下载 Workshop item 时经常长时间不输出，需要靠它区分慢速下载与卡死
+            probe_interval: 调用 activity_probe 的间隔（秒）
+            tail_lines: 保留的末尾输出行数
+        """
+        self.stall_timeout = stall_timeout
+        self.timeout = timeout
+        self.on_event = on_event
+        self.activity_probe = activity_probe
+        self.probe_interval = probe_interval
+        self.tail_lines = tail_lines
+
+    @staticmethod
+    def _read_lines(stream, lines: queue.Queue) -> None:
+        for line in iter(stream.readline, ""):
+            lines.put(line)
+        stream.close()
+        lines.put(None)
+
+    def _probe(self) -> int | None:
+        try:
+            return self.activity_probe()
+        except Exception as e:
+            logger.debug(f"下载进度探测失败: {e}")
+            return None
+
+    @staticmethod
+    def _kill(process: subprocess.Popen) -> None:
+        try:
+            if os.name == "posix":
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except (ProcessLookupError, PermissionError):
+            process.kill()
+
+    def _emit(self, event: SteamCMDEvent) -> None:
+        if self.on_event is None:
+            return
+        try:
+            self.on_event(event)
+        except Exception as e:
+            logger.error(f"处理 Steam CMD 事件失败: {e}")
+
+    def run(self, cmd: list[str], item_ids: list[str]) -> SteamCMDResult:
+        """
+        运行 SteamCMD 并等待结束
+
+        Args:
+            cmd: 命令参数列表，通常由 build_command 构建
+            item_ids: 本次下载的 Workshop item IDs
+
+        Returns:
+            SteamCMDResult: 每个 item 的结果与失败分类
+
+        Raises:
+            FileNotFoundError: 找不到 SteamCMD 可执行文件
+        """
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            stdin=subprocess.DEVNULL,
+            text=True,
+            errors="replace",
+            bufsize=1,
+            # steamcmd.sh 会再启动真正的 steamcmd 进程，放到独立进程组中以便一并终止
+            start_new_session=os.name == "posix",
+        )
+        lines: queue.Queue[str | None] = queue.Queue()
+        reader = threading.Thread(target=self._read_lines, args=(process.stdout, lines), daemon=True)
+        reader.start()
+
+        results = dict.fromkeys(item_ids, False)
+        failures: dict[str, str] = {}
+        session_failure = None
+        tail: deque[str] = deque(maxlen=self.tail_lines)
+        current_item = None
+        killed = None
+
+        started = time.monotonic()
+        last_activity = started
+        last_probe = started
+        probe_value = self._probe() if self.activity_probe else None
+
+        while True:
+            try:
+                line = lines.get(timeout=min(self.probe_interval, 1.0))
+            except queue.Empty:
+                line = ""
+            if line is None:
+                break
+
+            now = time.monotonic()
+            if line:
+                last_activity = now
+                tail.append(line.rstrip())
+                event = parse_line(line)
+                if event is not None:
+                    if event.state == "downloading":
+                        current_item = event.item_id
+                    elif event.item_id is None:
+                        event.item_id = current_item
+
+                    if event.state == "success" and event.item_id in results:
+                        results[event.item_id] = True
+                        failures.pop(event.item_id, None)
+                    elif event.state == "failed" and event.item_id in results:
+                        results[event.item_id] = False
+                        failures[event.item_id] = event.failure
+                    elif event.state == "error":
+                        session_failure = event.failure
+                    self._emit(event)
+
+            if self.activity_probe and now - last_probe >= self.probe_interval:
+                last_probe = now
+                value = self._probe()
+                if value is not None and value != probe_value:
+                    probe_value = value
+                    last_activity = now
+
+            if self.stall_timeout and now - last_activity > self.stall_timeout:
+                killed = FAILURE_STALLED
+            elif self.timeout and now - started > self.timeout:
+                killed = FAILURE_TIMEOUT
+            if killed:
+                logger.warning(f"Steam CMD {'无进展超时' if killed == FAILURE_STALLED else '超时'}，终止进程")
+                self._kill(process)
+                break
+
+        returncode = process.wait()
+        reader.join(timeout=5)
+
+        # 没有明确结果的 item：按会话级错误或终止原因归类
+        for item_id, success in results.items():
+            if not success and item_id not in failures:
+                failures[item_id] = killed or session_failure or FAILURE_MISSING
+
+        return SteamCMDResult(
+            results=results, failures=failures, returncode=returncode, killed=killed, tail=list(tail)
+        )
@@ -0,0 +1,194 @@
+import errno
+import hashlib
+import os
+from pathlib import Path
+import shutil
+import stat
+import threading
+import time
+
+from downloader.checksum import compute_checksums
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class ContentStore:
+    """
+    按内容寻址的 mod 存储
+
+    文件按 sha256 保存在 blobs/ 下，每个 mod 版本在 versions/<item_id>/<version>/ 下以硬链接
+    组成完整目录树。不同 mod、同一 mod 的不同版本之间相同的文件只占一份空间。
+    下载目录中的 <item_id> 是指向当前版本的符号链接，切换版本只需原子替换这个链接。
+
+    blob 是所有版本共享的 inode，因此会被设为只读，消费方不应原地修改 mod 文件。
+    """
+
+    def __init__(self, root: str, keep_versions: int = 2) -> None:
+        """
+        Args:
+            root: 存储根目录
+            keep_versions: 每个 mod 保留的版本数（含当前版本）
+        """
+        self.root = Path(root).resolve()
+        self.keep_versions = max(keep_versions, 1)
+        self.blobs_dir = self.root / "blobs"
+        self.versions_dir = self.root / "versions"
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        self.versions_dir.mkdir(parents=True, exist_ok=True)
+        # 入库与垃圾回收互斥，避免回收掉刚写入、尚未链接的 blob
+        self._lock = threading.Lock()
+
+    def blob_path(self, digest: str) -> Path:
+        """sha256 对应的 blob 路径（按前两位分目录）"""
+        return self.blobs_dir / digest[:2] / digest
+
+    @staticmethod
+    def version_id(checksums: dict[str, str]) -> str:
+        """由文件清单计算版本 ID，内容相同的版本得到相同的 ID"""
+        digest = hashlib.sha256()
+        for path, checksum in sorted(checksums.items()):
+            digest.update(f"{path}\0{checksum}\n".encode())
+        return digest.hexdigest()[:16]
+
+    def _store_blob(self, source: Path, digest: str) -> Path:
+        blob = self.blob_path(digest)
+        if blob.exists():
+            source.unlink()
+            return blob
+
+        blob.parent.mkdir(exist_ok=True)
+        try:
+            os.replace(source, blob)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # 跨文件系统时先复制到同目录的临时文件，再原子重命名
+            temp = blob.with_name(f".{digest}.{threading.get_ident()}.tmp")
+            shutil.copy2(source, temp)
+            os.replace(temp, blob)
+            source.unlink()
+
+        blob.chmod(stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        return blob
+
+    @staticmethod
+    def _link(blob: Path, target: Path) -> None:
+        try:
+            os.link(blob, target)
+        except OSError as e:
+            # 文件系统不支持硬链接或达到链接数上限时退化为复制
+            if e.errno not in (errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EXDEV):
+                raise
+            shutil.copy2(blob, target)
+
+    def ingest(self, item_id: str, source_dir: str | Path, checksums: dict[str, str] | None = None) -> Path:
+        """
+        将下载完成的 mod 目录存入仓库
+
+        源目录中的文件会被移动进 blobs/（已存在的 blob 直接丢弃源文件），完成后源目录被删除。
+
+        Args:
+            item_id: Workshop item ID
+            source_dir: Steam CMD 下载的 mod 目录
+            checksums: 已计算好的 {相对路径: sha256}，为空时在这里计算
+
+        Returns:
+            Path: 版本目录
+        """
+        source_dir = Path(source_dir)
+        if checksums is None:
+            # 哈希计算放在锁外
+            checksums = compute_checksums(source_dir)
+
+        version_dir = self.versions_dir / item_id / self.version_id(checksums)
+        with self._lock:
+            if not version_dir.exists():
+                staging = version_dir.with_name(f".{version_dir.name}.staging")
+                if staging.exists():
+                    shutil.rmtree(staging)
+                for relative, digest in checksums.items():
+                    target = staging / relative
+                    target.parent.mkdir(parents=True, exist_ok=True)
+                    self._link(self._store_blob(source_dir / relative, digest), target)
+                staging.mkdir(parents=True, exist_ok=True)
+                os.replace(staging, version_dir)
+            else:
+                logger.info(f"mod {item_id} 的内容与已有版本 {version_dir.name} 相同")
+
+        shutil.rmtree(source_dir, ignore_errors=True)
+        # 用 mtime 记录版本最近一次被使用的时间
+        os.utime(version_dir)
+        return version_dir
+
+    @staticmethod
+    def activate(version_dir: Path, link_path: str | Path) -> None:
+        """
+        原子地将 link_path 指向 version_dir
+
+        先创建临时符号链接再用 rename 覆盖，读者看到的要么是旧版本，要么是新版本。
+        """
+        link_path = Path(link_path)
+        if link_path.exists() and not link_path.is_symlink():
+            # 迁移前的普通目录
+            shutil.rmtree(link_path)
+
+        temp = link_path.with_name(f".{link_path.name}.{threading.get_ident()}.link")
+        if temp.is_symlink():
+            temp.unlink()
+        temp.symlink_to(version_dir, target_is_directory=True)
+        os.replace(temp, link_path)
+
+    def versions(self, item_id: str) -> list[Path]:
+        """mod 的所有版本目录，最近使用的在前"""
+        item_dir = self.versions_dir / item_id
+        if not item_dir.is_dir():
+            return []
+        versions = [path for path in item_dir.iterdir() if path.is_dir() and not path.name.startswith(".")]
+        return sorted(versions, key=lambda path: path.stat().st_mtime, reverse=True)
+
+    def prune(self, item_id: str, current: Path | None = None) -> int:
+        """
+        删除超出保留数量的旧版本，blob 留给 gc() 回收
+
+        Args:
+            item_id: Workshop item ID
+            current: 当前版本目录，无论新旧都不会被删除
+
+        Returns:
+            int: 删除的版本数
+        """
+        removed = 0
+        for version_dir in self.versions(item_id)[self.keep_versions :]:
+            if current is not None and version_dir == current:
+                continue
+            shutil.rmtree(version_dir)
+            removed += 1
+        return removed
+
+    def remove(self, item_id: str) -> None:
+        """删除 mod 的所有版本，blob 留给 gc() 回收"""
+        shutil.rmtree(self.versions_dir / item_id, ignore_errors=True)
+
+    def gc(self) -> tuple[int, int]:
+        """
+        回收不再被任何版本引用的 blob（链接数为 1）
+
+        Returns:
+            tuple: (回收的 blob 数, 释放的字节数)
+        """
+        count = 0
+        freed = 0
+        started = time.monotonic()
+        with self._lock:
+            for blob in self.blobs_dir.glob("*/*"):
+                info = blob.stat()
+                if info.st_nlink > 1:
+                    continue
+                blob.unlink()
+                count += 1
+                freed += info.st_size
+
+        if count:
+            logger.info(f"回收 {count} 个 blob，释放 {freed} 字节，耗时 {time.monotonic() - started:.2f}秒")
+        return count, freed
@@ -0,0 +1,65 @@
+import os
+from pathlib import Path
+
+# 记录 mod 最近使用时间的目录（位于下载目录中，以 . 开头，不会被当作 mod）
+USAGE_DIR = ".last_used"
+
+
+def _marker(download_dir: str | Path, item_id: str) -> Path:
+    return Path(download_dir) / USAGE_DIR / item_id
+
+
+def mark_used(download_dir: str | Path, item_id: str, when: float | None = None) -> None:
+    """
+    记录 mod 被使用（下载完成、从归档恢复或被读取时调用）
+
+    标记文件放在下载目录的 .last_used/ 中而不是 mod 目录里，不会改变 mod 的内容与校验和。
+
+    Args:
+        download_dir: mod 下载目录
+        item_id: Workshop item ID
+        when: 使用时间（时间戳），默认为当前时间
+    """
+    marker = _marker(download_dir, item_id)
+    marker.parent.mkdir(parents=True, exist_ok=True)
+    marker.touch()
+    if when is not None:
+        os.utime(marker, (when, when))
+
+
+def forget_used(download_dir: str | Path, item_id: str) -> None:
+    """删除 mod 的使用记录（mod 被淘汰或归档时调用）"""
+    _marker(download_dir, item_id).unlink(missing_ok=True)
+
+
+def last_used(download_dir: str | Path, item_id: str) -> float:
+    """
+    mod 最近一次被使用的时间
+
+    取显式记录的使用时间与 mod 中所有文件 atime/mtime 的最大值：
+    读取 mod 中的文件不会改变目录本身的 atime，只看目录会让 LRU 退化为按下载顺序淘汰。
+    文件 atime 在 noatime/relatime 挂载下并不可靠，需要读取 mod 的程序可以调用 mark_used()。
+
+    Returns:
+        float: 时间戳，mod 不存在时为 0
+    """
+    latest = 0.0
+    try:
+        latest = _marker(download_dir, item_id).stat().st_mtime
+    except OSError:
+        pass
+
+    path = Path(download_dir) / item_id
+    try:
+        info = path.stat()
+    except OSError:
+        return latest
+    latest = max(latest, info.st_mtime)
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                info = os.stat(os.path.join(root, name))
+            except OSError:
+                continue
+            latest = max(latest, info.st_atime, info.st_mtime)
+    return latest
@@ -1,117 +1,212 @@
-from datetime import datetime
 import os
+import signal
 import time
 
-from database import save_workshop_item
+from database import get_workshop_item_ids
 from dotenv import load_dotenv
-from models.workshop import Pagination, WorkshopItem
+from downloader.scheduler import DownloadScheduler, parse_pinned, parse_quota
+from spiders.proxy import ProxyPool
 from spiders.workshop import Wrokshop
-from utils.log import get_logger
+from utils import memprofile, metrics, tracing
+from utils.log import configure_logging, get_logger
+from utils.ratelimit import TokenBucket
+from utils.scheduler import AdaptiveScheduler
+from workers.app_crawler import AppCrawler
+from workers.fast_lane import KnownItems
 
 load_dotenv()
+configure_logging()
 
 logger = get_logger(__name__)
 
 # 配置参数
 PAGE_DELAY = float(os.getenv("STEAM_WORKSHOP_SYNC_PAGE_DELAY", 5.0))  # 页面间延迟（秒）
 CYCLE_DELAY = float(os.getenv("STEAM_WORKSHOP_SYNC_CYCLE_DELAY", 60.0))  # 循环间延迟（秒）
-
-
-def process_page(workshop: Wrokshop, page: int) -> tuple[int, int]:
-    """
-    处理单个页面的数据
-
-    Args:
-        workshop: Workshop 爬虫实例
-        page: 页码
-
-    Returns:
-        tuple: (总页数, 处理的项目数)
-    """
-    try:
-        result = workshop.get_new_items(page)
-        pagination: Pagination = result["pagination"]
-        items: list[WorkshopItem] = result["items"]
-
-        logger.info(f"📄 第 {pagination.current_page}/{pagination.total_pages} 页 - 找到 {pagination.items_count} 个项目")
-
-        processed_count = 0
-        for idx, item in enumerate(items, 1):
-            logger.info(f"  [{idx}/{pagination.items_count}] 处理项目: {item.title}")
-
-            try:
-                item_info = workshop.get_items_info(item)
-                save_workshop_item(item_info, exist_ok=True)
-                processed_count += 1
-            except Exception as e:
-                logger.error(f"  处理项目 {item.id} 失败: {e}")
-                continue
-
-        logger.info(f"✅ 第 {page} 页处理完成，成功: {processed_count}/{pagination.items_count}")
-        return pagination.total_pages, processed_count
-
-    except Exception as e:
-        logger.error(f"❌ 处理第 {page} 页失败: {e}")
-        raise
+FAST_LANE_INTERVAL = float(os.getenv("STEAM_WORKSHOP_SYNC_FAST_LANE_INTERVAL", 0))  # 首页快速通道轮询间隔（秒），0 表示关闭
+UPDATE_FEED_PAGES = int(os.getenv("STEAM_WORKSHOP_SYNC_UPDATE_FEED_PAGES", 3))  # 更新流单次最多读取页数，0 表示关闭
+RATE_LIMIT = float(os.getenv("STEAM_WORKSHOP_SYNC_RATE_LIMIT", 0))  # 所有 App 共享的请求速率上限（次/秒），0 表示不限制
+
+# 需要监控的 App 列表，逗号分隔；未设置时使用 STEAM_WORKSHOP_SYNC_APP_ID
+APP_IDS = [
+    app_id.strip()
+    for app_id in os.getenv("STEAM_WORKSHOP_SYNC_APP_IDS", os.getenv("STEAM_WORKSHOP_SYNC_APP_ID", "")).split(",")
+    if app_id.strip()
+]
+
+# 自适应循环间隔
+ADAPTIVE_SCHEDULE = os.getenv("STEAM_WORKSHOP_SYNC_ADAPTIVE_SCHEDULE", "false").strip().lower() in ("1", "true", "yes")
+CYCLE_DELAY_MIN = float(os.getenv("STEAM_WORKSHOP_SYNC_CYCLE_DELAY_MIN", 10.0))  # 最小循环间隔（秒）
+CYCLE_DELAY_MAX = float(os.getenv("STEAM_WORKSHOP_SYNC_CYCLE_DELAY_MAX", 3600.0))  # 最大循环间隔（秒）
+TARGET_STALE_ITEMS = float(os.getenv("STEAM_WORKSHOP_SYNC_TARGET_STALE_ITEMS", 1.0))  # 目标平均待同步项目数
+
+# 自动下载同步中发生更新的 mod
+AUTO_DOWNLOAD = os.getenv("STEAM_WORKSHOP_SYNC_AUTO_DOWNLOAD", "false").strip().lower() in ("1", "true", "yes")
+DISK_QUOTA = parse_quota(os.getenv("STEAM_WORKSHOP_SYNC_DISK_QUOTA", "0"))  # 下载目录磁盘配额，0 表示不限制
+DOWNLOAD_PRIORITY = os.getenv("STEAM_WORKSHOP_SYNC_DOWNLOAD_PRIORITY", "rating").strip().lower()  # rating 或 size
+PINNED_ITEMS = parse_pinned(os.getenv("STEAM_WORKSHOP_SYNC_PINNED_ITEMS", ""))  # 置顶 mod，优先下载且不会被淘汰
+ARCHIVE_AFTER_DAYS = float(os.getenv("STEAM_WORKSHOP_SYNC_ARCHIVE_AFTER_DAYS", 0))  # 归档超过该天数未访问的 mod，0 表示不主动归档
+
+# 出口代理池（STEAM_WORKSHOP_SYNC_PROXIES），未配置时直接访问
+proxy_pool = ProxyPool.from_env()
+
+# 已入库的项目 ID，由所有 App 的完整爬取与快速通道共享
+known_items = KnownItems()
+
+
+def create_download_scheduler() -> DownloadScheduler | None:
+    """创建自动下载队列，每个 App 使用独立的下载器，共享同一个内容存储与冷数据归档"""
+    if not AUTO_DOWNLOAD or not APP_IDS:
+        return None
+
+    downloaders = {}
+    first = Wrokshop(APP_IDS[0])
+
+    def downloader_for(app_id: str) -> Wrokshop:
+        if app_id not in downloaders:
+            downloader = first if app_id == first.appid else Wrokshop(app_id)
+            downloader.content_store = first.content_store
+            downloader.cold_archive = first.cold_archive
+            downloaders[app_id] = downloader
+        return downloaders[app_id]
+
+    def download(app_id: str, item_ids: list[str]) -> dict[str, bool]:
+        return downloader_for(app_id).download_mods(item_ids)
+
+    return DownloadScheduler(
+        download,
+        first.download_dir,
+        quota_bytes=DISK_QUOTA,
+        pinned=PINNED_ITEMS,
+        priority=DOWNLOAD_PRIORITY,
+        batch_size=first.download_batch_size,
+        store=first.content_store,
+        archive=first.cold_archive,
+        archive_after=ARCHIVE_AFTER_DAYS * 86400,
+    )
+
+
+def create_crawlers(download_scheduler: DownloadScheduler | None = None) -> list[AppCrawler]:
+    """为每个 App 创建爬取器，所有爬取器共享同一个请求限流器、代理池与下载队列"""
+    if not APP_IDS:
+        raise OSError("没有设置 STEAM_WORKSHOP_SYNC_APP_IDS 或 STEAM_WORKSHOP_SYNC_APP_ID（Steam Workshop APP ID）")
+
+    rate_limiter = TokenBucket(RATE_LIMIT) if RATE_LIMIT > 0 else None
+
+    crawlers = []
+    for app_id in APP_IDS:
+        scheduler = None
+        if ADAPTIVE_SCHEDULE:
+            scheduler = AdaptiveScheduler(CYCLE_DELAY_MIN, CYCLE_DELAY_MAX, CYCLE_DELAY, TARGET_STALE_ITEMS)
+
+        crawlers.append(
+            AppCrawler(
+                app_id,
+                known_items,
+                rate_limiter=rate_limiter,
+                proxy_pool=proxy_pool,
+                page_delay=PAGE_DELAY,
+                cycle_delay=CYCLE_DELAY,
+                update_feed_pages=UPDATE_FEED_PAGES,
+                scheduler=scheduler,
+                download_scheduler=download_scheduler,
+            )
+        )
+    return crawlers
 
 
 def main():
-    """主循环：持续监控 Workshop 更新"""
-    workshop = Wrokshop()
-    cycle_count = 0
+    """主循环：持续监控 Workshop 更新，在多个 App 之间逐页轮转"""
+    download_scheduler = create_download_scheduler()
+    crawlers = create_crawlers(download_scheduler)
 
     logger.info("=" * 60)
     logger.info("🚀 Steam Workshop 监控程序启动")
+    logger.info(f"   监控 App: {', '.join(APP_IDS)}")
     logger.info(f"   页面延迟: {PAGE_DELAY}秒")
-    logger.info(f"   循环延迟: {CYCLE_DELAY}秒")
+    if ADAPTIVE_SCHEDULE:
+        logger.info(f"   循环延迟: 自适应 {CYCLE_DELAY_MIN}-{CYCLE_DELAY_MAX}秒")
+    else:
+        logger.info(f"   循环延迟: {CYCLE_DELAY}秒")
+    if RATE_LIMIT > 0:
+        logger.info(f"   共享请求速率: {RATE_LIMIT} 次/秒")
+    if proxy_pool is not None:
+        logger.info(f"   出口代理: {len(proxy_pool)} 个")
+    if download_scheduler is not None:
+        logger.info(f"   自动下载: 按 {DOWNLOAD_PRIORITY} 排序，置顶 {len(PINNED_ITEMS)} 个")
     logger.info("=" * 60)
 
-    while True:
-        cycle_count += 1
-        cycle_start_time = datetime.now()
-
-        logger.info(f"\n{'=' * 60}")
-        logger.info(f"🔄 开始第 {cycle_count} 轮监控 - {cycle_start_time.strftime('%Y-%m-%d %H:%M:%S')}")
-        logger.info(f"{'=' * 60}")
+    if FAST_LANE_INTERVAL > 0:
+        known_items.update(get_workshop_item_ids())
+        logger.info(f"📚 已加载 {len(known_items)} 个已知项目")
 
-        try:
-            # 首先获取第一页以确定总页数
-            total_pages, _ = process_page(workshop, 1)
+        for crawler in crawlers:
+            crawler.start_fast_lane(FAST_LANE_INTERVAL)
 
-            # 如果只有一页，直接进入下一轮
-            if total_pages == 1:
-                logger.info("✅ 本轮监控完成（共 1 页）")
-            else:
-                # 处理剩余页面
-                time.sleep(PAGE_DELAY)
+    if download_scheduler is not None:
+        metrics.QUEUE_DEPTH.labels("download").set_function(lambda: len(download_scheduler))
+        download_scheduler.start()
 
-                for page in range(2, total_pages + 1):
-                    logger.info(f"\n⏳ {PAGE_DELAY}秒延迟后继续...")
-                    process_page(workshop, page)
+    metrics.start_from_env()
+    tracing.configure()
+    memprofile.configure()
 
-                    # 如果不是最后一页，添加延迟
-                    if page < total_pages:
-                        time.sleep(PAGE_DELAY)
+    # 按比例对爬取轮次做性能采样；向进程发送 SIGUSR1 会采样接下来的一轮
+    profiler = tracing.CycleProfiler.from_env()
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda *_: profiler.force_next.set())
 
-                logger.info(f"\n✅ 本轮监控完成（共 {total_pages} 页）")
+    # 正在进行中的爬取轮次
+    cycles = {}
 
-            # 计算本轮耗时
-            cycle_end_time = datetime.now()
-            cycle_duration = (cycle_end_time - cycle_start_time).total_seconds()
-            logger.info(f"⏱️  本轮耗时: {cycle_duration:.2f}秒")
+    try:
+        while True:
+            # 启动已到期的 App
+            now = time.monotonic()
+            for crawler in crawlers:
+                if crawler.appid not in cycles and crawler.next_cycle_at <= now:
+                    cycles[crawler.appid] = (crawler, profiler.wrap(crawler.crawl_cycle(), crawler.appid))
+
+            if not cycles:
+                next_cycle_at = min(crawler.next_cycle_at for crawler in crawlers)
+                time.sleep(max(next_cycle_at - time.monotonic(), 0))
+                continue
 
-            # 等待进入下一轮
-            logger.info(f"\n💤 等待 {CYCLE_DELAY}秒后开始下一轮...")
-            time.sleep(CYCLE_DELAY)
+            # 每个进行中的 App 轮流推进一页
+            for app_id, (crawler, cycle) in list(cycles.items()):
+                try:
+                    next(cycle)
+                except StopIteration:
+                    del cycles[app_id]
+                    memprofile.cycle_finished()
+                except Exception as e:
+                    logger.error(f"\n❌ [{app_id}] 监控过程发生错误: {e}")
+                    del cycles[app_id]
+                    crawler.schedule_next_cycle(CYCLE_DELAY)
 
-        except KeyboardInterrupt:
-            logger.info("\n\n⛔ 接收到中断信号，正在退出...")
-            break
-        except Exception as e:
-            logger.error(f"\n❌ 监控过程发生错误: {e}")
-            logger.info(f"💤 等待 {CYCLE_DELAY}秒后重试...")
-            time.sleep(CYCLE_DELAY)
+                time.sleep(PAGE_DELAY)
 
+    except KeyboardInterrupt:
+        logger.info("\n\n⛔ 接收到中断信号，正在退出...")
+
+    if download_scheduler is not None:
+        download_scheduler.stop()
+
+    for crawler in crawlers:
+        if crawler.fast_lane is not None:
+            crawler.fast_lane.stop()
+        logger.info(f"📊 [{crawler.appid}] {crawler.stats_snapshot().model_dump()}")
+        logger.info(f"🕒 [{crawler.appid}] 新鲜度: {crawler.freshness.summary()}")
+        transport = crawler.workshop.transport.stats()
+        logger.info(
+            f"🔌 [{crawler.appid}] {crawler.workshop.transport.http_version} 请求 {transport.requests} 次，"
+            f"新建连接 {transport.connections} 个，复用率 {transport.reuse_ratio:.0%}"
+        )
+        crawler.workshop.transport.close()
+    tracing.shutdown()
+    memprofile.shutdown()
+    if proxy_pool is not None:
+        for proxy in proxy_pool.stats():
+            logger.info(f"🌐 代理 {proxy.url}: {proxy.model_dump(exclude={'url'})}")
     logger.info("👋 监控程序已退出")
 
 
@@ -0,0 +1,25 @@
+from datetime import datetime
+
+from sqlalchemy import JSON, BigInteger
+from sqlmodel import Column, Field, SQLModel
+from utils.formater import utcnow
+
+
+class DownloadRecord(SQLModel, table=True):
+    """已下载 mod 的本地清单"""
+
+    __tablename__ = "download_manifest"
+
+    item_id: str = Field(primary_key=True, index=True)
+    app_id: str | None = Field(default=None, index=True)
+    # 下载时 Workshop 上的 updated_at（从未更新过的项目为 created_at），用于判断本地副本是否为最新版本
+    version: datetime | None = None
+    # 大型 mod 可能超过 2 GiB，使用 BigInteger
+    size: int = Field(default=0, sa_column=Column(BigInteger, nullable=False))
+    # {相对路径: sha256}
+    checksums: dict[str, str] = Field(default_factory=dict, sa_column=Column(JSON))
+    path: str
+    downloaded_at: datetime = Field(default_factory=utcnow)
+
+    def __repr__(self) -> str:
+        return f"DownloadRecord(item_id={self.item_id}, version={self.version}, size={self.size}, path={self.path})"
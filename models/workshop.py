@@ -1,14 +1,16 @@
 from datetime import datetime
 
 from pydantic import BaseModel
-from sqlalchemy import ARRAY, String
+from sqlalchemy import ARRAY, JSON, String
 from sqlmodel import Column, Field, SQLModel
+from utils.formater import utcnow
 
 
 class Pagination(BaseModel):
     items_count: int = 0
     current_page: int = 1
     total_pages: int = 1
+    total_entries: int | None = None
 
 
 class WorkshopItem(SQLModel, table=True):
@@ -17,6 +19,7 @@ class WorkshopItem(SQLModel, table=True):
     __tablename__ = "workshop_items"
 
     id: str = Field(primary_key=True, index=True)
+    app_id: str | None = Field(default=None, index=True)
     url: str
     title: str = Field(index=True)
     coverview_url: str
@@ -25,11 +28,12 @@ class WorkshopItem(SQLModel, table=True):
     rating: int | None = None
     description: str | None = None
     file_size: int = Field(default=0)
-    images: list[str] = Field(sa_column=Column(ARRAY(String)))
+    # SQLite 没有数组类型，在 SQLite 上（本地压测）以 JSON 保存
+    images: list[str] = Field(sa_column=Column(ARRAY(String).with_variant(JSON(), "sqlite")))
 
     created_at: datetime | None = None
     updated_at: datetime | None = None
-    synced_at: datetime = Field(default_factory=datetime.utcnow)
+    synced_at: datetime = Field(default_factory=utcnow)
 
     def __repr__(self) -> str:
         return f"WorkshopItem(id={self.id}, title={self.title}, author={self.author}, created_at={self.created_at}, updated_at={self.updated_at}, rating={self.rating})"
@@ -5,12 +5,14 @@ import html2text
 from models.workshop import Pagination, WorkshopItem
 from utils.formater import date_formater, file_size_formater, image_url_formater
 from utils.log import get_logger
+from utils.tracing import traced
 
 logger = get_logger(__name__)
 
 
 class WorkshopParser:
     @staticmethod
+    @traced("parse.listing")
     def parser_items_card(html):
         """
         解析创意工坊项目卡片
@@ -71,10 +73,28 @@ class WorkshopParser:
         pagination = Pagination(
             current_page=current_page if current_page else 1,
             total_pages=total_pages,
+            total_entries=WorkshopParser.parser_total_entries(paging_soup),
         )
         return pagination
 
     @staticmethod
+    def parser_total_entries(paging_soup) -> int | None:
+        """
+        解析列表总条目数，例如 'Showing 1-30 of 12,345 entries'
+
+        列表在翻页期间会因新增/删除而整体偏移，总条目数的变化是判断偏移方向的依据。
+        """
+        info_tag = paging_soup.find(attrs={"class": "workshopBrowsePagingInfo"})
+        if not info_tag:
+            return None
+
+        numbers = re.findall(r"\d[\d,]*", info_tag.get_text(" ", strip=True))
+        if not numbers:
+            return None
+        return int(numbers[-1].replace(",", ""))
+
+    @staticmethod
+    @traced("parse.details")
     def parser_items_info(html):
         soup = BeautifulSoup(html, "lxml")
 
@@ -92,7 +112,7 @@ class WorkshopParser:
         details_stats_values = [value.text.strip() for value in details_stats_values]
         details_stats = dict(zip(details_stats_keys, details_stats_values, strict=False))
 
-        logger.debug(f"MetaData: {details_stats}")
+        logger.debug("MetaData: %s", details_stats)
 
         created_at = date_formater(details_stats.get("Posted") or details_stats.get("发表于"))
         updated_at = date_formater(details_stats.get("Updated") or details_stats.get("更新于"))
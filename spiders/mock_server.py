@@ -0,0 +1,325 @@
+"""
+本地模拟的 Steam 创意工坊
+
+提供与 steamcommunity.com 结构相同的列表页与详情页，内容由 item 序号确定性地生成，
+可以配置每个请求的延迟、429 注入比例与每页条目数。配合 STEAM_WORKSHOP_SYNC_BASE_URL
+可以在离线环境中以远高于真实限速的速度压测完整的爬取流程：
+
+    python -m spiders.mock_server --port 8080 --items 30000 --latency 0.02 --throttle-rate 0.01
+    STEAM_WORKSHOP_SYNC_BASE_URL=http://127.0.0.1:8080 STEAM_WORKSHOP_SYNC_REQUEST_DELAY=0 python main.py
+"""
+
+import argparse
+from datetime import datetime, timedelta
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import random
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+from pydantic import BaseModel
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# 第一个 item 的 ID 与发布时间，之后每个 item 的 ID 加一、发布时间晚一小时
+FIRST_ITEM_ID = 3000000000
+FIRST_CREATED_AT = datetime(2020, 1, 1, 8, 0)
+
+
+def steam_date(value: datetime) -> str:
+    """Steam 详情页的日期格式，例如 'May 12, 2022 @ 12:43pm'"""
+    hour = value.hour % 12 or 12
+    suffix = "am" if value.hour < 12 else "pm"
+    return f"{value:%b} {value.day}, {value.year} @ {hour}:{value:%M}{suffix}"
+
+
+class MockStats(BaseModel):
+    """模拟服务的请求统计"""
+
+    requests: int = 0
+    listing: int = 0
+    details: int = 0
+    throttled: int = 0
+    not_found: int = 0
+
+
+class MockWorkshop:
+    """
+    模拟的创意工坊数据
+
+    第 i 个 item 的 ID、标题、作者、评分、大小与更新时间都由 i 确定，
+    同样的参数每次生成完全相同的页面，便于在不同提交之间比较压测结果。
+    """
+
+    def __init__(self, items: int = 3000, page_size: int = 30, app_id: str = "0") -> None:
+        """
+        Args:
+            items: 初始 item 数量
+            page_size: 每个列表页的条目数
+            app_id: 模拟的 App ID（只用于页面内容）
+        """
+        self.page_size = page_size
+        self.app_id = app_id
+        self._count = items
+        self._lock = threading.Lock()
+        self._updated_order: list[int] | None = None
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def publish(self, count: int = 1) -> list[str]:
+        """发布新的 item（出现在 mostrecent 首页），返回新 item 的 ID"""
+        with self._lock:
+            start = self._count
+            self._count += count
+            self._updated_order = None
+        return [str(FIRST_ITEM_ID + index) for index in range(start, start + count)]
+
+    def item_id(self, index: int) -> str:
+        return str(FIRST_ITEM_ID + index)
+
+    def index_of(self, item_id: str) -> int | None:
+        try:
+            index = int(item_id) - FIRST_ITEM_ID
+        except ValueError:
+            return None
+        return index if 0 <= index < self._count else None
+
+    def created_at(self, index: int) -> datetime:
+        return FIRST_CREATED_AT + timedelta(hours=index)
+
+    def updated_at(self, index: int) -> datetime:
+        # 用乘法散列打散更新时间，使 lastupdated 的顺序与发布顺序不同
+        return self.created_at(index) + timedelta(minutes=(index * 2654435761) % (60 * 24 * 400))
+
+    def total_pages(self) -> int:
+        return max((self._count + self.page_size - 1) // self.page_size, 1)
+
+    def page(self, page: int, browsesort: str = "mostrecent") -> list[int]:
+        """列表页中的 item 序号"""
+        start = (page - 1) * self.page_size
+        if browsesort == "lastupdated":
+            with self._lock:
+                if self._updated_order is None:
+                    self._updated_order = sorted(range(self._count), key=self.updated_at, reverse=True)
+                order = self._updated_order
+            return order[start : start + self.page_size]
+        # mostrecent：最新发布的在前
+        newest = self._count - 1
+        return [newest - offset for offset in range(start, min(start + self.page_size, self._count))]
+
+    def render_listing(self, page: int, browsesort: str, base_url: str) -> str:
+        """渲染列表页"""
+        cards = []
+        for index in self.page(page, browsesort):
+            item_id = self.item_id(index)
+            rating = index % 6
+            rating_img = f"{rating}-star.png" if rating else "not-yet.png"
+            cards.append(
+                f'<div class="workshopItem">'
+                f'<a class="ugc" data-publishedfileid="{item_id}" '
+                f'href="{base_url}/sharedfiles/filedetails/?id={item_id}">'
+                f'<img class="workshopItemPreviewImage" src="https://images.example.com/{item_id}.jpg"></a>'
+                f'<div class="workshopItemTitle">Mock Item {item_id}</div>'
+                f'<img class="fileRating" src="https://community.example.com/{rating_img}">'
+                f'<a class="workshop_author_link" href="{base_url}/id/author{index % 97}">author{index % 97}</a>'
+                f"</div>"
+            )
+
+        total_pages = self.total_pages()
+        first = (page - 1) * self.page_size + 1
+        last = min(page * self.page_size, self._count)
+        page_links = "".join(f'<a class="pagelink">{number}</a>' for number in sorted({page, total_pages}))
+        return (
+            "<html><body>"
+            f'<div class="workshopBrowseItems">{"".join(cards)}</div>'
+            '<div class="workshopBrowsePaging">'
+            f'<div class="workshopBrowsePagingInfo">Showing {first}-{last} of {self._count:,} entries</div>'
+            f'<div class="workshopBrowsePagingControls">{page_links}</div>'
+            "</div></body></html>"
+        )
+
+    def render_details(self, index: int) -> str:
+        """渲染详情页"""
+        item_id = self.item_id(index)
+        size = 0.5 + (index * 7919) % 2000 / 10
+        stats = {
+            "File Size": f"{size:.3f} MB",
+            "Posted": steam_date(self.created_at(index)),
+            "Updated": steam_date(self.updated_at(index)),
+        }
+        stats_html = "".join(
+            f'<div class="detailsStatLeft">{escape(key)}</div><div class="detailsStatRight">{escape(value)}</div>'
+            for key, value in stats.items()
+        )
+        images = "".join(
+            f'<img src="https://images.example.com/{item_id}/{number}.jpg?imw=1024">' for number in range(3)
+        )
+        return (
+            "<html><body>"
+            '<div class="workshopItemPreviewArea">'
+            f'<div class="workshopItemPreviewImageEnlargeableContainer">{images}</div>'
+            f'<div class="responsive_local_menu">{stats_html}</div>'
+            "</div>"
+            f'<div class="workshopItemDescription">Mock item <b>{item_id}</b> for app {self.app_id}.<br>'
+            f"{'Lorem ipsum dolor sit amet. ' * (1 + index % 20)}</div>"
+            "</body></html>"
+        )
+
+
+class MockSteamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 响应头与正文分两次写出，不关闭 Nagle 时 keep-alive 连接上每个请求会多出约 40ms 的延迟确认
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, body: str, headers: dict | None = None) -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        server: MockSteamServer = self.server.owner
+        if server.latency > 0:
+            time.sleep(server.latency)
+
+        parts = urlsplit(self.path)
+        query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        if server.should_throttle():
+            self._send(429, "Too Many Requests", {"Retry-After": str(server.retry_after)})
+            return
+
+        if parts.path.rstrip("/") == "/workshop/browse":
+            server.count("listing")
+            page = max(int(query.get("p", 1)), 1)
+            browsesort = query.get("browsesort", "mostrecent")
+            self._send(200, server.workshop.render_listing(page, browsesort, server.url))
+            return
+
+        if parts.path.rstrip("/") == "/sharedfiles/filedetails":
+            index = server.workshop.index_of(query.get("id", ""))
+            if index is not None:
+                server.count("details")
+                self._send(200, server.workshop.render_details(index))
+                return
+
+        server.count("not_found")
+        self._send(404, "Not Found")
+
+
+class MockSteamServer:
+    """
+    模拟的 Steam 创意工坊 HTTP 服务
+
+    在后台线程中运行，url 属性即 STEAM_WORKSHOP_SYNC_BASE_URL 需要设置的地址。
+    """
+
+    def __init__(
+        self,
+        workshop: MockWorkshop | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        throttle_rate: float = 0.0,
+        retry_after: int = 1,
+        seed: int = 0,
+    ) -> None:
+        """
+        Args:
+            workshop: 模拟数据，默认 3000 个 item、每页 30 个
+            host: 监听地址
+            port: 监听端口，0 表示随机端口
+            latency: 每个请求的固定延迟（秒）
+            throttle_rate: 返回 429 的请求比例（0-1）
+            retry_after: 429 响应的 Retry-After（秒）
+            seed: 429 注入的随机种子
+        """
+        self.workshop = workshop or MockWorkshop()
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.stats = MockStats()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), MockSteamHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.owner = self
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def should_throttle(self) -> bool:
+        with self._lock:
+            self.stats.requests += 1
+            if self.throttle_rate > 0 and self._random.random() < self.throttle_rate:
+                self.stats.throttled += 1
+                return True
+        return False
+
+    def count(self, kind: str) -> None:
+        with self._lock:
+            setattr(self.stats, kind, getattr(self.stats, kind) + 1)
+
+    def start(self) -> "MockSteamServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-steam", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> "MockSteamServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟的 Steam 创意工坊")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--items", type=int, default=3000, help="item 数量")
+    parser.add_argument("--page-size", type=int, default=30, help="每页条目数")
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的延迟（秒）")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="返回 429 的请求比例（0-1）")
+    parser.add_argument("--retry-after", type=int, default=1, help="429 响应的 Retry-After（秒）")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = MockSteamServer(
+        MockWorkshop(args.items, args.page_size),
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    ).start()
+    logger.info(f"🧪 模拟 Steam 创意工坊已启动: {server.url}（{args.items} 个 item）")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+        logger.info(f"📊 {server.stats.model_dump()}")
+
+
+if __name__ == "__main__":
+    main()
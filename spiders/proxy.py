@@ -0,0 +1,238 @@
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+from pydantic import BaseModel
+from utils.log import get_logger
+from utils.ratelimit import TokenBucket
+
+logger = get_logger(__name__)
+
+
+def parse_proxies(value: str) -> list[str]:
+    """解析逗号分隔的代理地址列表，去重并保持顺序"""
+    proxies = []
+    for proxy in value.split(","):
+        proxy = proxy.strip()
+        if proxy and proxy not in proxies:
+            proxies.append(proxy)
+    return proxies
+
+
+def _display(url: str) -> str:
+    """日志中显示的代理地址（去掉认证信息）"""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.hostname}:{parts.port}" if parts.hostname else url
+
+
+class ProxyStats(BaseModel):
+    """单个代理的统计"""
+
+    url: str
+    requests: int = 0
+    failures: int = 0
+    throttled: int = 0
+    health: float = 1.0
+    latency: float | None = None
+    quarantined: bool = False
+
+
+class Proxy:
+    """
+    一个出口代理
+
+    每个代理拥有独立的令牌桶。health 是成功率的指数移动平均（0-1），
+    latency 是成功请求耗时的指数移动平均（秒）。
+    """
+
+    # 指数移动平均的平滑系数
+    ALPHA = 0.3
+
+    def __init__(self, url: str, rate: float, capacity: float | None = None) -> None:
+        self.url = url
+        self.bucket = TokenBucket(rate, capacity)
+        self.health = 1.0
+        self.latency: float | None = None
+        self.requests = 0
+        self.failures = 0
+        self.throttled = 0
+        # 连续的限流/超时次数与隔离次数
+        self.strikes = 0
+        self.quarantines = 0
+        self.quarantined_until = 0.0
+
+    @property
+    def name(self) -> str:
+        return _display(self.url)
+
+    @property
+    def proxies(self) -> dict[str, str]:
+        """requests 的 proxies 参数"""
+        return {"http": self.url, "https": self.url}
+
+    def is_quarantined(self, now: float | None = None) -> bool:
+        return self.quarantined_until > (time.monotonic() if now is None else now)
+
+    def score(self, default_latency: float) -> float:
+        """选择代理时的得分，越健康、越快越高"""
+        latency = self.latency if self.latency is not None else default_latency
+        return self.health / max(latency, 0.01)
+
+    def stats(self) -> ProxyStats:
+        return ProxyStats(
+            url=self.name,
+            requests=self.requests,
+            failures=self.failures,
+            throttled=self.throttled,
+            health=round(self.health, 3),
+            latency=round(self.latency, 3) if self.latency is not None else None,
+            quarantined=self.is_quarantined(),
+        )
+
+
+class ProxyPool:
+    """
+    出口代理池
+
+    请求在多个代理之间轮转，每个代理按自己的速率限流，整体吞吐随代理数量增加。
+    优先选择健康度高、延迟低且有令牌的代理；连续多次被限流（429）或超时的代理被隔离一段时间，
+    每次重新隔离时间翻倍，恢复后成功一次即复位。所有代理都在隔离中时等待最早恢复的那个。
+    """
+
+    def __init__(
+        self,
+        proxies: list[str],
+        rate: float = 1.0,
+        capacity: float | None = None,
+        quarantine_after: int = 3,
+        quarantine: float = 60.0,
+        max_quarantine: float = 1800.0,
+    ) -> None:
+        """
+        Args:
+            proxies: 代理地址列表（http://、https:// 或 socks5://，可带认证信息）
+            rate: 每个代理的请求速率上限（次/秒）
+            capacity: 每个代理允许的突发请求数，默认等于 rate
+            quarantine_after: 触发隔离的连续限流/超时次数
+            quarantine: 初始隔离时间（秒）
+            max_quarantine: 最大隔离时间（秒）
+        """
+        if not proxies:
+            raise ValueError("代理列表不能为空")
+
+        self.proxies = [Proxy(url, rate, capacity) for url in proxies]
+        self.quarantine_after = quarantine_after
+        self.quarantine = quarantine
+        self.max_quarantine = max_quarantine
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ProxyPool | None":
+        """从 STEAM_WORKSHOP_SYNC_PROXIES 等环境变量创建代理池，没有配置代理时返回 None"""
+        proxies = parse_proxies(os.environ.get("STEAM_WORKSHOP_SYNC_PROXIES", ""))
+        if not proxies:
+            return None
+        return cls(
+            proxies,
+            rate=float(os.environ.get("STEAM_WORKSHOP_SYNC_PROXY_RATE", 1.0)),
+            quarantine_after=int(os.environ.get("STEAM_WORKSHOP_SYNC_PROXY_QUARANTINE_AFTER", 3)),
+            quarantine=float(os.environ.get("STEAM_WORKSHOP_SYNC_PROXY_QUARANTINE", 60.0)),
+        )
+
+    def __len__(self) -> int:
+        return len(self.proxies)
+
+    def available(self) -> list[Proxy]:
+        """未被隔离的代理"""
+        now = time.monotonic()
+        with self._lock:
+            return [proxy for proxy in self.proxies if not proxy.is_quarantined(now)]
+
+    def _candidates(self, exclude: set[str]) -> tuple[list[Proxy], float]:
+        """按得分排序的可用代理，以及全部隔离时距最早恢复的秒数"""
+        now = time.monotonic()
+        with self._lock:
+            proxies = [proxy for proxy in self.proxies if proxy.url not in exclude] or self.proxies
+            available = [proxy for proxy in proxies if not proxy.is_quarantined(now)]
+            if not available:
+                return [], min(proxy.quarantined_until for proxy in proxies) - now
+
+            measured = [proxy.latency for proxy in available if proxy.latency is not None]
+            # 还没有延迟数据的代理按平均延迟计算，保证它们也会被尝试
+            default_latency = sum(measured) / len(measured) if measured else 1.0
+            return sorted(available, key=lambda proxy: proxy.score(default_latency), reverse=True), 0.0
+
+    def acquire(self, exclude: set[str] | None = None) -> Proxy:
+        """
+        取出一个可用的代理（阻塞直到某个代理有令牌）
+
+        Args:
+            exclude: 本次请求已经失败过的代理，除非只剩这些代理，否则不会再选中
+
+        Returns:
+            Proxy: 已扣除一个令牌的代理
+        """
+        exclude = exclude or set()
+        while True:
+            candidates, wait = self._candidates(exclude)
+            if not candidates:
+                logger.warning(f"⏳ 所有代理都在隔离中，等待 {wait:.1f} 秒")
+                time.sleep(max(wait, 0.01))
+                continue
+
+            waits = []
+            for proxy in candidates:
+                wait = proxy.bucket.try_acquire()
+                if wait <= 0:
+                    with self._lock:
+                        proxy.requests += 1
+                    return proxy
+                waits.append(wait)
+            time.sleep(min(waits))
+
+    def record(self, proxy: Proxy, latency: float | None = None, status: int | None = None, timeout: bool = False):
+        """
+        记录一次请求的结果
+
+        Args:
+            proxy: 发送请求的代理
+            latency: 请求耗时（秒），连接失败时为 None
+            status: 响应状态码，连接失败时为 None
+            timeout: 是否超时或连接失败
+        """
+        throttled = status == 429
+        failed = timeout or throttled or (status is not None and status >= 500)
+        with self._lock:
+            proxy.health = (1 - Proxy.ALPHA) * proxy.health + Proxy.ALPHA * (0.0 if failed else 1.0)
+            if latency is not None and not failed:
+                if proxy.latency is None:
+                    proxy.latency = latency
+                else:
+                    proxy.latency = (1 - Proxy.ALPHA) * proxy.latency + Proxy.ALPHA * latency
+            if failed:
+                proxy.failures += 1
+            if throttled:
+                proxy.throttled += 1
+
+            if not (throttled or timeout):
+                if not failed:
+                    proxy.strikes = 0
+                    proxy.quarantines = 0
+                return
+
+            proxy.strikes += 1
+            if proxy.strikes < self.quarantine_after:
+                return
+            duration = min(self.quarantine * (2**proxy.quarantines), self.max_quarantine)
+            proxy.quarantines += 1
+            proxy.strikes = 0
+            proxy.quarantined_until = time.monotonic() + duration
+
+        reason = "限流" if throttled else "超时"
+        logger.warning(f"🚧 代理 {proxy.name} 连续{reason}，隔离 {duration:.0f} 秒")
+
+    def stats(self) -> list[ProxyStats]:
+        """每个代理的统计"""
+        with self._lock:
+            return [proxy.stats() for proxy in self.proxies]
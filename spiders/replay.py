@@ -0,0 +1,180 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+import threading
+from urllib.parse import urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from spiders.transport import Transport, TransportStats
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+MODE_LIVE = "live"
+MODE_RECORD = "record"
+MODE_REPLAY = "replay"
+
+# 回放时沿用的响应头，其余（Set-Cookie、Date 等）不写入记录
+KEPT_HEADERS = ("Content-Type", "Retry-After", "Last-Modified")
+
+
+def request_key(url: str, params: dict | None = None) -> str:
+    """由地址与查询参数计算记录的文件名，参数顺序不影响结果"""
+    query = urlencode(sorted((params or {}).items()))
+    return hashlib.sha256(f"GET {url}?{query}".encode()).hexdigest()[:32]
+
+
+class Cassette:
+    """
+    磁盘上的请求记录
+
+    每个请求保存为 <目录>/<key>.json，包含地址、参数、状态码、少量响应头与响应正文。
+    """
+
+    def __init__(self, directory: str | Path) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, url: str, params: dict | None = None) -> Path:
+        return self.directory / f"{request_key(url, params)}.json"
+
+    def save(self, url: str, params: dict | None, response) -> Path:
+        """记录一个响应（先写临时文件再重命名，避免留下半写入的记录）"""
+        entry = {
+            "url": url,
+            "params": params or {},
+            "status": response.status_code,
+            "headers": {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers},
+            "encoding": response.encoding or "utf-8",
+            "body": response.text,
+        }
+        path = self.path(url, params)
+        temp = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(temp, path)
+        return path
+
+    def load(self, url: str, params: dict | None = None) -> dict | None:
+        """读取记录，没有记录时返回 None"""
+        path = self.path(url, params)
+        if not path.exists():
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.directory.glob("*.json"))
+
+
+def build_response(entry: dict) -> requests.Response:
+    """由记录构造 requests.Response"""
+    response = requests.Response()
+    response.status_code = entry["status"]
+    response.headers = CaseInsensitiveDict(entry["headers"])
+    response.encoding = entry["encoding"]
+    response._content = entry["body"].encode(entry["encoding"])
+    prepared = requests.Request("GET", entry["url"], params=entry["params"]).prepare()
+    response.url = prepared.url
+    response.request = prepared
+    return response
+
+
+class RecordingTransport:
+    """
+    录制模式：请求照常发出，成功的响应同时写入记录
+
+    只记录成功的响应，避免把 429 等临时错误录进记录，回放时反复触发重试。
+    """
+
+    def __init__(self, transport: Transport, cassette: Cassette) -> None:
+        self.transport = transport
+        self.cassette = cassette
+        self.recorded = 0
+
+    def __getattr__(self, name: str):
+        # session、stats()、close() 等沿用被包装的传输层
+        return getattr(self.transport, name)
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def request(self, method: str, url: str, **kwargs):
+        response = self.transport.request(method, url, **kwargs)
+        # 记录只按 URL 与查询参数区分，只录制 GET 请求
+        if method == "GET" and response.ok:
+            self.cassette.save(url, kwargs.get("params"), response)
+            self.recorded += 1
+        return response
+
+
+class ReplayTransport:
+    """
+    回放模式：只从记录中读取响应，不访问网络
+
+    没有记录的请求按连接失败处理（requests.ConnectionError），与离线时的行为一致。
+    """
+
+    http_version = "replay"
+
+    def __init__(self, cassette: Cassette) -> None:
+        self.cassette = cassette
+        # 下载等不经过传输层的调用仍使用普通会话
+        self.session = requests.Session()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        if method != "GET":
+            # API 调用等非页面请求与下载一样使用普通会话
+            return self.session.request(method, url, **kwargs)
+        entry = self.cassette.load(url, kwargs.get("params"))
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if entry is None:
+            raise requests.ConnectionError(f"回放记录中没有该请求: {url} {kwargs.get('params') or ''}")
+        return build_response(entry)
+
+    def stats(self) -> TransportStats:
+        with self._lock:
+            return TransportStats(requests=self.hits + self.misses, connections=0)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def wrap_transport(transport: Transport, mode: str | None = None, cassette_dir: str | None = None):
+    """
+    按 STEAM_WORKSHOP_SYNC_HTTP_MODE 包装传输层
+
+    Args:
+        transport: 实际发送请求的传输层
+        mode: live（默认）、record 或 replay，为空时读取环境变量
+        cassette_dir: 记录目录，为空时读取 STEAM_WORKSHOP_SYNC_CASSETTE_DIR
+
+    Returns:
+        传输层（live 时原样返回）
+    """
+    mode = (mode or os.environ.get("STEAM_WORKSHOP_SYNC_HTTP_MODE", MODE_LIVE)).strip().lower()
+    if mode == MODE_LIVE:
+        return transport
+
+    cassette_dir = cassette_dir or os.environ.get("STEAM_WORKSHOP_SYNC_CASSETTE_DIR", "./data/cassettes")
+    cassette = Cassette(cassette_dir)
+    if mode == MODE_RECORD:
+        logger.info(f"📼 录制模式，响应保存到 {cassette.directory}")
+        return RecordingTransport(transport, cassette)
+    if mode == MODE_REPLAY:
+        logger.info(f"📼 回放模式，从 {cassette.directory} 读取 {len(cassette)} 条记录")
+        transport.close()
+        return ReplayTransport(cassette)
+    raise ValueError(f"未知的 STEAM_WORKSHOP_SYNC_HTTP_MODE: {mode}")
@@ -0,0 +1,278 @@
+import importlib.util
+import os
+import threading
+import time
+
+from pydantic import BaseModel
+import requests
+from requests.adapters import HTTPAdapter
+from spiders.proxy import ProxyPool
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+def _has_module(name: str) -> bool:
+    return importlib.util.find_spec(name) is not None
+
+
+def accept_encoding() -> str:
+    """
+    客户端能够解码的压缩格式
+
+    urllib3 / httpx 只有在安装了 brotli（或 brotlicffi）时才能解码 br，未安装时不声明。
+    """
+    encodings = ["gzip", "deflate"]
+    if _has_module("brotli") or _has_module("brotlicffi"):
+        encodings.append("br")
+    return ", ".join(encodings)
+
+
+def ensure_encoding(response) -> None:
+    """
+    设置响应的文本编码
+
+    Content-Type 中带有 charset 时沿用；否则按 UTF-8 解码（Steam 页面均为 UTF-8），
+    不再对整个响应体做编码探测（apparent_encoding 对大页面代价很高）。
+    """
+    content_type = response.headers.get("Content-Type", "")
+    if "charset=" not in content_type.lower():
+        response.encoding = "utf-8"
+
+
+class TransportConfig(BaseModel):
+    """HTTP 传输层配置"""
+
+    pool_connections: int = 10
+    pool_maxsize: int = 10
+    connect_timeout: float = 10.0
+    read_timeout: float = 30.0
+    http2: bool = False
+
+    @classmethod
+    def from_env(cls) -> "TransportConfig":
+        """从 STEAM_WORKSHOP_SYNC_* 环境变量读取配置"""
+        read_timeout = float(os.environ.get("STEAM_WORKSHOP_SYNC_TIMEOUT", 30))
+        http2 = os.environ.get("STEAM_WORKSHOP_SYNC_HTTP2", "false").strip().lower() in ("1", "true", "yes")
+        return cls(
+            pool_connections=int(os.environ.get("STEAM_WORKSHOP_SYNC_POOL_CONNECTIONS", 10)),
+            pool_maxsize=int(os.environ.get("STEAM_WORKSHOP_SYNC_POOL_MAXSIZE", 10)),
+            connect_timeout=float(os.environ.get("STEAM_WORKSHOP_SYNC_CONNECT_TIMEOUT", 10)),
+            read_timeout=float(os.environ.get("STEAM_WORKSHOP_SYNC_READ_TIMEOUT", read_timeout)),
+            http2=http2,
+        )
+
+
+class TransportStats(BaseModel):
+    """连接复用统计"""
+
+    requests: int = 0
+    connections: int = 0
+
+    @property
+    def reused(self) -> int:
+        """复用已有连接的请求数"""
+        return max(self.requests - self.connections, 0)
+
+    @property
+    def reuse_ratio(self) -> float:
+        return self.reused / self.requests if self.requests else 0.0
+
+
+class CountingAdapter(HTTPAdapter):
+    """
+    统计请求数与新建连接数的 HTTPAdapter
+
+    直连与经由代理的连接池都换成计数的连接类，每次建立 TCP 连接时计数，不依赖 urllib3 连接池的内部结构。
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        # HTTPAdapter.__init__ 会调用 init_poolmanager，计数器需要先初始化
+        self.requests = 0
+        self.connections = 0
+        self._counter_lock = threading.Lock()
+        self._pool_classes: dict[type, type] = {}
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self._instrument(self.poolmanager)
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        with self._counter_lock:
+            created = proxy not in self.proxy_manager
+            manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        if created:
+            self._instrument(manager)
+        return manager
+
+    def send(self, request, *args, **kwargs):
+        with self._counter_lock:
+            self.requests += 1
+        return super().send(request, *args, **kwargs)
+
+    def _count_connection(self) -> None:
+        with self._counter_lock:
+            self.connections += 1
+
+    def _instrument(self, manager) -> None:
+        """把连接池管理器的各协议连接池换成计数的子类"""
+        manager.pool_classes_by_scheme = {
+            scheme: self._counting_pool(pool_cls) for scheme, pool_cls in manager.pool_classes_by_scheme.items()
+        }
+
+    def _counting_pool(self, pool_cls: type) -> type:
+        counting = self._pool_classes.get(pool_cls)
+        if counting is None:
+            adapter = self
+
+            class CountingConnection(pool_cls.ConnectionCls):
+                def connect(self) -> None:
+                    adapter._count_connection()
+                    super().connect()
+
+            counting = type(pool_cls.__name__, (pool_cls,), {"ConnectionCls": CountingConnection})
+            self._pool_classes[pool_cls] = counting
+        return counting
+
+
+class Transport:
+    """
+    爬虫的 HTTP 传输层
+
+    默认使用 requests，连接池大小可配置，超时拆分为连接超时与读取超时，并协商 gzip/br 压缩。
+    开启 HTTP/2 且安装了 httpx[http2] 时改用 httpx，同一 host 的详情页请求复用一条多路复用连接。
+    httpx 的网络异常会转换为对应的 requests 异常，上层的重试与错误处理无需区分两种实现。
+
+    配置了代理池时请求经由代理发出（始终使用 requests）。某个代理被限流或连接失败时立即换下一个代理重发，
+    只有所有代理都失败时才把结果交给上层的重试逻辑。
+    """
+
+    def __init__(self, config: TransportConfig | None = None, proxy_pool: ProxyPool | None = None) -> None:
+        """
+        Args:
+            config: 传输层配置
+            proxy_pool: 出口代理池（可选）
+        """
+        self.config = config or TransportConfig()
+        self.proxy_pool = proxy_pool
+        self.timeout = (self.config.connect_timeout, self.config.read_timeout)
+        self.headers = {"Accept-Encoding": accept_encoding()}
+
+        # requests 会话始终保留，供 API 调用与文件下载使用
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.adapter = CountingAdapter(
+            pool_connections=self.config.pool_connections, pool_maxsize=self.config.pool_maxsize
+        )
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+        self.client = None
+        if self.config.http2 and proxy_pool is not None:
+            logger.warning("使用代理池时不支持 HTTP/2，继续使用 requests")
+        elif self.config.http2:
+            if _has_module("httpx") and _has_module("h2"):
+                import httpx
+
+                self.client = httpx.Client(
+                    http2=True,
+                    headers=self.headers,
+                    limits=httpx.Limits(
+                        max_connections=self.config.pool_maxsize,
+                        max_keepalive_connections=self.config.pool_connections,
+                    ),
+                    timeout=httpx.Timeout(self.config.read_timeout, connect=self.config.connect_timeout),
+                    follow_redirects=True,
+                )
+            else:
+                logger.warning("未安装 httpx[http2]，HTTP/2 不可用，继续使用 requests")
+
+        # httpx 没有公开的连接计数，通过 trace 扩展统计新建连接
+        self._client_requests = 0
+        self._client_connections = 0
+        self._lock = threading.Lock()
+
+    @property
+    def http_version(self) -> str:
+        return "HTTP/2" if self.client is not None else "HTTP/1.1"
+
+    def _trace(self, event_name: str, info: dict) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self._client_connections += 1
+
+    def get(self, url: str, **kwargs):
+        """发送 GET 请求，参数见 request()"""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        """发送 POST 请求（例如 Steam Web API），参数见 request()"""
+        return self.request("POST", url, **kwargs)
+
+    def request(self, method: str, url: str, **kwargs):
+        """
+        发送请求
+
+        Args:
+            method: 请求方法
+            url: 请求地址
+            **kwargs: params、data、headers、timeout 等，timeout 默认使用 (连接超时, 读取超时)
+
+        Returns:
+            requests.Response 或 httpx.Response
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        if self.proxy_pool is not None:
+            return self._request_via_proxy(method, url, **kwargs)
+        if self.client is None:
+            return self.session.request(method, url, **kwargs)
+
+        import httpx
+
+        timeout = kwargs.pop("timeout")
+        if isinstance(timeout, tuple):
+            timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+        with self._lock:
+            self._client_requests += 1
+        try:
+            return self.client.request(method, url, timeout=timeout, extensions={"trace": self._trace}, **kwargs)
+        except httpx.TimeoutException as e:
+            raise requests.Timeout(str(e)) from e
+        except httpx.TransportError as e:
+            raise requests.ConnectionError(str(e)) from e
+
+    def _request_via_proxy(self, method: str, url: str, **kwargs) -> requests.Response:
+        """经由代理池发送请求，限流或连接失败时换一个代理重发"""
+        tried = set()
+        for attempt in range(len(self.proxy_pool)):
+            last = attempt == len(self.proxy_pool) - 1
+            proxy = self.proxy_pool.acquire(exclude=tried)
+            tried.add(proxy.url)
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, proxies=proxy.proxies, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self.proxy_pool.record(proxy, timeout=True)
+                if last:
+                    raise
+                logger.debug("代理 %s 请求失败，换下一个代理", proxy.name)
+                continue
+
+            self.proxy_pool.record(proxy, latency=time.monotonic() - started, status=response.status_code)
+            if response.status_code != 429 or last:
+                return response
+            logger.debug("代理 %s 被限流，换下一个代理", proxy.name)
+        return response
+
+    def stats(self) -> TransportStats:
+        """汇总请求数与新建连接数（包括经由代理的请求）"""
+        with self._lock:
+            requests_count = self.adapter.requests + self._client_requests
+            connections = self.adapter.connections + self._client_connections
+        return TransportStats(requests=requests_count, connections=connections)
+
+    def close(self) -> None:
+        self.session.close()
+        if self.client is not None:
+            self.client.close()
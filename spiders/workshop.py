@@ -1,27 +1,58 @@
+from collections.abc import Callable
 from datetime import datetime
+import functools
+import logging
 import os
 from pathlib import Path
-import subprocess
 import time
 
+from downloader.archive import ColdArchive
+from downloader.checksum import compute_checksums, directory_size
+from downloader.direct import DETAILS_URL, RangedDownloader, file_details_form, parse_file_details
+from downloader.finalize import finalize_download
+from downloader.pool import DownloadPool, worker_throttle
+from downloader.steamcmd import SteamCMDEvent, SteamCMDRunner, build_command
+from downloader.store import ContentStore
 from models.workshop import WorkshopItem
 from parsers.workshop import WorkshopParser
 import requests
+from spiders.proxy import ProxyPool
+from spiders.replay import wrap_transport
+from spiders.transport import Transport, TransportConfig, ensure_encoding
+from utils import metrics, tracing
 from utils.log import get_logger
+from utils.ratelimit import TokenBucket
 from utils.retry import retry_on_error
 
 logger = get_logger(__name__)
 
 
 class Wrokshop:
-    def __init__(self) -> None:
-        self.appid = os.environ.get("STEAM_WORKSHOP_SYNC_APP_ID", "").strip()
+    def __init__(
+        self,
+        appid: str | None = None,
+        rate_limiter: TokenBucket | None = None,
+        proxy_pool: ProxyPool | None = None,
+    ) -> None:
+        """
+        Args:
+            appid: Steam Workshop APP ID，默认读取 STEAM_WORKSHOP_SYNC_APP_ID
+            rate_limiter: 请求限流器，多个实例共享同一个限流器即共享请求预算（可选）
+            proxy_pool: 出口代理池，多个实例共享同一个代理池（可选）
+        """
+        self.appid = (appid or os.environ.get("STEAM_WORKSHOP_SYNC_APP_ID", "")).strip()
         if not self.appid:
             raise OSError("没有设置 STEAM_WORKSHOP_SYNC_APP_ID（Steam Workshop APP ID）")
+        self.rate_limiter = rate_limiter
 
         self.timeout = int(os.environ.get("STEAM_WORKSHOP_SYNC_TIMEOUT", 30))
+        # Steam 社区地址，压测时可以指向本地的模拟服务（spiders/mock_server.py）
+        self.base_url = os.environ.get("STEAM_WORKSHOP_SYNC_BASE_URL", "https://steamcommunity.com").strip().rstrip("/")
         # 请求之间的基础延迟（秒）
         self.request_delay = float(os.environ.get("STEAM_WORKSHOP_SYNC_REQUEST_DELAY", 1.0))
+        # 主列表的排序方式与分区
+        self.browse_sort = os.environ.get("STEAM_WORKSHOP_SYNC_BROWSE_SORT", "mostrecent").strip()
+        self.section = os.environ.get("STEAM_WORKSHOP_SYNC_SECTION", "readytouseitems").strip()
 
         # Steam CMD 配置
         self.steamcmd_path = os.environ.get("STEAM_WORKSHOP_SYNC_STEAMCMD_PATH", "steamcmd")
@@ -29,20 +60,53 @@ class Wrokshop:
         self.steam_username = os.environ.get("STEAM_WORKSHOP_SYNC_STEAM_USERNAME", "anonymous")
         self.steam_password = os.environ.get("STEAM_WORKSHOP_SYNC_STEAM_PASSWORD", "")
         self.steam_guard_code = os.environ.get("STEAM_WORKSHOP_SYNC_STEAM_GUARD_CODE", "")
+        # Steam CMD 临时下载目录（在 steamcmd 目录下）
+        self.steamcmd_install_dir = os.path.abspath(os.path.join(os.path.dirname(self.steamcmd_path), "downloads"))
+
+        # 并发下载设置
+        self.download_workers = int(os.environ.get("STEAM_WORKSHOP_SYNC_DOWNLOAD_WORKERS", 1))
+        self.download_bandwidth_kbps = int(os.environ.get("STEAM_WORKSHOP_SYNC_DOWNLOAD_BANDWIDTH_KBPS", 0))
+        self.worker_bandwidth_kbps = int(os.environ.get("STEAM_WORKSHOP_SYNC_WORKER_BANDWIDTH_KBPS", 0))
+        # 每个 Steam CMD 会话下载的 mod 数量
+        self.download_batch_size = int(os.environ.get("STEAM_WORKSHOP_SYNC_DOWNLOAD_BATCH_SIZE", 1))
+        # 无进展超时（秒）与每个 mod 的总超时（秒）
+        self.download_stall_timeout = float(os.environ.get("STEAM_WORKSHOP_SYNC_DOWNLOAD_STALL_TIMEOUT", 300))
+        self.download_timeout = float(os.environ.get("STEAM_WORKSHOP_SYNC_DOWNLOAD_TIMEOUT", 3600))
+        # 有直链（file_url）的 item 直接通过 HTTP 分段下载，其余仍使用 Steam CMD
+        http_download = os.environ.get("STEAM_WORKSHOP_SYNC_HTTP_DOWNLOAD", "true").strip().lower()
+        self.http_download = http_download in ("1", "true", "yes")
+        self.http_segments = int(os.environ.get("STEAM_WORKSHOP_SYNC_HTTP_SEGMENTS", 4))
+        # 内容寻址存储（可选），设置后下载目录中的 mod 为指向当前版本的符号链接
+        content_store_dir = os.environ.get("STEAM_WORKSHOP_SYNC_CONTENT_STORE_DIR", "").strip()
+        keep_versions = int(os.environ.get("STEAM_WORKSHOP_SYNC_KEEP_VERSIONS", 2))
+        self.content_store = ContentStore(content_store_dir, keep_versions) if content_store_dir else None
+        # 冷数据归档目录（可选）
+        archive_dir = os.environ.get("STEAM_WORKSHOP_SYNC_ARCHIVE_DIR", "").strip()
+        self.cold_archive = None
+        if archive_dir:
+            self.cold_archive = ColdArchive(archive_dir, self.download_dir, store=self.content_store)
+        # 完成下载时并发计算校验和的线程数
+        self.checksum_workers = int(os.environ.get("STEAM_WORKSHOP_SYNC_CHECKSUM_WORKERS", min(os.cpu_count() or 1, 8)))
+        # 完成下载时计算的校验和 {item_id: {相对路径: sha256}}，写入下载清单后移除
+        self.finalized_checksums: dict[str, dict[str, str]] = {}
+        # 下载进度事件回调（可选）
+        self.on_download_event: Callable[[SteamCMDEvent], None] | None = None
 
         # 确保下载目录存在
         Path(self.download_dir).mkdir(parents=True, exist_ok=True)
 
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36",
-            "Referer": "https://steamcommunity.com/workshop/browse/",
+            "Referer": f"{self.base_url}/workshop/browse/",
         }
 
-        self.session = requests.Session()
+        # STEAM_WORKSHOP_SYNC_HTTP_MODE=record/replay 时录制或回放页面请求
+        self.transport = wrap_transport(Transport(TransportConfig.from_env(), proxy_pool=proxy_pool))
+        self.session = self.transport.session
 
     @retry_on_error(
         retry_on_status={
-            429: None,  # 429 无限重试
+            429: None,  # 429 不限次数，受 budget 约束
             500: 3,  # 服务器错误重试3次
             502: 3,
             503: 3,
@@ -51,46 +115,88 @@ class Wrokshop:
         backoff_base=5.0,
         backoff_max=300.0,
         default_retry=False,
+        budget=900.0,
+        on_retry=metrics.record_retry,
     )
-    def _do_request(self, url: str, **kwargs) -> requests.Response:
+    def _do_request(self, url: str, method: str = "GET", **kwargs) -> requests.Response:
         """执行HTTP请求（带重试机制）"""
-        response = self.session.get(url, **kwargs)
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        endpoint = metrics.endpoint_of(url)
+        started = time.perf_counter()
+        with tracing.span("http.request", endpoint=endpoint, app_id=self.appid) as span:
+            try:
+                response = self.transport.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                metrics.REQUEST_SECONDS.labels(endpoint, type(e).__name__).observe(time.perf_counter() - started)
+                raise
+            span.set_attribute("http.status_code", response.status_code)
+        metrics.REQUEST_SECONDS.labels(endpoint, response.status_code).observe(time.perf_counter() - started)
+        if response.status_code == 429:
+            metrics.THROTTLED.labels(endpoint).inc()
         response.raise_for_status()
         return response
 
-    def get_new_items(self, page: int = 1):
+    def get_items(self, page: int = 1, browsesort: str | None = None, section: str | None = None):
+        """
+        获取创意工坊列表页
+
+        Args:
+            page: 页码
+            browsesort: 排序方式（mostrecent、lastupdated 等），默认使用配置的排序方式
+            section: 分区，默认使用配置的分区
+
+        Returns:
+            dict: {"pagination": Pagination, "items": list[WorkshopItem]}
+        """
         start_time = datetime.now()
 
+        browsesort = browsesort or self.browse_sort
         params = {
             "appid": self.appid,
-            "browsesort": "mostrecent",
-            "section": "readytouseitems",
-            "actualsort": "mostrecent",
+            "browsesort": browsesort,
+            "section": section or self.section,
+            "actualsort": browsesort,
             "p": str(page),
         }
 
-        url = "https://steamcommunity.com/workshop/browse/"
+        url = f"{self.base_url}/workshop/browse/"
 
-        logger.info(f"正在请求第 {page} 页: {url}")
-        response = self._do_request(url, params=params, headers=self.headers, timeout=self.timeout)
-        response.encoding = response.apparent_encoding
+        logger.info(f"正在请求第 {page} 页 ({browsesort}): {url}")
+        response = self._do_request(url, params=params, headers=self.headers)
+        ensure_encoding(response)
 
         end_time = datetime.now()
         used_time_ms = int((end_time - start_time).total_seconds() * 1000)
         logger.info(f"爬取第 {page} 页耗时: {used_time_ms}ms")
 
-        return WorkshopParser.parser_items_card(response.text)
+        parse_started = time.perf_counter()
+        result = WorkshopParser.parser_items_card(response.text)
+        metrics.PARSE_SECONDS.labels("listing").observe(time.perf_counter() - parse_started)
+        for item in result["items"]:
+            item.app_id = self.appid
+        return result
+
+    def get_new_items(self, page: int = 1):
+        """获取主列表（默认按创建时间排序）"""
+        return self.get_items(page)
+
+    def get_updated_items(self, page: int = 1):
+        """获取按最后更新时间排序的列表"""
+        return self.get_items(page, browsesort="lastupdated")
 
     def get_items_info(self, item: WorkshopItem):
-        url = f"https://steamcommunity.com/sharedfiles/filedetails/?id={item.id}"
+        url = f"{self.base_url}/sharedfiles/filedetails/?id={item.id}"
 
         # 在每个请求之间添加延迟，避免请求过快
         time.sleep(self.request_delay)
 
-        response = self._do_request(url, headers=self.headers, timeout=self.timeout)
-        response.encoding = response.apparent_encoding
+        response = self._do_request(url, headers=self.headers)
+        ensure_encoding(response)
 
+        parse_started = time.perf_counter()
         description, created_at, updated_at, file_size, images = WorkshopParser.parser_items_info(response.text)
+        metrics.PARSE_SECONDS.labels("details").observe(time.perf_counter() - parse_started)
         item_data = item.model_dump()
         item_data.update(
             {
@@ -99,124 +205,299 @@ class Wrokshop:
                 "updated_at": updated_at,
                 "file_size": file_size,
                 "images": images,
+                "app_id": self.appid,
             }
         )
         return WorkshopItem.model_validate(item_data)
 
-    def download_mod(self, item_id: str) -> bool:
+    def download_mod(
+        self,
+        item_id: str,
+        install_dir: str | None = None,
+        throttle_kbps: int | None = None,
+        validate: bool = False,
+    ) -> bool:
         """
         使用 Steam CMD 下载 Workshop mod
 
         Args:
             item_id: Workshop item ID
+            install_dir: Steam CMD 的 force_install_dir，并发下载时每个 worker 使用独立目录
+            throttle_kbps: 下载限速（KB/s），None 表示不限速
+            validate: 是否让 Steam CMD 校验文件
 
         Returns:
             bool: 下载是否成功
         """
         item_id = item_id.strip()
-        logger.info(f"开始下载 mod: {item_id}")
+        return self.download_mods_batch([item_id], install_dir, throttle_kbps, validate).get(item_id, False)
+
+    def download_mods_batch(
+        self,
+        item_ids: list[str],
+        install_dir: str | None = None,
+        throttle_kbps: int | None = None,
+        validate: bool = False,
+    ) -> dict[str, bool]:
+        """
+        在同一个 Steam CMD 会话中下载多个 Workshop mod
 
-        # Steam CMD 临时下载目录（在 steamcmd 目录下）
-        steamcmd_temp_dir = os.path.abspath(os.path.join(os.path.dirname(self.steamcmd_path), "downloads"))
+        Args:
+            item_ids: Workshop item IDs 列表
+            install_dir: Steam CMD 的 force_install_dir，并发下载时每个 worker 使用独立目录
+            throttle_kbps: 下载限速（KB/s），None 表示不限速
+            validate: 是否让 Steam CMD 校验文件
+
+        Returns:
+            dict: {item_id: success} 的字典
+        """
+        item_ids = [item_id.strip() for item_id in item_ids]
+        logger.info(f"开始下载 mod: {', '.join(item_ids)}")
+
+        steamcmd_temp_dir = install_dir or self.steamcmd_install_dir
         Path(steamcmd_temp_dir).mkdir(parents=True, exist_ok=True)
 
-        # 构建 Steam CMD 命令
-        cmd = [
+        cmd = build_command(
             self.steamcmd_path,
-            "+force_install_dir",
             steamcmd_temp_dir,
-            "+login",
-            self.steam_username,
-        ]
-
-        # 如果有密码，添加密码
-        if self.steam_password:
-            cmd.append(self.steam_password)
-            # 如果有 Steam Guard 代码，添加代码
-            if self.steam_guard_code:
-                cmd.append(self.steam_guard_code)
+            self.appid,
+            item_ids,
+            username=self.steam_username,
+            password=self.steam_password,
+            guard_code=self.steam_guard_code,
+            validate=validate,
+            throttle_kbps=throttle_kbps,
+        )
 
-        # 添加下载命令
-        cmd.extend(["+workshop_download_item", self.appid, item_id, "validate", "+quit"])
+        # SteamCMD 下载 Workshop item 时很少输出进度，用临时目录大小的变化判断是否仍在下载
+        workshop_dir = os.path.join(steamcmd_temp_dir, "steamapps", "workshop")
+        runner = SteamCMDRunner(
+            stall_timeout=self.download_stall_timeout,
+            timeout=self.download_timeout * len(item_ids),
+            on_event=self._handle_download_event,
+            activity_probe=lambda: directory_size(workshop_dir) if os.path.isdir(workshop_dir) else 0,
+        )
 
+        started = time.perf_counter()
         try:
-            logger.info(f"执行 Steam CMD 命令: {' '.join(cmd)}")
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=3600,  # 1小时超时
-            )
+            logger.info(f"执行 Steam CMD 命令，共 {len(item_ids)} 个 mod")
+            result = runner.run(cmd, item_ids)
+        except FileNotFoundError:
+            logger.error(f"未找到 Steam CMD，请检查路径: {self.steamcmd_path}")
+            return dict.fromkeys(item_ids, False)
+        except Exception as e:
+            logger.error(f"mod {', '.join(item_ids)} 下载时发生异常: {e}")
+            return dict.fromkeys(item_ids, False)
+
+        metrics.DOWNLOAD_SECONDS.labels("steamcmd").observe(time.perf_counter() - started)
+        if result.returncode != 0:
+            logger.warning(f"Steam CMD 返回码: {result.returncode}")
 
-            # 检查输出中是否有下载失败的消息
-            output = result.stdout + result.stderr
-            if "ERROR!" in output or "failed" in output.lower():
-                logger.error(f"mod {item_id} 下载失败")
-                logger.debug(f"Steam CMD 输出: {result.stdout}")
-                logger.debug(f"Steam CMD 错误输出: {result.stderr}")
-                return False
-
-            if result.returncode == 0:
-                # 移动文件到目标目录
-                source_dir = os.path.join(steamcmd_temp_dir, "steamapps", "workshop", "content", self.appid, item_id)
-                target_dir = os.path.join(self.download_dir, item_id)
-
-                if os.path.exists(source_dir):
-                    # 如果目标目录已存在，先删除
-                    if os.path.exists(target_dir):
-                        import shutil
-
-                        shutil.rmtree(target_dir)
-                    # 移动目录
-                    import shutil
-
-                    shutil.move(source_dir, target_dir)
-                    logger.info(f"mod {item_id} 已移动到: {target_dir}")
-                    logger.info(f"mod {item_id} 下载成功")
-                    return True
-                else:
-                    logger.warning(f"未找到下载的 mod 文件: {source_dir}")
-                    logger.debug(f"Steam CMD 输出: {result.stdout}")
-                    logger.debug(f"Steam CMD 错误输出: {result.stderr}")
-                    return False
+        results = dict(result.results)
+        for item_id, success in results.items():
+            if success:
+                results[item_id] = self._move_downloaded(item_id, steamcmd_temp_dir)
             else:
-                logger.error(f"mod {item_id} 下载失败，返回码: {result.returncode}")
-                logger.error(f"错误输出: {result.stderr}")
-                return False
+                logger.error(f"mod {item_id} 下载失败: {result.failures.get(item_id)}")
+            metrics.DOWNLOADS.labels("steamcmd", "success" if results[item_id] else "failed").inc()
 
-        except subprocess.TimeoutExpired:
-            logger.error(f"mod {item_id} 下载超时")
-            return False
-        except FileNotFoundError:
-            logger.error(f"未找到 Steam CMD，请检查路径: {self.steamcmd_path}")
+        if not all(results.values()) and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Steam CMD 输出末尾:\n%s", "\n".join(result.tail))
+
+        return results
+
+    def _handle_download_event(self, event: SteamCMDEvent) -> None:
+        """记录 Steam CMD 下载事件，并转发给 on_download_event"""
+        if event.state == "progress":
+            logger.debug(
+                "mod %s 下载进度: %.1f%% (%s/%s)", event.item_id, event.percent, event.bytes_done, event.bytes_total
+            )
+        elif event.state == "error":
+            logger.error(f"Steam CMD 错误 ({event.failure}): {event.line}")
+        if self.on_download_event is not None:
+            self.on_download_event(event)
+
+    def get_file_details(self, item_ids: list[str]) -> dict[str, dict]:
+        """
+        通过 GetPublishedFileDetails 批量查询文件信息（经由带重试、熔断、限流与代理的请求路径）
+
+        Returns:
+            dict: {item_id: 接口返回的详情}，查询失败的 item 不在结果中
+        """
+        response = self._do_request(DETAILS_URL, method="POST", data=file_details_form(item_ids), timeout=self.timeout)
+        return parse_file_details(response)
+
+    def download_direct(self, item_ids: list[str]) -> dict[str, bool]:
+        """
+        通过 HTTP 直链下载 Workshop mod
+
+        只处理详情中带有 file_url 的 item，大文件按 Range 分段并发下载，中断后可从断点继续。
+
+        Args:
+            item_ids: Workshop item IDs 列表
+
+        Returns:
+            dict: {item_id: success}，只包含有直链的 item
+        """
+        details = self.get_file_details(item_ids)
+
+        downloader = RangedDownloader(self.session, segments=self.http_segments, timeout=self.timeout)
+        results = {}
+        for item_id in item_ids:
+            entry = details.get(item_id, {})
+            if not entry.get("file_url"):
+                continue
+
+            source_dir = os.path.join(self.steamcmd_install_dir, "http", item_id)
+            filename = Path(entry.get("filename") or item_id).name
+            size = int(entry["file_size"]) if str(entry.get("file_size", "")).isdigit() else None
+            logger.info(f"通过 HTTP 直接下载 mod {item_id}: {filename}")
+
+            started = time.perf_counter()
+            try:
+                downloader.download(entry["file_url"], os.path.join(source_dir, filename), expected_size=size)
+            except Exception as e:
+                logger.error(f"mod {item_id} HTTP 下载失败: {e}")
+                metrics.DOWNLOADS.labels("http", "failed").inc()
+                results[item_id] = False
+                continue
+
+            metrics.DOWNLOAD_SECONDS.labels("http").observe(time.perf_counter() - started)
+            results[item_id] = self._move_downloaded(item_id, source_dir=source_dir)
+            metrics.DOWNLOADS.labels("http", "success" if results[item_id] else "failed").inc()
+
+        return results
+
+    def _move_downloaded(self, item_id: str, install_dir: str | None = None, source_dir: str | None = None) -> bool:
+        """将 Steam CMD（或 HTTP 直接下载）得到的 mod 移动到下载目录"""
+        if source_dir is None:
+            source_dir = os.path.join(install_dir, "steamapps", "workshop", "content", self.appid, item_id)
+        target_dir = os.path.join(self.download_dir, item_id)
+
+        if not os.path.exists(source_dir):
+            logger.warning(f"未找到下载的 mod 文件: {source_dir}")
             return False
-        except Exception as e:
-            logger.error(f"mod {item_id} 下载时发生异常: {e}")
+
+        try:
+            if self.content_store is not None:
+                checksums = compute_checksums(source_dir, workers=self.checksum_workers)
+                version_dir = self.content_store.ingest(item_id, source_dir, checksums=checksums)
+                self.content_store.activate(version_dir, target_dir)
+                self.content_store.prune(item_id, current=version_dir)
+            else:
+                # 先移动到目标旁边的暂存目录并计算校验和，再原子替换，读者不会看到半写入的目录
+                checksums = finalize_download(source_dir, target_dir, checksum_workers=self.checksum_workers)
+        except OSError as e:
+            logger.error(f"mod {item_id} 移动失败: {e}")
             return False
 
-    def download_mods(self, item_ids: list[str]) -> dict[str, bool]:
+        self.finalized_checksums[item_id] = checksums
+        method = "steamcmd" if install_dir is not None else "http"
+        metrics.DOWNLOAD_BYTES.labels(method).inc(directory_size(target_dir))
+        logger.info(f"mod {item_id} 已移动到: {target_dir}")
+        logger.info(f"mod {item_id} 下载成功")
+        return True
+
+    def download_mods(self, item_ids: list[str], verify: bool = False, force: bool = False) -> dict[str, bool]:
         """
         批量下载 Workshop mods
 
+        根据下载清单跳过本地已是最新版本的 mod，下载成功后更新清单。
+        有 HTTP 直链的 mod 优先直接下载，失败或没有直链时回退到 Steam CMD。
+        STEAM_WORKSHOP_SYNC_DOWNLOAD_BATCH_SIZE 大于 1 时，多个 mod 共用一个 Steam CMD 会话；
+        STEAM_WORKSHOP_SYNC_DOWNLOAD_WORKERS 大于 1 时，多个会话并发执行。
+
         Args:
             item_ids: Workshop item IDs 列表
+            verify: 是否让 Steam CMD 校验文件（validate）
+            force: 是否忽略下载清单，强制重新下载
 
         Returns:
-            dict: {item_id: success} 的字典
+            dict: {item_id: success} 的字典，跳过的 mod 视为成功
         """
+        # 延迟导入，只爬取不下载时无需加载下载清单
+        from downloader.manifest import DownloadManifest
+
+        manifest = DownloadManifest(self.download_dir, archive=self.cold_archive)
         results = {}
-        total = len(item_ids)
 
-        for index, item_id in enumerate(item_ids, 1):
-            logger.info(f"正在下载 {index}/{total}: {item_id}")
-            success = self.download_mod(item_id)
+        if not force:
+            pending = manifest.stale_items(item_ids)
+            pending_ids = set(pending)
+            skipped = [item_id for item_id in item_ids if item_id not in pending_ids]
+            if self.cold_archive is not None:
+                # 最新版本只在归档中时从归档恢复到下载目录，恢复失败则重新下载
+                for item_id in skipped:
+                    if (Path(self.download_dir) / item_id).is_dir() or not self.cold_archive.is_archived(item_id):
+                        continue
+                    try:
+                        restored = self.cold_archive.ensure_local(item_id)
+                    except Exception as e:
+                        logger.warning(f"从归档恢复 mod {item_id} 失败，重新下载: {e}")
+                        restored = None
+                    if restored is None:
+                        pending.append(item_id)
+                pending_ids = set(pending)
+                skipped = [item_id for item_id in skipped if item_id not in pending_ids]
+            if skipped:
+                logger.info(f"跳过 {len(skipped)} 个本地已是最新版本的 mod")
+            results.update(dict.fromkeys(skipped, True))
+            item_ids = pending
+
+        def finish(item_id: str, success: bool) -> None:
+            if success:
+                if self.cold_archive is not None:
+                    # 新版本已在下载目录中，旧版本的归档不再需要
+                    self.cold_archive.discard(item_id)
+                try:
+                    manifest.record(item_id, self.appid, checksums=self.finalized_checksums.pop(item_id, None))
+                except Exception as e:
+                    logger.error(f"记录 mod {item_id} 下载清单失败: {e}")
             results[item_id] = success
 
-            # 下载之间添加延迟，避免请求过快
-            if index < total:
-                time.sleep(self.request_delay)
+        if self.http_download and item_ids:
+            try:
+                direct = self.download_direct(item_ids)
+            except Exception as e:
+                logger.warning(f"查询 mod 直链失败，全部使用 Steam CMD 下载: {e}")
+                direct = {}
+            for item_id, success in direct.items():
+                if success:
+                    finish(item_id, success)
+            # 没有直链或直接下载失败的 mod 回退到 Steam CMD
+            item_ids = [item_id for item_id in item_ids if not direct.get(item_id)]
+
+        total = len(item_ids)
+        batch_size = max(self.download_batch_size, 1)
+        batches = [item_ids[index : index + batch_size] for index in range(0, total, batch_size)]
+        download_batch = functools.partial(self.download_mods_batch, validate=verify)
+
+        if self.download_workers > 1 and len(batches) > 1:
+            with DownloadPool(
+                download_batch,
+                self.steamcmd_install_dir,
+                workers=min(self.download_workers, len(batches)),
+                bandwidth_kbps=self.download_bandwidth_kbps,
+                worker_bandwidth_kbps=self.worker_bandwidth_kbps,
+            ) as pool:
+                for index, (item_id, success) in enumerate(pool.download_all(batches), 1):
+                    finish(item_id, success)
+                    logger.info(f"已完成 {index}/{total}: {item_id} {'成功' if success else '失败'}")
+        else:
+            throttle = worker_throttle(self.download_bandwidth_kbps, self.worker_bandwidth_kbps)
+            for index, batch in enumerate(batches, 1):
+                logger.info(f"正在下载第 {index}/{len(batches)} 批，共 {len(batch)} 个 mod")
+                for item_id, success in download_batch(batch, throttle_kbps=throttle).items():
+                    finish(item_id, success)
+
+                # 下载之间添加延迟，避免请求过快
+                if index < len(batches):
+                    time.sleep(self.request_delay)
+
+        if self.content_store is not None:
+            self.content_store.gc()
 
         success_count = sum(1 for success in results.values() if success)
-        logger.info(f"下载完成: {success_count}/{total} 成功")
+        logger.info(f"下载完成: {success_count}/{len(results)} 成功")
 
         return results
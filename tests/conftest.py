@@ -0,0 +1,34 @@
+import os
+
+from models.workshop import WorkshopItem
+import pytest
+from sqlmodel import SQLModel, create_engine
+
+# database 模块导入时要求设置数据库 URL；需要数据库的测试通过 db fixture 使用各自的 SQLite 数据库
+os.environ.setdefault("STEAM_WORKSHOP_SYNC_DATABASE_URL", "sqlite://")
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """替换 database 模块的引擎为临时目录中的 SQLite 数据库，并创建全部表"""
+    import database
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(database, "engine", engine)
+    yield engine
+    engine.dispose()
+
+
+def make_item(item_id: str = "1", **fields) -> WorkshopItem:
+    """构造测试用的 WorkshopItem，未指定的必填字段使用空值，其余字段通过关键字参数覆盖"""
+    defaults = {
+        "app_id": "1",
+        "url": "",
+        "title": item_id,
+        "coverview_url": "",
+        "author": "",
+        "author_profile": "",
+        "images": [],
+    }
+    return WorkshopItem(id=item_id, **{**defaults, **fields})
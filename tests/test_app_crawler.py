@@ -0,0 +1,155 @@
+"""
+测试 workers.app_crawler 模块中的单 App 爬取流程。
+"""
+
+from datetime import datetime
+import threading
+import time
+
+from database import count_workshop_items
+from models.workshop import Pagination, WorkshopItem
+import pytest
+from tests.conftest import make_item
+import workers.app_crawler as app_crawler
+from workers.app_crawler import AppCrawler
+from workers.fast_lane import KnownItems
+
+
+class StubWorkshop:
+    """按 mostrecent 分页返回固定项目的 Workshop 替身，可以模拟翻页期间项目被删除"""
+
+    def __init__(self, appid: str, item_ids: list[str], log: list, page_size: int = 2):
+        self.appid = appid
+        self.item_ids = list(item_ids)
+        self.log = log
+        self.page_size = page_size
+        # 返回某一页之后删除的项目 {页码: item_id}
+        self.delete_after: dict[int, str] = {}
+        # 获取详情时失败的项目
+        self.broken: set[str] = set()
+
+    def get_new_items(self, page: int = 1):
+        self.log.append((self.appid, page))
+        start = (page - 1) * self.page_size
+        items = [make_item(item_id, app_id=self.appid) for item_id in self.item_ids[start : start + self.page_size]]
+        pagination = Pagination(
+            items_count=len(items),
+            current_page=page,
+            total_pages=-(-len(self.item_ids) // self.page_size),
+            total_entries=len(self.item_ids),
+        )
+        if page in self.delete_after:
+            self.item_ids.remove(self.delete_after.pop(page))
+        return {"pagination": pagination, "items": items}
+
+    def get_items_info(self, item: WorkshopItem):
+        if item.id in self.broken:
+            raise RuntimeError("timeout")
+        return make_item(item.id, app_id=self.appid, created_at=datetime(2024, 1, 1), updated_at=datetime(2024, 6, 1))
+
+
+@pytest.fixture
+def make_crawler(db, tmp_path, monkeypatch):
+    monkeypatch.setenv("STEAM_WORKSHOP_SYNC_DOWNLOAD_DIR", str(tmp_path / "downloads"))
+    known = KnownItems()
+
+    def make(appid: str, workshop: StubWorkshop) -> AppCrawler:
+        crawler = AppCrawler(appid, known, page_delay=0, cycle_delay=60, update_feed_pages=0)
+        crawler.workshop = workshop
+        return crawler
+
+    return make
+
+
+def run_round_robin(crawlers: list[AppCrawler]) -> None:
+    """与主循环相同，每个进行中的 App 轮流推进一页"""
+    cycles = {crawler.appid: crawler.crawl_cycle() for crawler in crawlers}
+    while cycles:
+        for app_id, cycle in list(cycles.items()):
+            try:
+                next(cycle)
+            except StopIteration:
+                del cycles[app_id]
+
+
+class TestAppCrawler:
+    """测试多个 App 的轮转、列表上移回读与统计"""
+
+    def test_round_robin(self, make_crawler):
+        """两个 App 每次各推进一页，各自的统计与下一轮时间互不影响"""
+        log = []
+        first = make_crawler("910", StubWorkshop("910", ["a1", "a2", "a3", "a4", "a5"], log))
+        second = make_crawler("920", StubWorkshop("920", ["b1", "b2", "b3"], log))
+        second.workshop.broken.add("b2")
+
+        before = time.monotonic()
+        run_round_robin([first, second])
+
+        assert log == [("910", 1), ("920", 1), ("910", 2), ("920", 2), ("910", 3)]
+        assert first.stats.model_dump(include={"cycles", "pages", "processed", "changes", "failed"}) == {
+            "cycles": 1,
+            "pages": 3,
+            "processed": 5,
+            "changes": 5,
+            "failed": 0,
+        }
+        assert second.stats.model_dump(include={"cycles", "pages", "processed", "changes", "failed"}) == {
+            "cycles": 1,
+            "pages": 2,
+            "processed": 2,
+            "changes": 2,
+            "failed": 1,
+        }
+        for crawler in (first, second):
+            assert before + 60 <= crawler.next_cycle_at <= time.monotonic() + 60
+        assert first.freshness.known_items == count_workshop_items("910") == 5
+        assert second.freshness.known_items == count_workshop_items("920") == 2
+
+    def test_recover_gap(self, make_crawler):
+        """读取第 1 页后有项目被删除时，回读上一页处理被挤上去的项目"""
+        log = []
+        workshop = StubWorkshop("930", ["a1", "a2", "a3", "a4", "a5", "a6"], log)
+        workshop.delete_after[1] = "a2"
+        crawler = make_crawler("930", workshop)
+
+        run_round_robin([crawler])
+
+        # 第 2 页为 [a4, a5]，总数减少 1 且没有重复项目，回读第 1 页找回 a3
+        assert log == [("930", 1), ("930", 2), ("930", 1), ("930", 3)]
+        assert crawler.stats.pages == 3
+        assert crawler.stats.processed == 6
+        assert crawler.stats.duplicates == 1
+        assert count_workshop_items("930") == 6
+
+    def test_recover_gap_pages(self, make_crawler):
+        """回读的页数按缺口大小计算，且不超过当前页之前的页数"""
+        log = []
+        crawler = make_crawler("940", StubWorkshop("940", [f"a{index}" for index in range(10)], log))
+
+        crawler.recover_gap(page=4, gap=3, page_size=2)
+        assert log == [("940", 3), ("940", 2)]
+
+        log.clear()
+        crawler.recover_gap(page=2, gap=5, page_size=2)
+        assert log == [("940", 1)]
+
+    def test_concurrent_stats(self, make_crawler, monkeypatch):
+        """快速通道线程与主循环同时处理项目时，统计计数不会丢失"""
+        monkeypatch.setattr(app_crawler, "sync_workshop_item", lambda item: (item, True, False))
+        workshop = StubWorkshop("950", [], [])
+        crawler = make_crawler("950", workshop)
+        items = [make_item(f"a{index}", app_id="950") for index in range(200)]
+        barrier = threading.Barrier(4)
+
+        def worker():
+            barrier.wait()
+            crawler.process_items(workshop, items)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = crawler.stats_snapshot()
+        assert stats.processed == stats.changes == 800
@@ -0,0 +1,126 @@
+"""
+测试 downloader.archive 模块中的冷数据归档。
+"""
+
+import os
+
+from downloader import archive as archive_module
+from downloader.archive import CODEC_XZ, CODEC_ZSTD, ColdArchive, compress, decompress
+import pytest
+
+
+def make_mod(download_dir, item_id: str, files: dict[str, bytes]):
+    """在下载目录中创建 mod"""
+    for relative, content in files.items():
+        path = download_dir / item_id / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+    return download_dir / item_id
+
+
+@pytest.fixture
+def cold_archive(tmp_path):
+    return ColdArchive(str(tmp_path / "archive"), str(tmp_path / "downloads"), codec=CODEC_XZ)
+
+
+class TestCodec:
+    """测试压缩编码"""
+
+    def test_xz_roundtrip(self):
+        """测试 xz 压缩与解压"""
+        data = b"mod asset " * 100
+        assert decompress(compress(data, CODEC_XZ), CODEC_XZ) == data
+
+    @pytest.mark.skipif(archive_module._zstd is None, reason="需要 zstd 支持")
+    def test_zstd_roundtrip(self):
+        """测试 zstd 压缩与解压"""
+        data = b"mod asset " * 100
+        assert decompress(compress(data, CODEC_ZSTD), CODEC_ZSTD) == data
+
+    def test_codec_logged(self, tmp_path, monkeypatch):
+        """创建归档时日志输出实际使用的压缩编码，没有 zstd 时提示 xz 较慢"""
+        messages = []
+        monkeypatch.setattr(archive_module.logger, "info", messages.append)
+        monkeypatch.setattr(archive_module, "_zstd", None)
+
+        ColdArchive(str(tmp_path / "archive"), str(tmp_path / "downloads"), codec=CODEC_XZ)
+
+        assert len(messages) == 1
+        assert "xz" in messages[0]
+        assert "zstandard" in messages[0]
+
+    def test_unknown_codec(self):
+        """测试未知的编码"""
+        with pytest.raises(ValueError):
+            compress(b"", "rar")
+
+
+class TestColdArchive:
+    """测试 ColdArchive 类"""
+
+    def test_archive_and_read_member(self, tmp_path, cold_archive, monkeypatch):
+        """测试归档后删除本地目录，并能单独读取某个文件"""
+        # 缩小块大小，覆盖多块文件的读取
+        monkeypatch.setattr(archive_module, "CHUNK_SIZE", 16)
+        big = bytes(range(256)) * 4
+        make_mod(tmp_path / "downloads", "1", {"a.txt": b"hello", "data/big.bin": big})
+
+        index = cold_archive.archive("1")
+
+        assert not (tmp_path / "downloads" / "1").exists()
+        assert cold_archive.is_archived("1")
+        assert sorted(cold_archive.members("1")) == ["a.txt", "data/big.bin"]
+        assert len(index["files"]["data/big.bin"]["chunks"]) == 64
+        assert cold_archive.read_member("1", "data/big.bin") == big
+        assert cold_archive.read_member("1", "a.txt") == b"hello"
+        with pytest.raises(KeyError):
+            cold_archive.read_member("1", "missing")
+
+    def test_rehydrate(self, tmp_path, cold_archive):
+        """测试恢复完整目录并删除归档"""
+        make_mod(tmp_path / "downloads", "1", {"a.txt": b"hello", "sub/b.txt": b"b"})
+        cold_archive.archive("1")
+
+        path = cold_archive.ensure_local("1")
+
+        assert (path / "a.txt").read_bytes() == b"hello"
+        assert (path / "sub" / "b.txt").read_bytes() == b"b"
+        assert not cold_archive.is_archived("1")
+        assert cold_archive.ensure_local("2") is None
+
+    def test_rehydrate_detects_corruption(self, tmp_path, cold_archive):
+        """测试归档损坏时恢复失败且不留下暂存目录"""
+        make_mod(tmp_path / "downloads", "1", {"a.txt": b"hello"})
+        cold_archive.archive("1")
+        index_path = cold_archive.index_path("1")
+        checksum = cold_archive.load_index("1")["files"]["a.txt"]["sha256"]
+        index_path.write_text(index_path.read_text().replace(checksum, "0" * 64))
+
+        with pytest.raises(OSError):
+            cold_archive.rehydrate("1")
+        assert list((tmp_path / "downloads").iterdir()) == []
+
+    def test_archive_idle(self, tmp_path, cold_archive):
+        """测试只归档长时间未访问且未排除的 mod"""
+        downloads = tmp_path / "downloads"
+        for item_id in ("old", "pinned", "recent"):
+            make_mod(downloads, item_id, {"a": item_id.encode()})
+        for item_id in ("old", "pinned"):
+            os.utime(downloads / item_id / "a", (0, 0))
+            os.utime(downloads / item_id, (0, 0))
+
+        assert cold_archive.archive_idle(3600, exclude={"pinned"}) == ["old"]
+        assert sorted(path.name for path in downloads.iterdir() if not path.name.startswith(".")) == [
+            "pinned",
+            "recent",
+        ]
+
+    def test_ensure_local_marks_used(self, tmp_path, cold_archive):
+        """测试通过 ensure_local 使用过的 mod 不会因目录时间陈旧而被归档"""
+        downloads = tmp_path / "downloads"
+        make_mod(downloads, "used", {"a": b"used"})
+        os.utime(downloads / "used" / "a", (0, 0))
+        os.utime(downloads / "used", (0, 0))
+
+        assert cold_archive.ensure_local("used") == downloads / "used"
+        assert cold_archive.archive_idle(3600) == []
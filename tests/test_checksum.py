@@ -0,0 +1,46 @@
+"""
+测试 downloader.checksum 模块中的校验和计算。
+"""
+
+import hashlib
+
+from downloader.checksum import compute_checksums, directory_size, file_checksum
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class TestChecksum:
+    """测试校验和与目录大小计算"""
+
+    def test_file_checksum(self, tmp_path):
+        """测试单个文件的 sha256"""
+        path = tmp_path / "a.bin"
+        path.write_bytes(b"hello")
+        assert file_checksum(path) == sha256(b"hello")
+
+    def test_compute_checksums_nested(self, tmp_path):
+        """测试递归计算并使用 / 分隔的相对路径"""
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "a.txt").write_bytes(b"a")
+        (tmp_path / "sub" / "b.txt").write_bytes(b"bb")
+        assert compute_checksums(tmp_path) == {"a.txt": sha256(b"a"), "sub/b.txt": sha256(b"bb")}
+
+    def test_empty_directory(self, tmp_path):
+        """测试空目录"""
+        assert compute_checksums(tmp_path) == {}
+        assert directory_size(tmp_path) == 0
+
+    def test_directory_size(self, tmp_path):
+        """测试目录总大小"""
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "a.txt").write_bytes(b"a" * 10)
+        (tmp_path / "sub" / "b.txt").write_bytes(b"b" * 5)
+        assert directory_size(tmp_path) == 15
+
+    def test_parallel_matches_serial(self, tmp_path):
+        """测试多线程计算与串行结果一致"""
+        for index in range(20):
+            (tmp_path / f"{index}.bin").write_bytes(bytes([index]) * 1000)
+        assert compute_checksums(tmp_path, workers=4) == compute_checksums(tmp_path)
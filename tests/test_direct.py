@@ -0,0 +1,184 @@
+"""
+测试 downloader.direct 模块中的 HTTP 分段续传下载。
+"""
+
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import re
+import threading
+from urllib.parse import parse_qs
+
+from downloader.direct import DownloadError, RangedDownloader
+import pytest
+from spiders import workshop as workshop_module
+from spiders.workshop import Wrokshop
+from utils import retry
+
+CONTENT = bytes(range(256)) * 400
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """支持 Range 的本地文件服务，可以模拟中途断开与不支持 Range"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.headers.get("Range"))
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range") or "")
+        if match is None or not server.ranged:
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(CONTENT)))
+            self.end_headers()
+            self.wfile.write(CONTENT)
+            return
+
+        start = int(match.group(1))
+        end = int(match.group(2)) if match.group(2) else len(CONTENT) - 1
+        body = CONTENT[start : end + 1]
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{end}/{len(CONTENT)}")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if server.drop_after and len(body) > server.drop_after:
+            # 只发送部分数据后断开连接
+            server.drop_after_bytes, server.drop_after = server.drop_after, 0
+            self.wfile.write(body[: server.drop_after_bytes])
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode())
+        self.server.posts += 1
+        if self.server.post_failures:
+            self.server.post_failures -= 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        ids = [form[key][0] for key in sorted(form) if key.startswith("publishedfileids")]
+        details = [
+            {"publishedfileid": item_id, "result": 1, "file_url": f"http://x/{item_id}" if item_id == "1" else ""}
+            for item_id in ids
+        ] + [{"publishedfileid": "9", "result": 9}]
+        body = json.dumps({"response": {"publishedfiledetails": details}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    httpd.ranged = True
+    httpd.drop_after = 0
+    httpd.requests = []
+    httpd.posts = 0
+    httpd.post_failures = 0
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def url_of(server) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}/file.bin"
+
+
+class TestRangedDownloader:
+    """测试 RangedDownloader 类"""
+
+    def test_parallel_segments(self, tmp_path, server):
+        """测试大文件拆分为多个分段下载并校验"""
+        downloader = RangedDownloader(segments=4, min_segment_size=10000)
+        dest = tmp_path / "file.bin"
+
+        checksum = downloader.download(url_of(server), dest, expected_size=len(CONTENT))
+
+        assert dest.read_bytes() == CONTENT
+        assert checksum == hashlib.sha256(CONTENT).hexdigest()
+        assert not (tmp_path / "file.bin.part").exists()
+        assert not (tmp_path / "file.bin.part.json").exists()
+        # 1 次探测 + 4 个分段
+        assert len(server.requests) == 5
+
+    def test_resume_after_interruption(self, tmp_path, server):
+        """测试连接中断后从断点继续"""
+        server.drop_after = 70000
+        downloader = RangedDownloader(segments=1)
+        dest = tmp_path / "file.bin"
+
+        downloader.download(url_of(server), dest)
+
+        assert dest.read_bytes() == CONTENT
+        # 中断前已完整收到一个 64 KiB 的块
+        assert server.requests[-1] == f"bytes=65536-{len(CONTENT) - 1}"
+
+    def test_resume_from_sidecar(self, tmp_path, server):
+        """测试根据上次留下的 .part 与进度文件续传"""
+        dest = tmp_path / "file.bin"
+        part = tmp_path / "file.bin.part"
+        part.write_bytes(CONTENT[:5000] + b"\0" * (len(CONTENT) - 5000))
+        state = {"url": url_of(server), "size": len(CONTENT), "segments": [[0, len(CONTENT) - 1, 5000]]}
+        (tmp_path / "file.bin.part.json").write_text(json.dumps(state))
+
+        RangedDownloader(segments=1).download(url_of(server), dest)
+
+        assert dest.read_bytes() == CONTENT
+        assert server.requests[-1] == f"bytes=5000-{len(CONTENT) - 1}"
+
+    def test_without_range_support(self, tmp_path, server):
+        """测试服务器不支持 Range 时整体下载"""
+        server.ranged = False
+        dest = tmp_path / "file.bin"
+
+        RangedDownloader().download(url_of(server), dest)
+
+        assert dest.read_bytes() == CONTENT
+
+    def test_verification_failures(self, tmp_path, server):
+        """测试大小或 sha256 不匹配时报错且不留下文件"""
+        dest = tmp_path / "file.bin"
+        with pytest.raises(DownloadError):
+            RangedDownloader().download(url_of(server), dest, expected_size=1)
+        with pytest.raises(DownloadError):
+            RangedDownloader().download(url_of(server), dest, expected_sha256="0" * 64)
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestFileDetails:
+    """测试 Wrokshop.get_file_details 查询文件信息"""
+
+    @pytest.fixture
+    def workshop(self, server, tmp_path, monkeypatch):
+        monkeypatch.setenv("STEAM_WORKSHOP_SYNC_DOWNLOAD_DIR", str(tmp_path / "downloads"))
+        monkeypatch.setattr(workshop_module, "DETAILS_URL", url_of(server))
+        monkeypatch.setattr(retry.time, "sleep", lambda seconds: None)
+        monkeypatch.setattr(retry, "_breakers", {})
+        workshop = Wrokshop("1")
+        yield workshop
+        workshop.transport.close()
+
+    def test_details(self, workshop):
+        """测试批量查询并忽略失败的 item"""
+        details = workshop.get_file_details(["1", "2"])
+
+        assert sorted(details) == ["1", "2"]
+        assert details["1"]["file_url"] == "http://x/1"
+        assert details["2"]["file_url"] == ""
+
+    def test_workshop_retries(self, workshop, server):
+        """测试查询经由带重试的请求路径，服务端错误后重试成功"""
+        server.post_failures = 1
+
+        details = workshop.get_file_details(["1", "2"])
+
+        assert sorted(details) == ["1", "2"]
+        assert server.posts == 2
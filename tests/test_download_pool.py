@@ -0,0 +1,92 @@
+"""
+测试 downloader.pool 模块中的并发下载池。
+"""
+
+import threading
+import time
+
+import pytest
+from downloader.pool import DownloadPool
+
+
+class TestDownloadPool:
+    """测试 DownloadPool"""
+
+    def test_invalid_workers(self, tmp_path):
+        """测试 worker 数必须大于等于 1"""
+        with pytest.raises(ValueError):
+            DownloadPool(lambda *_: True, str(tmp_path), workers=0)
+
+    def test_isolated_install_dirs(self, tmp_path):
+        """测试并发执行的下载不会共享安装目录"""
+        lock = threading.Lock()
+        in_use = set()
+        used = set()
+
+        def download(item_ids, install_dir, throttle_kbps):
+            with lock:
+                assert install_dir not in in_use
+                in_use.add(install_dir)
+                used.add(install_dir)
+            time.sleep(0.02)
+            with lock:
+                in_use.discard(install_dir)
+            return {item_id: item_id != "bad" for item_id in item_ids}
+
+        with DownloadPool(download, str(tmp_path), workers=3) as pool:
+            results = dict(pool.download_all([["1"], ["2", "3"], ["4"], ["bad", "6"]]))
+
+        assert results == {"1": True, "2": True, "3": True, "4": True, "bad": False, "6": True}
+        assert len(used) <= 3
+        assert all(path.startswith(str(tmp_path.resolve())) for path in used)
+
+    def test_exception_reported_as_failure(self, tmp_path):
+        """测试下载函数抛出异常时结果为失败"""
+
+        def download(item_ids, install_dir, throttle_kbps):
+            raise RuntimeError("boom")
+
+        with DownloadPool(download, str(tmp_path), workers=2) as pool:
+            assert dict(pool.download_all([["1", "2"]])) == {"1": False, "2": False}
+
+    @pytest.mark.parametrize(
+        ("total", "per_worker", "workers", "expected"),
+        [
+            (0, 0, 2, None),  # 不限速
+            (1000, 0, 4, 250),  # 总带宽均分
+            (1000, 100, 2, 100),  # 单 worker 上限更小
+            (0, 300, 3, 300),  # 仅单 worker 上限
+            (500, 1000, 1, 500),  # 串行下载时总带宽上限更小
+        ],
+    )
+    def test_worker_throttle(self, tmp_path, total, per_worker, workers, expected):
+        """测试单个 worker 的限速计算"""
+        pool = DownloadPool(
+            lambda *_: True, str(tmp_path), workers=workers, bandwidth_kbps=total, worker_bandwidth_kbps=per_worker
+        )
+        assert pool.worker_throttle() == expected
+        pool.shutdown()
+
+    def test_concurrent_throttle_within_total(self, tmp_path):
+        """测试并发运行的 worker 的限速之和不超过总带宽上限"""
+        lock = threading.Lock()
+        running = {}
+        peak = []
+        started = threading.Barrier(3)
+
+        def download(item_ids, install_dir, throttle_kbps):
+            with lock:
+                running[install_dir] = throttle_kbps
+            started.wait(timeout=5)
+            with lock:
+                peak.append(sum(running.values()))
+            started.wait(timeout=5)
+            with lock:
+                del running[install_dir]
+            return dict.fromkeys(item_ids, True)
+
+        with DownloadPool(download, str(tmp_path), workers=3, bandwidth_kbps=1000) as pool:
+            results = dict(pool.download_all([["1"], ["2"], ["3"]]))
+
+        assert results == {"1": True, "2": True, "3": True}
+        assert max(peak) <= 1000
@@ -0,0 +1,171 @@
+"""
+测试 downloader.scheduler 模块中的下载队列与磁盘配额淘汰。
+"""
+
+import os
+
+from downloader.archive import CODEC_XZ, ColdArchive
+from downloader.scheduler import PRIORITY_SIZE, DownloadScheduler, parse_pinned, parse_quota
+from downloader.usage import mark_used
+import pytest
+from tests.conftest import make_item
+
+
+class FakeDownloader:
+    """在下载目录中写入指定大小的文件，模拟下载"""
+
+    def __init__(self, download_dir, sizes: dict[str, int]):
+        self.download_dir = download_dir
+        self.sizes = sizes
+        self.calls = []
+
+    def __call__(self, app_id: str, item_ids: list[str]) -> dict[str, bool]:
+        self.calls.append((app_id, item_ids))
+        for item_id in item_ids:
+            path = self.download_dir / item_id
+            path.mkdir(parents=True, exist_ok=True)
+            (path / "data").write_bytes(b"x" * self.sizes.get(item_id, 1))
+        return dict.fromkeys(item_ids, True)
+
+
+def make_local_mod(download_dir, item_id: str, size: int, last_used: float):
+    """创建已下载的 mod，并设置最近使用时间"""
+    path = download_dir / item_id
+    path.mkdir(parents=True)
+    (path / "data").write_bytes(b"x" * size)
+    os.utime(path / "data", (last_used, last_used))
+    os.utime(path, (last_used, last_used))
+
+
+class TestDownloadQueue:
+    """测试下载队列的排序"""
+
+    def test_pinned_then_rating(self, tmp_path):
+        """测试置顶项目优先，其余按评分从高到低"""
+        scheduler = DownloadScheduler(FakeDownloader(tmp_path, {}), str(tmp_path), pinned={"c"})
+        scheduler.enqueue(make_item("a", rating=3))
+        scheduler.enqueue(make_item("b", rating=5))
+        scheduler.enqueue(make_item("c", rating=1))
+
+        order = [scheduler.next_batch()[0].item_id for _ in range(3)]
+        assert order == ["c", "b", "a"]
+        assert scheduler.next_batch() == []
+
+    def test_size_priority(self, tmp_path):
+        """测试按大小排序时小文件优先"""
+        scheduler = DownloadScheduler(FakeDownloader(tmp_path, {}), str(tmp_path), priority=PRIORITY_SIZE)
+        scheduler.enqueue(make_item("big", file_size=100))
+        scheduler.enqueue(make_item("small", file_size=1))
+
+        assert scheduler.next_batch()[0].item_id == "small"
+
+    def test_requeue_replaces_entry(self, tmp_path):
+        """测试重复加入的项目只保留最新的一条"""
+        scheduler = DownloadScheduler(FakeDownloader(tmp_path, {}), str(tmp_path))
+        scheduler.enqueue(make_item("a", rating=1))
+        scheduler.enqueue(make_item("b", rating=2))
+        scheduler.enqueue(make_item("a", rating=3))
+
+        assert len(scheduler) == 2
+        assert [task.item_id for task in scheduler.next_batch()] == ["a"]
+        assert [task.item_id for task in scheduler.next_batch()] == ["b"]
+
+    def test_batch_groups_same_app(self, tmp_path):
+        """测试同一批只包含同一个 App 的项目"""
+        scheduler = DownloadScheduler(FakeDownloader(tmp_path, {}), str(tmp_path), batch_size=3)
+        scheduler.enqueue(make_item("a", app_id="1", rating=3))
+        scheduler.enqueue(make_item("b", app_id="2", rating=2))
+        scheduler.enqueue(make_item("c", app_id="1", rating=1))
+
+        assert [task.item_id for task in scheduler.next_batch()] == ["a", "c"]
+        assert [task.item_id for task in scheduler.next_batch()] == ["b"]
+
+    def test_parse_pinned(self):
+        """测试解析置顶列表"""
+        assert parse_pinned(" 1, 2,,3 ") == {"1", "2", "3"}
+        assert parse_pinned("") == set()
+
+    def test_parse_quota(self):
+        """配额支持 B 到 TB 以及 KiB 形式，无法识别时报错"""
+        assert parse_quota("0") == 0
+        assert parse_quota("1024") == 1024
+        assert parse_quota("512 B") == 512
+        assert parse_quota("1.5 TB") == int(1.5 * 1024**4)
+        assert parse_quota("500gb") == 500 * 1024**3
+        assert parse_quota(" 800 GiB ") == 800 * 1024**3
+        assert parse_quota("64KiB") == 64 * 1024
+        for value in ("", "1.5 PB", "1,5 TB", "GB", "-1 GB", "10 bytes"):
+            with pytest.raises(ValueError):
+                parse_quota(value)
+
+
+class TestDiskQuota:
+    """测试磁盘配额与 LRU 淘汰"""
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        """测试淘汰最久未使用的未置顶 mod"""
+        make_local_mod(tmp_path, "old", 40, 100)
+        make_local_mod(tmp_path, "pinned", 40, 50)
+        make_local_mod(tmp_path, "recent", 40, 200)
+        downloader = FakeDownloader(tmp_path, {"new": 30})
+        scheduler = DownloadScheduler(downloader, str(tmp_path), quota_bytes=140, pinned={"pinned"})
+
+        scheduler.enqueue(make_item("new", file_size=30))
+        assert scheduler.run_batch(scheduler.next_batch()) == {"new": True}
+
+        assert not (tmp_path / "old").exists()
+        assert (tmp_path / "pinned").exists()
+        assert (tmp_path / "recent").exists()
+        assert scheduler.usage() == 110
+
+    def test_use_refreshes_lru(self, tmp_path):
+        """测试读取 mod 中的文件或显式记录使用都会更新 LRU 顺序，而不是按下载顺序淘汰"""
+        make_local_mod(tmp_path, "read", 40, 100)
+        make_local_mod(tmp_path, "marked", 40, 150)
+        make_local_mod(tmp_path, "idle", 40, 200)
+        # 读取文件更新 atime（不依赖挂载选项，直接设置）
+        os.utime(tmp_path / "read" / "data", (300, 100))
+        mark_used(tmp_path, "marked", when=400)
+        downloader = FakeDownloader(tmp_path, {"new": 30})
+        scheduler = DownloadScheduler(downloader, str(tmp_path), quota_bytes=140)
+
+        scheduler.enqueue(make_item("new", file_size=30))
+        assert scheduler.run_batch(scheduler.next_batch()) == {"new": True}
+
+        assert not (tmp_path / "idle").exists()
+        assert (tmp_path / "read").exists()
+        assert (tmp_path / "marked").exists()
+
+    def test_skips_when_quota_cannot_fit(self, tmp_path):
+        """测试只有置顶 mod 时无法腾出空间则跳过下载"""
+        make_local_mod(tmp_path, "pinned", 40, 100)
+        downloader = FakeDownloader(tmp_path, {})
+        scheduler = DownloadScheduler(downloader, str(tmp_path), quota_bytes=50, pinned={"pinned"})
+
+        scheduler.enqueue(make_item("new", file_size=30))
+        assert scheduler.run_batch(scheduler.next_batch()) == {"new": False}
+        assert downloader.calls == []
+
+    def test_redownload_counts_only_growth(self, tmp_path):
+        """测试重新下载已有 mod 时只计算增量，且不会淘汰自身"""
+        make_local_mod(tmp_path, "a", 40, 100)
+        downloader = FakeDownloader(tmp_path, {"a": 45})
+        scheduler = DownloadScheduler(downloader, str(tmp_path), quota_bytes=50)
+
+        scheduler.enqueue(make_item("a", file_size=45))
+        assert scheduler.run_batch(scheduler.next_batch()) == {"a": True}
+        assert scheduler.usage() == 45
+
+    def test_evicts_to_cold_archive(self, tmp_path):
+        """测试设置了归档时淘汰的 mod 被压缩归档而不是删除"""
+        downloads = tmp_path / "downloads"
+        make_local_mod(downloads, "old", 40, 100)
+        archive = ColdArchive(str(tmp_path / "archive"), str(downloads), codec=CODEC_XZ)
+        downloader = FakeDownloader(downloads, {"new": 30})
+        scheduler = DownloadScheduler(downloader, str(downloads), quota_bytes=50, archive=archive)
+
+        scheduler.enqueue(make_item("new", file_size=30))
+        assert scheduler.run_batch(scheduler.next_batch()) == {"new": True}
+
+        assert not (downloads / "old").exists()
+        assert archive.read_member("old", "data") == b"x" * 40
@@ -0,0 +1,57 @@
+"""
+测试 workers.fast_lane 模块中的首页快速通道。
+"""
+
+from models.workshop import Pagination
+from tests.conftest import make_item
+from workers.fast_lane import FastLane, KnownItems
+
+
+class FakeWorkshop:
+    """只返回固定首页内容的 Workshop 替身"""
+
+    def __init__(self, item_ids: list[str]):
+        self.item_ids = item_ids
+        self.requested_pages = []
+
+    def get_new_items(self, page: int = 1):
+        self.requested_pages.append(page)
+        items = [make_item(item_id) for item_id in self.item_ids]
+        return {"pagination": Pagination(items_count=len(items)), "items": items}
+
+
+class TestKnownItems:
+    """测试 KnownItems 集合"""
+
+    def test_claim(self):
+        """测试只有首次 claim 返回 True"""
+        known = KnownItems(["1"])
+        assert not known.claim("1")
+        assert known.claim("2")
+        assert not known.claim("2")
+        assert len(known) == 2
+
+    def test_discard_allows_reclaim(self):
+        """测试 discard 后可以重新 claim"""
+        known = KnownItems()
+        known.claim("1")
+        known.discard("1")
+        assert "1" not in known
+        assert known.claim("1")
+
+
+class TestFastLane:
+    """测试 FastLane 轮询逻辑"""
+
+    def test_poll_once_enqueues_only_new_items(self):
+        """测试只把未知项目放入详情队列"""
+        workshop = FakeWorkshop(["3", "2", "1"])
+        fast_lane = FastLane(workshop, KnownItems(["1", "2"]), lambda *_: 1, interval=1.0)
+
+        assert fast_lane.poll_once() == 1
+        assert workshop.requested_pages == [1]
+        assert fast_lane.queue.get_nowait().id == "3"
+
+        # 再次轮询不会重复推送
+        assert fast_lane.poll_once() == 0
+        assert fast_lane.queue.empty()
@@ -0,0 +1,70 @@
+"""
+测试 downloader.finalize 模块中的暂存与原子替换。
+"""
+
+import hashlib
+
+from downloader import finalize
+from downloader.finalize import finalize_download, swap_directory
+
+
+def make_dir(path, files: dict[str, bytes]):
+    """创建包含指定文件的目录"""
+    path.mkdir(parents=True)
+    for name, content in files.items():
+        (path / name).write_bytes(content)
+    return path
+
+
+class TestFinalizeDownload:
+    """测试 finalize_download 函数"""
+
+    def test_new_target(self, tmp_path):
+        """测试目标不存在时直接移动，并返回校验和清单"""
+        source = make_dir(tmp_path / "steamcmd" / "1", {"a.txt": b"a"})
+        target = tmp_path / "downloads" / "1"
+        target.parent.mkdir()
+
+        checksums = finalize_download(source, target, checksum_workers=2)
+
+        assert checksums == {"a.txt": hashlib.sha256(b"a").hexdigest()}
+        assert (target / "a.txt").read_bytes() == b"a"
+        assert not source.exists()
+
+    def test_replaces_existing_target(self, tmp_path):
+        """测试替换已有目录后不留下暂存或旧目录"""
+        source = make_dir(tmp_path / "steamcmd" / "1", {"new.txt": b"new"})
+        target = make_dir(tmp_path / "downloads" / "1", {"old.txt": b"old"})
+
+        finalize_download(source, target)
+
+        assert [path.name for path in target.iterdir()] == ["new.txt"]
+        assert [path.name for path in target.parent.iterdir()] == ["1"]
+
+
+class TestSwapDirectory:
+    """测试 swap_directory 函数"""
+
+    def test_fallback_without_exchange(self, tmp_path, monkeypatch):
+        """测试不支持原子交换时退化为两次重命名"""
+        monkeypatch.setattr(finalize, "exchange_paths", lambda first, second: False)
+        staging = make_dir(tmp_path / ".1.staging", {"new.txt": b"new"})
+        target = make_dir(tmp_path / "1", {"old.txt": b"old"})
+
+        swap_directory(staging, target)
+
+        assert [path.name for path in target.iterdir()] == ["new.txt"]
+        assert [path.name for path in tmp_path.iterdir()] == ["1"]
+
+    def test_replaces_symlink(self, tmp_path):
+        """测试目标为符号链接（曾使用内容存储）时替换为普通目录"""
+        version = make_dir(tmp_path / "version", {"old.txt": b"old"})
+        target = tmp_path / "1"
+        target.symlink_to(version, target_is_directory=True)
+        staging = make_dir(tmp_path / ".1.staging", {"new.txt": b"new"})
+
+        swap_directory(staging, target)
+
+        assert not target.is_symlink()
+        assert [path.name for path in target.iterdir()] == ["new.txt"]
+        assert (version / "old.txt").exists()
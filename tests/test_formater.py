@@ -2,10 +2,10 @@
 测试 utils.formater 模块中的格式化函数。
 """
 
-from datetime import datetime
+from datetime import UTC, datetime, timedelta
 
 import pytest
-from utils.formater import date_formater, file_size_formater, image_url_formater
+from utils.formater import date_formater, file_size_formater, image_url_formater, utcnow
 
 
 class TestDateFormater:
@@ -320,6 +320,16 @@ class TestEdgeCases:
         assert image_url_formater(url) == url
 
 
+class TestUtcnow:
+    """测试 utcnow 函数"""
+
+    def test_naive_utc(self):
+        """返回不带时区的 UTC 时间，可以直接与数据库中的时间比较"""
+        now = utcnow()
+        assert now.tzinfo is None
+        assert abs(now - datetime.now(UTC).replace(tzinfo=None)) < timedelta(seconds=5)
+
+
 if __name__ == "__main__":
     # 运行测试
     pytest.main([__file__, "-v", "--tb=short"])
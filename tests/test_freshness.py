@@ -0,0 +1,151 @@
+"""
+测试 utils.freshness 模块中的新鲜度延迟统计。
+"""
+
+from datetime import datetime, timedelta
+import math
+
+from tests import conftest
+from utils.freshness import (
+    TIER_BACKFILL,
+    TIER_FAST_LANE,
+    TIER_FULL_CRAWL,
+    FreshnessTracker,
+    format_lag,
+    percentile,
+)
+from utils.formater import utcnow
+from utils.metrics import FRESHNESS_LAG, UNSEEN_ITEMS
+
+SYNCED_AT = datetime(2024, 6, 1, 12, 0)
+
+
+def make_item(updated_minutes_ago=None, created_minutes_ago=600):
+    return conftest.make_item(
+        created_at=SYNCED_AT - timedelta(minutes=created_minutes_ago) if created_minutes_ago is not None else None,
+        updated_at=SYNCED_AT - timedelta(minutes=updated_minutes_ago) if updated_minutes_ago is not None else None,
+    )
+
+
+class TestPercentile:
+    """测试分位数计算"""
+
+    def test_nearest_rank(self):
+        """最近秩法取值"""
+        values = list(range(1, 101))
+        assert percentile(values, 0.5) == 50
+        assert percentile(values, 0.9) == 90
+        assert percentile(values, 0.99) == 99
+        assert percentile([7], 0.99) == 7
+
+    def test_empty(self):
+        """没有样本时为 nan"""
+        assert math.isnan(percentile([], 0.5))
+
+    def test_format_lag(self):
+        """按量级选择单位"""
+        assert format_lag(42) == "42秒"
+        assert format_lag(90) == "1.5分钟"
+        assert format_lag(7200) == "2.0小时"
+        assert format_lag(86400 * 3) == "3.0天"
+        assert format_lag(math.nan) == "-"
+
+
+class TestFreshnessTracker:
+    """测试新鲜度追踪"""
+
+    def test_lag(self):
+        """使用 updated_at，未更新过的项目使用 created_at，负值按 0 计"""
+        tracker = FreshnessTracker("test-lag")
+        assert tracker.lag(make_item(updated_minutes_ago=5), SYNCED_AT) == 300
+        assert tracker.lag(make_item(created_minutes_ago=10), SYNCED_AT) == 600
+        assert tracker.lag(make_item(updated_minutes_ago=-5), SYNCED_AT) == 0
+        assert tracker.lag(make_item(created_minutes_ago=None), SYNCED_AT) is None
+
+    def test_utc_offset(self):
+        """Steam 时间按偏移换算到 UTC"""
+        tracker = FreshnessTracker("test-offset", utc_offset=-8)
+        # UTC-8 的 03:55 即 UTC 的 11:55
+        item = make_item(updated_minutes_ago=5)
+        item.updated_at -= timedelta(hours=8)
+        assert tracker.lag(item, SYNCED_AT) == 300
+
+    def test_percentiles_per_tier(self):
+        """按通道分别统计，也可以合并统计"""
+        tracker = FreshnessTracker("test-tiers")
+        for minutes in range(1, 11):
+            tracker.observe(make_item(updated_minutes_ago=minutes), TIER_FAST_LANE, SYNCED_AT)
+        tracker.observe(make_item(updated_minutes_ago=600), TIER_FULL_CRAWL, SYNCED_AT)
+
+        assert tracker.percentiles(TIER_FAST_LANE)[0.5] == 300
+        assert tracker.percentiles(TIER_FULL_CRAWL)[0.5] == 36000
+        assert tracker.percentiles()[0.99] == 36000
+        assert math.isnan(tracker.percentiles("update_feed")[0.5])
+
+    def test_window(self):
+        """只保留最近 window 个样本"""
+        tracker = FreshnessTracker("test-window", window=3)
+        for minutes in (100, 1, 1, 1):
+            tracker.observe(make_item(updated_minutes_ago=minutes), TIER_FULL_CRAWL, SYNCED_AT)
+        assert tracker.percentiles(TIER_FULL_CRAWL)[0.99] == 60
+        assert tracker.report()["tiers"][TIER_FULL_CRAWL]["observed"] == 4
+
+    def test_unseen(self):
+        """未同步项目数为列表总数减去已入库数，未知时为 None"""
+        tracker = FreshnessTracker("test-unseen")
+        assert tracker.unseen is None
+        tracker.total_entries = 120
+        tracker.known_items = 100
+        assert tracker.unseen == 20
+        tracker.known_items = 130
+        assert tracker.unseen == 0
+
+    def test_metrics(self):
+        """分位数与未同步项目数以指标暴露"""
+        tracker = FreshnessTracker("test-metrics")
+        tracker.observe(make_item(updated_minutes_ago=2), TIER_FAST_LANE, SYNCED_AT)
+        tracker.total_entries, tracker.known_items = 10, 4
+        assert FRESHNESS_LAG.labels("test-metrics", TIER_FAST_LANE, "0.9").get() == 120
+        assert UNSEEN_ITEMS.labels("test-metrics").get() == 6
+
+    def test_summary(self):
+        """摘要按通道列出分位数与未同步项目数"""
+        tracker = FreshnessTracker("test-summary")
+        assert tracker.summary() == "暂无变更；估计未同步项目 未知"
+        tracker.observe(make_item(updated_minutes_ago=2), TIER_FAST_LANE, SYNCED_AT)
+        tracker.total_entries, tracker.known_items = 10, 4
+        assert tracker.summary() == "fast_lane p50=2.0分钟 p90=2.0分钟 p99=2.0分钟（1 次）；估计未同步项目 6 个"
+
+    def test_backfill(self):
+        """首次同步、变更早于追踪开始的项目记在 backfill 通道，不计入合并统计"""
+        tracker = FreshnessTracker("test-backfill")
+        tracker.observe(make_item(updated_minutes_ago=600), TIER_FULL_CRAWL, SYNCED_AT, first_sync=True)
+        tracker.observe(make_item(updated_minutes_ago=2), TIER_FULL_CRAWL, SYNCED_AT)
+
+        assert tracker.report()["tiers"][TIER_BACKFILL]["observed"] == 1
+        assert tracker.report()["tiers"][TIER_FULL_CRAWL]["observed"] == 1
+        assert tracker.percentiles()[0.99] == 120
+
+    def test_backfill_previous_cycle(self):
+        """首次同步的项目以上一轮开始时间区分历史数据与新发布的项目"""
+        tracker = FreshnessTracker("test-backfill-cycle")
+        tracker.start_cycle(SYNCED_AT - timedelta(hours=2))
+        tracker.start_cycle(SYNCED_AT - timedelta(hours=1))
+        assert tracker.previous_cycle_started == SYNCED_AT - timedelta(hours=2)
+
+        # 上一轮开始之后发布的新项目照常统计
+        tracker.observe(make_item(created_minutes_ago=90), TIER_FULL_CRAWL, SYNCED_AT, first_sync=True)
+        # 上一轮开始之前就存在、直到现在才首次同步的项目
+        tracker.observe(make_item(created_minutes_ago=150), TIER_FULL_CRAWL, SYNCED_AT, first_sync=True)
+        # 已同步过的项目的更新不受影响
+        tracker.observe(make_item(updated_minutes_ago=150), TIER_FULL_CRAWL, SYNCED_AT)
+
+        assert tracker.report()["tiers"][TIER_FULL_CRAWL]["observed"] == 2
+        assert tracker.report()["tiers"][TIER_BACKFILL]["observed"] == 1
+
+    def test_default_synced_at(self):
+        """未指定入库时间时使用当前 UTC 时间，与数据库中不带时区的时间比较"""
+        tracker = FreshnessTracker("test-now")
+        item = make_item()
+        item.updated_at = utcnow() - timedelta(minutes=5)
+        assert 300 <= tracker.observe(item, TIER_FAST_LANE) < 360
@@ -0,0 +1,108 @@
+"""
+测试 utils.log 模块中的日志配置、JSON 格式与限频。
+"""
+
+import json
+import logging
+
+import pytest
+from utils import log
+from utils.log import JsonFormatter, RateLimitFilter, configure_logging, get_logger
+
+
+@pytest.fixture
+def restore_logging():
+    yield
+    configure_logging(level="INFO", fmt="text", rate=0)
+
+
+def make_record(msg="处理项目: %s", args=("a",), level=logging.INFO, lineno=10, **extra):
+    record = logging.LogRecord("test", level, "/app/worker.py", lineno, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class TestRateLimitFilter:
+    """测试按调用位置限频"""
+
+    def test_limits_per_site(self):
+        """同一位置超出令牌数的日志被丢弃，不同位置互不影响"""
+        limiter = RateLimitFilter(rate=1, burst=3)
+        passed = [limiter.filter(make_record()) for _ in range(10)]
+        assert passed.count(True) == 3
+        assert limiter.filter(make_record(lineno=20))
+
+    def test_warning_not_limited(self):
+        """WARNING 及以上的日志不受限制"""
+        limiter = RateLimitFilter(rate=1, burst=1)
+        assert all(limiter.filter(make_record(level=logging.WARNING)) for _ in range(10))
+
+    def test_reports_suppressed(self, monkeypatch):
+        """令牌恢复后放行的日志注明省略的条数"""
+        now = [100.0]
+        monkeypatch.setattr(log.time, "monotonic", lambda: now[0])
+        limiter = RateLimitFilter(rate=1, burst=1)
+        assert limiter.filter(make_record())
+        assert not limiter.filter(make_record())
+        assert not limiter.filter(make_record())
+        now[0] += 1
+        record = make_record()
+        assert limiter.filter(record)
+        assert record.getMessage() == "处理项目: a（此前省略 2 条）"
+
+    def test_disabled(self):
+        """rate 为 0 时不限制"""
+        limiter = RateLimitFilter(rate=0)
+        assert all(limiter.filter(make_record()) for _ in range(100))
+
+
+class TestJsonFormatter:
+    """测试 JSON 日志格式"""
+
+    def test_format(self):
+        """输出一行 JSON，包含级别、logger、消息与 extra 字段"""
+        data = json.loads(JsonFormatter().format(make_record(app_id="294100")))
+        assert data["level"] == "INFO"
+        assert data["logger"] == "test"
+        assert data["message"] == "处理项目: a"
+        assert data["app_id"] == "294100"
+        assert "args" not in data
+
+    def test_exception(self):
+        """异常堆栈放在 exception 字段中"""
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            record = logging.LogRecord("test", logging.ERROR, __file__, 1, "失败", None, __import__("sys").exc_info())
+        data = json.loads(JsonFormatter().format(record))
+        assert "RuntimeError: boom" in data["exception"]
+
+
+class TestConfigureLogging:
+    """测试日志配置"""
+
+    def test_level_gating(self, restore_logging):
+        """级别在 logger 上判断，低于级别的日志不会创建记录"""
+        logger = get_logger("tests.level")
+        configure_logging(level="WARNING", fmt="text", rate=0)
+        assert not logger.isEnabledFor(logging.INFO)
+        assert logger.isEnabledFor(logging.WARNING)
+        configure_logging(level="DEBUG", fmt="text", rate=0)
+        assert logger.isEnabledFor(logging.DEBUG)
+
+    def test_same_logger(self):
+        """同名 logger 只添加一次队列 handler"""
+        assert get_logger("tests.same") is get_logger("tests.same")
+        assert get_logger("tests.same").handlers == [log.queue_handler]
+
+    def test_json_format(self, restore_logging):
+        """json 格式替换终端 handler 的格式化器"""
+        configure_logging(level="INFO", fmt="json", rate=0)
+        assert isinstance(log.handler.formatter, JsonFormatter)
+
+    def test_invalid(self, restore_logging):
+        """未知的级别或格式直接报错"""
+        with pytest.raises(ValueError):
+            configure_logging(level="LOUD", fmt="text", rate=0)
+        with pytest.raises(ValueError):
+            configure_logging(level="INFO", fmt="xml", rate=0)
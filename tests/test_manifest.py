@@ -0,0 +1,133 @@
+"""
+测试 downloader.manifest 模块中的下载清单。
+"""
+
+from datetime import datetime
+import shutil
+
+from database import get_download_records, save_workshop_item
+from downloader.manifest import DownloadManifest
+from models.workshop import WorkshopItem
+import pytest
+from spiders.workshop import Wrokshop
+from tests import conftest
+
+CREATED_AT = datetime(2024, 1, 1, 8, 0)
+UPDATED_AT = datetime(2024, 6, 1, 12, 0)
+
+
+def make_item(item_id: str, updated_at: datetime | None = UPDATED_AT) -> WorkshopItem:
+    return conftest.make_item(item_id, created_at=CREATED_AT, updated_at=updated_at)
+
+
+def make_mod(download_dir, item_id: str, content: bytes = b"data"):
+    path = download_dir / item_id
+    path.mkdir(parents=True, exist_ok=True)
+    (path / "a.txt").write_bytes(content)
+    return path
+
+
+@pytest.fixture
+def manifest(db, tmp_path):
+    return DownloadManifest(str(tmp_path / "downloads"))
+
+
+class TestDownloadManifest:
+    """测试清单记录与过期判断"""
+
+    def test_record(self, manifest, tmp_path):
+        """记录下载时的版本、大小与校验和"""
+        save_workshop_item(make_item("1"))
+        make_mod(tmp_path / "downloads", "1", b"hello")
+
+        record = manifest.record("1", app_id="1")
+
+        assert record.version == UPDATED_AT
+        assert record.size == 5
+        assert set(record.checksums) == {"a.txt"}
+        assert get_download_records(["1"])["1"].version == UPDATED_AT
+
+    def test_current_item_skipped(self, manifest, tmp_path):
+        """本地副本与数据库版本一致时不需要下载"""
+        save_workshop_item(make_item("1"))
+        make_mod(tmp_path / "downloads", "1")
+        manifest.record("1")
+
+        assert manifest.has_local_copy("1")
+        assert manifest.stale_items(["1"]) == []
+
+    def test_outdated_item(self, manifest, tmp_path):
+        """Workshop 上有更新的版本时需要重新下载"""
+        save_workshop_item(make_item("1"))
+        make_mod(tmp_path / "downloads", "1")
+        manifest.record("1")
+        save_workshop_item(make_item("1", updated_at=datetime(2024, 7, 1)), exist_ok=True)
+
+        assert manifest.stale_items(["1"]) == ["1"]
+
+    def test_missing_local_copy(self, manifest, tmp_path):
+        """清单中有记录但本地目录已删除时需要重新下载"""
+        save_workshop_item(make_item("1"))
+        path = make_mod(tmp_path / "downloads", "1")
+        manifest.record("1")
+        shutil.rmtree(path)
+
+        assert not manifest.has_local_copy("1")
+        assert manifest.stale_items(["1"]) == ["1"]
+
+    def test_never_updated_item(self, manifest, tmp_path):
+        """从未更新过的项目以 created_at 作为版本，下载后不会一直被视为过期"""
+        save_workshop_item(make_item("1", updated_at=None))
+        make_mod(tmp_path / "downloads", "1")
+
+        assert manifest.record("1").version == CREATED_AT
+        assert manifest.stale_items(["1"]) == []
+
+    def test_unknown_item(self, manifest):
+        """数据库与清单中都没有的项目需要下载，并保持原顺序"""
+        save_workshop_item(make_item("2"))
+        assert manifest.stale_items(["3", "2"]) == ["3", "2"]
+
+
+class TestDownloadModsFromArchive:
+    """测试 Wrokshop.download_mods 对已归档 mod 的处理"""
+
+    @pytest.fixture
+    def workshop(self, db, tmp_path, monkeypatch):
+        monkeypatch.setenv("STEAM_WORKSHOP_SYNC_DOWNLOAD_DIR", str(tmp_path / "downloads"))
+        monkeypatch.setenv("STEAM_WORKSHOP_SYNC_ARCHIVE_DIR", str(tmp_path / "archive"))
+        monkeypatch.setenv("STEAM_WORKSHOP_SYNC_HTTP_DOWNLOAD", "false")
+        workshop = Wrokshop("1")
+        workshop.batches = []
+
+        def download_batch(item_ids, install_dir=None, throttle_kbps=None, validate=False):
+            workshop.batches.append(item_ids)
+            for item_id in item_ids:
+                make_mod(tmp_path / "downloads", item_id, b"new")
+            return dict.fromkeys(item_ids, True)
+
+        monkeypatch.setattr(workshop, "download_mods_batch", download_batch)
+        return workshop
+
+    def test_current_archived_item_rehydrated(self, workshop, tmp_path):
+        """最新版本只在归档中时从归档恢复，而不是跳过或重新下载"""
+        save_workshop_item(make_item("1"))
+        make_mod(tmp_path / "downloads", "1", b"old")
+        DownloadManifest(workshop.download_dir).record("1")
+        workshop.cold_archive.archive("1")
+
+        assert workshop.download_mods(["1"]) == {"1": True}
+        assert workshop.batches == []
+        assert (tmp_path / "downloads" / "1" / "a.txt").read_bytes() == b"old"
+
+    def test_broken_archive_redownloaded(self, workshop, tmp_path):
+        """归档无法恢复时重新下载"""
+        save_workshop_item(make_item("1"))
+        make_mod(tmp_path / "downloads", "1", b"old")
+        DownloadManifest(workshop.download_dir).record("1")
+        workshop.cold_archive.archive("1")
+        workshop.cold_archive.pack_path("1").write_bytes(b"broken")
+
+        assert workshop.download_mods(["1"]) == {"1": True}
+        assert workshop.batches == [["1"]]
+        assert (tmp_path / "downloads" / "1" / "a.txt").read_bytes() == b"new"
@@ -0,0 +1,77 @@
+"""
+测试 utils.memprofile 模块中的内存诊断。
+"""
+
+import json
+
+import pytest
+from utils import memprofile
+from utils.memprofile import MemoryProfiler, format_bytes
+
+
+class Leaky:
+    pass
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    profiler = memprofile.configure(MemoryProfiler(every=2, top=20, directory=str(tmp_path)))
+    yield profiler
+    memprofile.shutdown()
+
+
+class TestMemoryProfiler:
+    """测试快照比较与阶段峰值"""
+
+    def test_disabled(self, monkeypatch):
+        """未开启时 stage 与 cycle_finished 不做任何事"""
+        monkeypatch.delenv("STEAM_WORKSHOP_SYNC_MEMPROFILE_EVERY", raising=False)
+        assert memprofile.configure() is None
+        with memprofile.stage("listing"):
+            pass
+        assert memprofile.cycle_finished() is None
+
+    def test_report_every(self, profiler, tmp_path):
+        """每 every 轮输出一次报告，列出增长的分配位置与对象类型，并导出到目录"""
+        leaked = []
+        assert memprofile.cycle_finished() is None
+        leaked.extend(Leaky() for _ in range(2000))
+        leaked.append(bytearray(2 * 1024 * 1024))
+        report = memprofile.cycle_finished()
+
+        assert report["cycle"] == 2
+        assert any(entry["type"] == "Leaky" and entry["diff"] >= 2000 for entry in report["object_growth"])
+        assert any("test_memprofile.py" in entry["site"] for entry in report["allocation_growth"])
+        assert report["current_bytes"] >= 2 * 1024 * 1024
+
+        (path,) = tmp_path.glob("*.json")
+        assert json.loads(path.read_text(encoding="utf-8"))["cycle"] == 2
+        assert len(list(tmp_path.glob("*.tracemalloc"))) == 1
+
+    def test_stage_peak(self, profiler):
+        """阶段峰值包含阶段内已释放的临时分配，嵌套阶段的峰值传递给外层"""
+        with memprofile.stage("details"):
+            with memprofile.stage("parse"):
+                buffer = bytearray(4 * 1024 * 1024)
+                del buffer
+            small = bytearray(1024)
+        del small
+
+        assert profiler.stage_peaks["parse"] >= 4 * 1024 * 1024
+        assert profiler.stage_peaks["details"] >= 4 * 1024 * 1024
+        assert profiler.stage_calls == {"parse": 1, "details": 1}
+
+    def test_from_env(self, monkeypatch, tmp_path):
+        """按环境变量创建，未开启时为 None"""
+        monkeypatch.setenv("STEAM_WORKSHOP_SYNC_MEMPROFILE_EVERY", "0")
+        assert MemoryProfiler.from_env() is None
+        monkeypatch.setenv("STEAM_WORKSHOP_SYNC_MEMPROFILE_EVERY", "5")
+        monkeypatch.setenv("STEAM_WORKSHOP_SYNC_MEMPROFILE_DIR", str(tmp_path))
+        profiler = MemoryProfiler.from_env()
+        assert profiler.every == 5
+        assert profiler.directory == tmp_path
+
+    def test_format_bytes(self):
+        """以 MB 显示，负数保留符号"""
+        assert format_bytes(1024 * 1024) == "1.00 MB"
+        assert format_bytes(-512 * 1024) == "-0.50 MB"
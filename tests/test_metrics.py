@@ -0,0 +1,113 @@
+"""
+测试 utils.metrics 模块中的 Prometheus 指标。
+"""
+
+import pytest
+import requests
+from utils.metrics import Registry, endpoint_of, record_retry, start_metrics_server
+from utils.retry import RetryEvent
+
+
+@pytest.fixture
+def registry():
+    return Registry()
+
+
+class TestMetrics:
+    """测试指标的记录与文本输出"""
+
+    def test_counter(self, registry):
+        """计数器按标签累计，不允许减少"""
+        counter = registry.counter("items_total", "处理的项目数", ["result"])
+        counter.labels("processed").inc()
+        counter.labels(result="processed").inc(2)
+        counter.labels("failed").inc()
+        text = registry.render()
+        assert "# TYPE items_total counter" in text
+        assert 'items_total{result="processed"} 3' in text
+        assert 'items_total{result="failed"} 1' in text
+        with pytest.raises(ValueError):
+            counter.labels("failed").inc(-1)
+
+    def test_labels_required(self, registry):
+        """标签数量不符或带标签的指标直接记录时报错"""
+        counter = registry.counter("requests_total", "请求数", ["endpoint"])
+        with pytest.raises(ValueError):
+            counter.inc()
+        with pytest.raises(ValueError):
+            counter.labels("a", "b")
+
+    def test_duplicate_name(self, registry):
+        """同名指标不能重复注册"""
+        registry.counter("x_total", "x")
+        with pytest.raises(ValueError):
+            registry.gauge("x_total", "x")
+
+    def test_gauge_function(self, registry):
+        """set_function 在输出时取值，取值失败的样本被省略"""
+        queue = [1, 2, 3]
+        gauge = registry.gauge("queue_depth", "队列长度", ["queue"])
+        gauge.labels("download").set_function(lambda: len(queue))
+        gauge.labels("broken").set_function(lambda: 1 / 0)
+        queue.append(4)
+        text = registry.render()
+        assert 'queue_depth{queue="download"} 4' in text
+        assert "broken" not in text
+
+    def test_histogram(self, registry):
+        """直方图输出累计分桶、总和与次数"""
+        histogram = registry.histogram("latency_seconds", "耗时", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 3.0):
+            histogram.observe(value)
+        text = registry.render()
+        assert 'latency_seconds_bucket{le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{le="1"} 3' in text
+        assert 'latency_seconds_bucket{le="+Inf"} 4' in text
+        assert "latency_seconds_sum 4.05" in text
+        assert "latency_seconds_count 4" in text
+
+    def test_label_escaping(self, registry):
+        """标签值中的引号与换行被转义"""
+        registry.counter("errors_total", "错误", ["reason"]).labels('bad "value"\n').inc()
+        assert 'errors_total{reason="bad \\"value\\"\\n"} 1' in registry.render()
+
+
+class TestHelpers:
+    """测试标签辅助函数"""
+
+    def test_endpoint_of(self):
+        """按页面类型归类，不把 item ID 写进标签"""
+        assert endpoint_of("https://steamcommunity.com/workshop/browse/?p=2") == "browse"
+        assert endpoint_of("https://steamcommunity.com/sharedfiles/filedetails/?id=1") == "details"
+        api = "https://api.steampowered.com/ISteamRemoteStorage/GetPublishedFileDetails/v1/"
+        assert endpoint_of(api) == "file_details"
+        assert endpoint_of("https://api.steampowered.com/x") == "other"
+
+    def test_record_retry(self):
+        """按状态码或异常类型统计重试"""
+        from utils.metrics import RETRIES
+
+        before = RETRIES.labels("fetch", "429").value
+        record_retry(RetryEvent(func="fetch", attempt=1, retry=1, status=429, wait=1.0, waited=1.0))
+        record_retry(RetryEvent(func="fetch", attempt=2, retry=1, error="Timeout: read timed out", wait=1, waited=2))
+        assert RETRIES.labels("fetch", "429").value == before + 1
+        assert RETRIES.labels("fetch", "Timeout").value >= 1
+
+
+class TestMetricsServer:
+    """测试 /metrics 服务"""
+
+    def test_serves_metrics(self, registry):
+        """/metrics 返回文本格式，其他路径 404"""
+        registry.counter("up_total", "测试").inc()
+        server = start_metrics_server(0, "127.0.0.1", registry)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}"
+            response = requests.get(f"{url}/metrics", timeout=5)
+            assert response.status_code == 200
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert "up_total 1" in response.text
+            assert requests.get(f"{url}/other", timeout=5).status_code == 404
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,106 @@
+"""
+测试 spiders.mock_server 模块中的模拟 Steam 创意工坊。
+"""
+
+from datetime import datetime
+
+from parsers.workshop import WorkshopParser
+import pytest
+import requests
+from spiders.mock_server import FIRST_ITEM_ID, MockSteamServer, MockWorkshop, steam_date
+from spiders.workshop import Wrokshop
+from utils.formater import date_formater
+
+
+@pytest.fixture
+def server():
+    with MockSteamServer(MockWorkshop(items=95, page_size=30, app_id="294100")) as server:
+        yield server
+
+
+class TestMockWorkshop:
+    """测试模拟数据的生成"""
+
+    def test_steam_date_parsable(self):
+        """生成的日期能被 date_formater 解析"""
+        for value in (datetime(2022, 5, 12, 12, 43), datetime(2021, 1, 3, 0, 5), datetime(2020, 12, 31, 23, 59)):
+            assert date_formater(steam_date(value)) == value
+
+    def test_mostrecent_pages(self):
+        """mostrecent 最新发布的在前，最后一页不满"""
+        workshop = MockWorkshop(items=95, page_size=30)
+        assert workshop.total_pages() == 4
+        assert workshop.page(1)[0] == 94
+        assert len(workshop.page(4)) == 5
+        assert workshop.page(5) == []
+
+    def test_lastupdated_order(self):
+        """lastupdated 按更新时间倒序，覆盖所有 item"""
+        workshop = MockWorkshop(items=95, page_size=30)
+        indexes = [index for page in range(1, 5) for index in workshop.page(page, "lastupdated")]
+        assert sorted(indexes) == list(range(95))
+        times = [workshop.updated_at(index) for index in indexes]
+        assert times == sorted(times, reverse=True)
+
+    def test_publish(self):
+        """新发布的 item 出现在首页"""
+        workshop = MockWorkshop(items=10, page_size=5)
+        new_ids = workshop.publish(2)
+        assert new_ids == [str(FIRST_ITEM_ID + 10), str(FIRST_ITEM_ID + 11)]
+        assert workshop.page(1)[0] == 11
+
+    def test_pages_parse(self):
+        """生成的页面能被解析器解析"""
+        workshop = MockWorkshop(items=95, page_size=30)
+        result = WorkshopParser.parser_items_card(workshop.render_listing(2, "mostrecent", "http://mock"))
+        assert len(result["items"]) == 30
+        assert result["pagination"].total_pages == 4
+        assert result["pagination"].total_entries == 95
+        assert result["items"][0].id == str(FIRST_ITEM_ID + 64)
+
+        description, created_at, updated_at, file_size, images = WorkshopParser.parser_items_info(
+            workshop.render_details(64)
+        )
+        assert str(FIRST_ITEM_ID + 64) in description
+        assert created_at == workshop.created_at(64)
+        assert updated_at == workshop.updated_at(64).replace(second=0)
+        assert file_size > 0
+        assert len(images) == 3
+
+
+class TestMockSteamServer:
+    """测试模拟服务"""
+
+    def test_serves_pages(self, server):
+        """列表页与详情页，未知 item 返回 404"""
+        response = requests.get(f"{server.url}/workshop/browse/", params={"p": "1"}, timeout=5)
+        assert response.status_code == 200
+        assert "workshopBrowseItems" in response.text
+        response = requests.get(f"{server.url}/sharedfiles/filedetails/?id={FIRST_ITEM_ID}", timeout=5)
+        assert response.status_code == 200
+        assert requests.get(f"{server.url}/sharedfiles/filedetails/?id=1", timeout=5).status_code == 404
+        assert server.stats.listing == 1
+        assert server.stats.details == 1
+        assert server.stats.not_found == 1
+
+    def test_throttle_injection(self):
+        """按比例注入 429，并带有 Retry-After"""
+        with MockSteamServer(throttle_rate=1.0, retry_after=7) as server:
+            response = requests.get(f"{server.url}/workshop/browse/", timeout=5)
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "7"
+        assert server.stats.throttled == 1
+
+    def test_crawl_with_workshop(self, server, monkeypatch, tmp_path):
+        """Wrokshop 通过 STEAM_WORKSHOP_SYNC_BASE_URL 爬取模拟服务"""
+        monkeypatch.setenv("STEAM_WORKSHOP_SYNC_BASE_URL", server.url)
+        monkeypatch.setenv("STEAM_WORKSHOP_SYNC_REQUEST_DELAY", "0")
+        monkeypatch.setenv("STEAM_WORKSHOP_SYNC_DOWNLOAD_DIR", str(tmp_path))
+        monkeypatch.delenv("STEAM_WORKSHOP_SYNC_HTTP_MODE", raising=False)
+        workshop = Wrokshop("294100")
+
+        result = workshop.get_items(4)
+        assert [item.id for item in result["items"]] == [str(FIRST_ITEM_ID + index) for index in range(4, -1, -1)]
+        item = workshop.get_items_info(result["items"][0])
+        assert item.app_id == "294100"
+        assert item.created_at == server.workshop.created_at(4)
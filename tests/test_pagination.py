@@ -0,0 +1,78 @@
+"""
+测试 utils.pagination 模块中的翻页漂移追踪器。
+"""
+
+from models.workshop import WorkshopItem
+import pytest
+from tests.conftest import make_item
+from utils.pagination import PaginationDriftTracker
+
+
+def make_items(*item_ids: str) -> list[WorkshopItem]:
+    return [make_item(item_id) for item_id in item_ids]
+
+
+class TestFilterUnseen:
+    """测试 filter_unseen 方法"""
+
+    def test_first_page_all_unseen(self):
+        """测试首页项目全部未见过"""
+        tracker = PaginationDriftTracker()
+        unseen, duplicates = tracker.filter_unseen(make_items("1", "2", "3"))
+        assert [item.id for item in unseen] == ["1", "2", "3"]
+        assert duplicates == 0
+
+    def test_skip_duplicates_after_shift_down(self):
+        """测试列表下移后下一页开头的重复项目被跳过"""
+        tracker = PaginationDriftTracker()
+        tracker.filter_unseen(make_items("10", "9", "8"))
+        unseen, duplicates = tracker.filter_unseen(make_items("8", "7", "6"))
+        assert [item.id for item in unseen] == ["7", "6"]
+        assert duplicates == 1
+        assert tracker.duplicates == 1
+
+    def test_reset(self):
+        """测试新一轮开始时清空状态"""
+        tracker = PaginationDriftTracker()
+        tracker.filter_unseen(make_items("1"))
+        tracker.filter_unseen(make_items("1"))
+        tracker.reset()
+        unseen, duplicates = tracker.filter_unseen(make_items("1"))
+        assert len(unseen) == 1
+        assert duplicates == 0
+        assert tracker.duplicates == 0
+
+
+class TestDetectGap:
+    """测试 detect_gap 方法"""
+
+    def test_unknown_total(self):
+        """测试无法解析总条目数时不回读"""
+        tracker = PaginationDriftTracker()
+        assert tracker.detect_gap(None, 0) == 0
+        assert tracker.detect_gap(None, 0) == 0
+
+    def test_first_observation(self):
+        """测试首次记录总条目数时不回读"""
+        tracker = PaginationDriftTracker()
+        assert tracker.detect_gap(100, 0) == 0
+
+    def test_shift_up_without_duplicates(self):
+        """测试总条目数减少且没有重复项目时返回缺口大小"""
+        tracker = PaginationDriftTracker()
+        tracker.detect_gap(100, 0)
+        assert tracker.detect_gap(97, 0) == 3
+
+    @pytest.mark.parametrize(
+        ("total", "duplicates"),
+        [
+            (100, 0),  # 无变化
+            (102, 2),  # 新增导致下移
+            (98, 1),  # 删除发生在当前位置之后，仍出现重复项目
+        ],
+    )
+    def test_no_gap(self, total, duplicates):
+        """测试无需回读的情况"""
+        tracker = PaginationDriftTracker()
+        tracker.detect_gap(100, 0)
+        assert tracker.detect_gap(total, duplicates) == 0
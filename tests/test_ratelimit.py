@@ -0,0 +1,34 @@
+"""
+测试 utils.ratelimit 模块中的令牌桶限流器。
+"""
+
+import pytest
+from utils.ratelimit import TokenBucket
+
+
+class TestTokenBucket:
+    """测试 TokenBucket"""
+
+    def test_invalid_rate(self):
+        """测试速率必须为正数"""
+        with pytest.raises(ValueError):
+            TokenBucket(0)
+
+    def test_burst_up_to_capacity(self):
+        """测试可以连续取出 capacity 个令牌"""
+        bucket = TokenBucket(rate=1.0, capacity=3)
+        assert [bucket.try_acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert bucket.try_acquire() > 0
+
+    def test_wait_time(self):
+        """测试令牌不足时返回需要等待的时间"""
+        bucket = TokenBucket(rate=2.0, capacity=1)
+        assert bucket.try_acquire() == 0.0
+        assert bucket.try_acquire() == pytest.approx(0.5, abs=0.05)
+
+    def test_acquire_blocks_until_refilled(self):
+        """测试 acquire 会阻塞到令牌补充"""
+        bucket = TokenBucket(rate=50.0, capacity=1)
+        bucket.acquire()
+        bucket.acquire()
+        assert bucket.try_acquire() > 0
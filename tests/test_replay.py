@@ -0,0 +1,81 @@
+"""
+测试 spiders.replay 模块中的请求录制与回放。
+"""
+
+import pytest
+import requests
+from spiders.mock_server import FIRST_ITEM_ID, MockSteamServer, MockWorkshop
+from spiders.replay import Cassette, RecordingTransport, ReplayTransport, request_key, wrap_transport
+from spiders.transport import Transport
+
+
+@pytest.fixture
+def server():
+    with MockSteamServer(MockWorkshop(items=40, page_size=10)) as server:
+        yield server
+
+
+class TestRequestKey:
+    """测试记录文件名"""
+
+    def test_params_order(self):
+        """参数顺序不影响文件名"""
+        assert request_key("http://x/", {"a": "1", "b": "2"}) == request_key("http://x/", {"b": "2", "a": "1"})
+        assert request_key("http://x/", {"p": "1"}) != request_key("http://x/", {"p": "2"})
+
+
+class TestRecordReplay:
+    """测试录制后离线回放"""
+
+    def test_round_trip(self, server, tmp_path):
+        """录制的响应可以在服务停止后原样回放"""
+        url = f"{server.url}/workshop/browse/"
+        recorder = RecordingTransport(Transport(), Cassette(tmp_path))
+        recorded = recorder.get(url, params={"p": "2"})
+        assert recorder.recorded == 1
+        assert recorder.stats().requests == 1
+        recorder.close()
+        server.stop()
+
+        replay = ReplayTransport(Cassette(tmp_path))
+        response = replay.get(url, params={"p": "2"})
+        assert response.status_code == 200
+        assert response.text == recorded.text
+        assert response.headers["Content-Type"] == "text/html; charset=utf-8"
+        assert response.url.endswith("p=2")
+        response.raise_for_status()
+
+        with pytest.raises(requests.ConnectionError):
+            replay.get(url, params={"p": "3"})
+        assert replay.hits == 1
+        assert replay.misses == 1
+
+    def test_errors_not_recorded(self, tmp_path):
+        """429 等错误响应不写入记录"""
+        with MockSteamServer(throttle_rate=1.0) as server:
+            recorder = RecordingTransport(Transport(), Cassette(tmp_path))
+            assert recorder.get(f"{server.url}/workshop/browse/").status_code == 429
+        assert recorder.recorded == 0
+        assert len(Cassette(tmp_path)) == 0
+
+    def test_details_round_trip(self, server, tmp_path):
+        """详情页的查询参数写在地址里同样可以回放"""
+        url = f"{server.url}/sharedfiles/filedetails/?id={FIRST_ITEM_ID}"
+        RecordingTransport(Transport(), Cassette(tmp_path)).get(url)
+        assert f"Mock item <b>{FIRST_ITEM_ID}</b>" in ReplayTransport(Cassette(tmp_path)).get(url).text
+
+
+class TestWrapTransport:
+    """测试按模式包装传输层"""
+
+    def test_modes(self, tmp_path, monkeypatch):
+        """live 原样返回，record/replay 包装，未知模式报错"""
+        monkeypatch.delenv("STEAM_WORKSHOP_SYNC_HTTP_MODE", raising=False)
+        transport = Transport()
+        assert wrap_transport(transport) is transport
+        assert isinstance(wrap_transport(transport, "record", str(tmp_path)), RecordingTransport)
+        monkeypatch.setenv("STEAM_WORKSHOP_SYNC_HTTP_MODE", "replay")
+        monkeypatch.setenv("STEAM_WORKSHOP_SYNC_CASSETTE_DIR", str(tmp_path))
+        assert isinstance(wrap_transport(Transport()), ReplayTransport)
+        with pytest.raises(ValueError):
+            wrap_transport(Transport(), "bogus")
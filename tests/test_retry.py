@@ -0,0 +1,323 @@
+"""
+测试 utils.retry 模块中的重试策略、Retry-After 解析与熔断器。
+"""
+
+import asyncio
+from datetime import datetime, timezone
+import time
+
+import pytest
+import requests
+from utils import retry
+from utils.retry import CircuitBreaker, RetryPolicy, RetryState, parse_retry_after, retry_on_error
+
+
+class FakeResponse:
+    """只包含状态码与响应头的假 Response"""
+
+    def __init__(self, status_code: int, headers: dict | None = None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def http_error(status_code: int, headers: dict | None = None) -> requests.HTTPError:
+    """构造附带 response 的 HTTPError"""
+    return requests.HTTPError(f"{status_code} error", response=FakeResponse(status_code, headers))
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """记录等待时间而不真正等待"""
+    recorded = []
+    monkeypatch.setattr(retry.time, "sleep", recorded.append)
+    monkeypatch.setattr(retry, "_breakers", {})
+    return recorded
+
+
+class TestParseRetryAfter:
+    """测试 parse_retry_after 函数"""
+
+    def test_seconds(self):
+        """测试秒数格式"""
+        assert parse_retry_after("120") == 120.0
+
+    def test_http_date(self):
+        """测试 HTTP 日期格式"""
+        now = datetime(2025, 1, 1, 0, 0, 0, tzinfo=timezone.utc)
+        assert parse_retry_after("Wed, 01 Jan 2025 00:00:30 GMT", now=now) == 30.0
+
+    def test_invalid(self):
+        """测试无法解析的值"""
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("soon") is None
+
+
+class TestRetryPolicy:
+    """测试 RetryPolicy 与 RetryState"""
+
+    def test_jitter_bounds(self):
+        """测试抖动后的等待时间在 [base, min(previous * 3, max)] 之间"""
+        policy = RetryPolicy(backoff_base=1.0, backoff_max=10.0)
+        for _ in range(100):
+            assert 1.0 <= policy.next_wait(2.0) <= 6.0
+            assert policy.next_wait(100.0) <= 10.0
+
+    def test_retry_after_is_minimum(self):
+        """测试 Retry-After 作为等待时间下限"""
+        policy = RetryPolicy(backoff_base=1.0, backoff_max=10.0)
+        assert policy.next_wait(1.0, retry_after=60.0) == 60.0
+
+    def test_status_from_exception_response(self):
+        """测试状态码取自异常的 response，而不是异常文本"""
+        state = RetryState(RetryPolicy(retry_on_status={500: 3}, default_retry=False))
+        # 文本中含有 500，但真实状态码是 404
+        error = requests.HTTPError("404 for url https://x/500", response=FakeResponse(404))
+        assert state.decide(exception=error) is None
+        assert state.decide(exception=http_error(500)) is not None
+
+    def test_budget(self):
+        """测试总等待时间超过预算后停止重试"""
+        policy = RetryPolicy(retry_on_status={429: None}, backoff_max=1.0, budget=100.0)
+        state = RetryState(policy)
+        response = FakeResponse(429, {"Retry-After": "40"})
+        assert state.decide(result=response) == 40.0
+        assert state.decide(result=response) == 40.0
+        assert state.decide(result=response) is None
+
+    def test_network_errors(self):
+        """测试没有状态码的网络异常按 max_retries 重试，其他异常不重试"""
+        state = RetryState(RetryPolicy(max_retries=1))
+        assert state.decide(exception=requests.ConnectionError("reset")) is not None
+        assert state.decide(exception=requests.ConnectionError("reset")) is None
+        assert state.decide(exception=ValueError("bad")) is None
+
+
+class TestCircuitBreaker:
+    """测试 CircuitBreaker 类"""
+
+    def test_opens_after_threshold(self):
+        """测试连续限流达到阈值后打开，冷却时间逐次翻倍"""
+        breaker = CircuitBreaker(threshold=2, cooldown=10.0)
+        assert breaker.record_throttle() == 0.0
+        assert breaker.record_throttle() == 10.0
+        assert breaker.is_open
+        breaker.record_throttle()
+        assert breaker.record_throttle() == 20.0
+
+    def test_retry_after_does_not_trip_alone(self):
+        """测试单次带 Retry-After 的限流不会打开熔断，达到阈值时作为冷却时间的下限"""
+        breaker = CircuitBreaker(threshold=2, cooldown=1.0)
+        assert breaker.record_throttle(retry_after=30.0) == 0.0
+        assert not breaker.is_open
+        assert breaker.record_throttle(retry_after=30.0) == 30.0
+
+    def test_success_resets(self):
+        """测试成功后复位计数"""
+        breaker = CircuitBreaker(threshold=2, cooldown=10.0)
+        breaker.record_throttle()
+        breaker.record_success()
+        assert breaker.record_throttle() == 0.0
+
+
+class TestRetryOnError:
+    """测试 retry_on_error 装饰器"""
+
+    def test_retries_until_success(self, sleeps):
+        """测试返回可重试状态码时重试，成功后返回"""
+        responses = [FakeResponse(503), FakeResponse(503), FakeResponse(200)]
+
+        @retry_on_error(retry_on_status={503: 3}, default_retry=False, backoff_base=1.0)
+        def request(url):
+            return responses.pop(0)
+
+        assert request("https://example.com/a").status_code == 200
+        assert len(sleeps) == 2
+
+    def test_raises_after_max_retries(self, sleeps):
+        """测试超过重试次数后抛出原异常"""
+
+        @retry_on_error(retry_on_status={500: 1}, default_retry=False)
+        def request(url):
+            raise http_error(500)
+
+        with pytest.raises(requests.HTTPError):
+            request("https://example.com/a")
+        assert len(sleeps) == 1
+
+    def test_breaker_shared_across_callers(self, sleeps):
+        """测试同一 host 连续限流达到阈值后，其他调用方也先等待"""
+
+        @retry_on_error(retry_on_status={429: 2}, default_retry=False)
+        def throttled(url):
+            return FakeResponse(429, {"Retry-After": "30"})
+
+        @retry_on_error()
+        def other(url):
+            return FakeResponse(200)
+
+        # 默认阈值为 3：前两次只按 Retry-After 等待自己的重试，第三次打开熔断
+        throttled("https://steamcommunity.com/a")
+        assert len(sleeps) == 2
+        other(url="https://steamcommunity.com/b")
+        assert len(sleeps) == 3
+        assert 29.0 < sleeps[2] <= 30.0
+
+        other("https://api.steampowered.com/c")
+        assert len(sleeps) == 3
+
+    def test_single_retry_after_is_per_request(self, sleeps):
+        """测试单次 429 的 Retry-After 只让该请求等待，不会暂停其他调用方"""
+        responses = [FakeResponse(429, {"Retry-After": "30"}), FakeResponse(200)]
+
+        @retry_on_error(retry_on_status={429: None}, default_retry=False)
+        def throttled(url):
+            return responses.pop(0)
+
+        @retry_on_error()
+        def other(url):
+            return FakeResponse(200)
+
+        other("https://steamcommunity.com/b")
+        assert throttled("https://steamcommunity.com/a").status_code == 200
+        assert sleeps == [30.0]
+        other("https://steamcommunity.com/b")
+        assert sleeps == [30.0]
+
+    def test_breaker_pause_counts_toward_budget(self, sleeps):
+        """测试熔断等待计入等待预算，超过预算时不再等待"""
+        retry.get_circuit_breaker("steamcommunity.com").cooldown = 60.0
+        for _ in range(3):
+            retry.get_circuit_breaker("steamcommunity.com").record_throttle()
+
+        @retry_on_error(budget=10)
+        def request(url):
+            return FakeResponse(200)
+
+        with pytest.raises(TimeoutError):
+            request("https://steamcommunity.com/a")
+        assert sleeps == []
+
+    def test_breaker_pause_counts_toward_deadline(self, sleeps):
+        """测试熔断等待会超过调用截止时间时抛出 TimeoutError"""
+        for _ in range(3):
+            retry.get_circuit_breaker("steamcommunity.com").record_throttle()
+
+        @retry_on_error(deadline=5)
+        def request(url):
+            return FakeResponse(200)
+
+        with pytest.raises(TimeoutError):
+            request("https://steamcommunity.com/a")
+        assert sleeps == []
+
+    def test_retry_waits_for_open_breaker(self, sleeps):
+        """测试熔断打开后重试至少等到冷却结束，并计入已等待时间"""
+        responses = [FakeResponse(429), FakeResponse(429), FakeResponse(429), FakeResponse(200)]
+        events = []
+
+        @retry_on_error(retry_on_status={429: None}, default_retry=False, backoff_base=0.1, on_retry=events.append)
+        def request(url):
+            return responses.pop(0)
+
+        assert request("https://steamcommunity.com/a").status_code == 200
+        # 第三次 429 打开熔断（默认冷却 30 秒），该次重试等待覆盖冷却时间
+        assert 29.0 < sleeps[2] <= 30.0
+        assert events[-1].wait == sleeps[2]
+        assert events[-1].waited == pytest.approx(sum(sleeps[:3]))
+
+
+@pytest.fixture
+def fresh_breakers(monkeypatch):
+    monkeypatch.setattr(retry, "_breakers", {})
+
+
+class TestAsyncRetry:
+    """测试装饰协程函数时的重试"""
+
+    def test_retries_and_emits_events(self, fresh_breakers):
+        """测试协程重试成功，并产出结构化的重试事件"""
+        events = []
+        responses = [FakeResponse(503), FakeResponse(200)]
+
+        @retry_on_error(retry_on_status={503: 3}, backoff_base=0.01, backoff_max=0.01, on_retry=events.append)
+        async def request(url):
+            return responses.pop(0)
+
+        result = asyncio.run(request("https://example.com/a"))
+
+        assert result.status_code == 200
+        assert len(events) == 1
+        assert events[0].status == 503
+        assert events[0].host == "example.com"
+        assert events[0].attempt == 1
+        assert events[0].max_retries == 3
+
+    def test_does_not_block_event_loop(self, fresh_breakers):
+        """测试重试等待期间其他协程仍可运行"""
+        ticks = []
+        calls = []
+
+        @retry_on_error(retry_on_status={503: 1}, backoff_base=0.2, backoff_max=0.2)
+        async def request(url):
+            calls.append(url)
+            return FakeResponse(503 if len(calls) == 1 else 200)
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(1)
+                await asyncio.sleep(0.02)
+
+        async def run():
+            await asyncio.gather(request("https://example.com/a"), ticker())
+
+        asyncio.run(run())
+        assert len(ticks) == 5
+        assert len(calls) == 2
+
+    def test_cancellation_propagates(self, fresh_breakers):
+        """测试在退避等待中被取消时直接抛出 CancelledError，不再重试"""
+        calls = []
+
+        @retry_on_error(retry_on_status={503: None}, backoff_base=10.0, backoff_max=10.0)
+        async def request(url):
+            calls.append(url)
+            return FakeResponse(503)
+
+        async def run():
+            task = asyncio.create_task(request("https://example.com/a"))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            await task
+
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(run())
+        assert len(calls) == 1
+
+    def test_deadline(self, fresh_breakers):
+        """测试整个调用超过时限时抛出 TimeoutError"""
+
+        @retry_on_error(deadline=0.1)
+        async def slow(url):
+            await asyncio.sleep(5)
+
+        with pytest.raises(TimeoutError):
+            asyncio.run(slow("https://example.com/a"))
+
+
+class TestSyncDeadline:
+    """测试普通函数的调用时限"""
+
+    def test_stops_retrying_before_deadline(self, fresh_breakers):
+        """测试等待会超过时限时不再重试"""
+        calls = []
+
+        @retry_on_error(max_retries=None, backoff_base=0.1, backoff_max=0.1, deadline=0.35)
+        def request(url):
+            calls.append(url)
+            raise requests.ConnectionError("reset")
+
+        start = time.monotonic()
+        with pytest.raises(requests.ConnectionError):
+            request("https://example.com/a")
+        assert time.monotonic() - start < 0.35
+        assert 3 <= len(calls) <= 4
@@ -0,0 +1,55 @@
+"""
+测试 utils.scheduler 模块中的自适应调度器。
+"""
+
+import pytest
+from utils.scheduler import AdaptiveScheduler
+
+
+def make_scheduler(**kwargs) -> AdaptiveScheduler:
+    options = {"min_interval": 10.0, "max_interval": 3600.0, "default_interval": 60.0, "target_stale": 1.0}
+    options.update(kwargs)
+    return AdaptiveScheduler(**options)
+
+
+class TestAdaptiveScheduler:
+    """测试 AdaptiveScheduler"""
+
+    def test_default_interval_without_estimate(self):
+        """测试首轮只建立基准，使用默认间隔"""
+        scheduler = make_scheduler()
+        scheduler.record_changes(1000)
+        assert scheduler.end_cycle(now=0.0) == 60.0
+        assert scheduler.rate is None
+
+    def test_busy_app_polls_faster(self):
+        """测试变更频繁时缩短间隔"""
+        scheduler = make_scheduler()
+        scheduler.end_cycle(now=0.0)
+        scheduler.record_changes(10)
+        # 10 个/100 秒 -> 0.1 个/秒 -> 2 * 1 / 0.1 = 20 秒
+        assert scheduler.end_cycle(now=100.0) == pytest.approx(20.0)
+
+    def test_quiet_app_backs_off_to_max(self):
+        """测试没有变更时退避到最大间隔"""
+        scheduler = make_scheduler()
+        scheduler.end_cycle(now=0.0)
+        assert scheduler.end_cycle(now=100.0) == 3600.0
+
+    def test_clamped_to_min(self):
+        """测试间隔不低于下限"""
+        scheduler = make_scheduler()
+        scheduler.end_cycle(now=0.0)
+        scheduler.record_changes(1000)
+        assert scheduler.end_cycle(now=10.0) == 10.0
+
+    def test_ewma_smoothing(self):
+        """测试速率估计按 EWMA 平滑"""
+        scheduler = make_scheduler(alpha=0.5)
+        scheduler.end_cycle(now=0.0)
+        scheduler.record_changes(10)
+        scheduler.end_cycle(now=100.0)
+        assert scheduler.rate == pytest.approx(0.1)
+
+        scheduler.end_cycle(now=200.0)
+        assert scheduler.rate == pytest.approx(0.05)
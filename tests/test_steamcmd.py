@@ -0,0 +1,190 @@
+"""
+测试 downloader.steamcmd 模块中的命令构建、输出解析与流式运行。
+"""
+
+import sys
+import time
+
+from downloader.steamcmd import (
+    FAILURE_LOGIN,
+    FAILURE_MISSING,
+    FAILURE_NOT_FOUND,
+    FAILURE_STALLED,
+    FAILURE_TIMEOUT,
+    FAILURE_UNKNOWN,
+    SteamCMDRunner,
+    build_command,
+    classify_failure,
+    parse_line,
+)
+
+
+def python_command(script: str) -> list[str]:
+    """用 Python 脚本模拟 Steam CMD"""
+    return [sys.executable, "-u", "-c", script]
+
+
+class TestBuildCommand:
+    """测试 build_command 函数"""
+
+    def test_anonymous_single_item(self):
+        """测试匿名登录下载单个 item"""
+        cmd = build_command("steamcmd", "/tmp/install", "647960", ["1"])
+        assert cmd == [
+            "steamcmd",
+            "+force_install_dir",
+            "/tmp/install",
+            "+login",
+            "anonymous",
+            "+workshop_download_item",
+            "647960",
+            "1",
+            "validate",
+            "+quit",
+        ]
+
+    def test_batch_with_credentials_and_throttle(self):
+        """测试一次会话下载多个 item，并带有账号与限速"""
+        cmd = build_command(
+            "steamcmd",
+            "/tmp/install",
+            "647960",
+            ["1", "2"],
+            username="user",
+            password="pass",
+            guard_code="CODE",
+            validate=False,
+            throttle_kbps=500,
+        )
+        assert cmd == [
+            "steamcmd",
+            "+force_install_dir",
+            "/tmp/install",
+            "+set_download_throttle",
+            "500",
+            "+login",
+            "user",
+            "pass",
+            "CODE",
+            "+workshop_download_item",
+            "647960",
+            "1",
+            "+workshop_download_item",
+            "647960",
+            "2",
+            "+quit",
+        ]
+
+
+class TestParseLine:
+    """测试 parse_line 与 classify_failure 函数"""
+
+    def test_success(self):
+        """测试解析下载成功行"""
+        event = parse_line('Success. Downloaded item 1 to "/tmp/1" (2048 bytes)')
+        assert event.state == "success"
+        assert event.item_id == "1"
+        assert event.bytes_total == 2048
+        assert event.percent == 100.0
+
+    def test_failure_classified(self):
+        """测试失败原因被精确归类"""
+        event = parse_line("ERROR! Download item 2 failed (File Not Found).")
+        assert event.state == "failed"
+        assert event.item_id == "2"
+        assert event.failure == FAILURE_NOT_FOUND
+
+    def test_progress(self):
+        """测试解析进度行"""
+        event = parse_line(" Update state (0x61) downloading, progress: 45.50 (455 / 1000)")
+        assert event.state == "progress"
+        assert event.percent == 45.5
+        assert (event.bytes_done, event.bytes_total) == (455, 1000)
+
+    def test_login_failure(self):
+        """测试登录失败为会话级错误"""
+        event = parse_line("FAILED login with result code Invalid Password")
+        assert event.state == "error"
+        assert event.failure == FAILURE_LOGIN
+
+    def test_unrelated_line(self):
+        """测试无关行返回 None"""
+        assert parse_line("Loading Steam API...OK") is None
+        assert parse_line("") is None
+
+    def test_classify_unknown(self):
+        """测试无法识别的原因"""
+        assert classify_failure("Timeout") == FAILURE_TIMEOUT
+        assert classify_failure("Failure") == FAILURE_UNKNOWN
+
+
+class TestSteamCMDRunner:
+    """测试 SteamCMDRunner 类"""
+
+    def test_streams_results_and_events(self):
+        """测试逐行解析结果并产出事件"""
+        events = []
+        script = (
+            "print('Downloading item 1 ...')\n"
+            "print(' Update state (0x61) downloading, progress: 50.00 (5 / 10)')\n"
+            "print('Success. Downloaded item 1 to \"/tmp/1\" (10 bytes)')\n"
+            "print('ERROR! Download item 2 failed (Timeout).')\n"
+        )
+        result = SteamCMDRunner(on_event=events.append).run(python_command(script), ["1", "2", "3"])
+
+        assert result.results == {"1": True, "2": False, "3": False}
+        assert result.failures == {"2": FAILURE_TIMEOUT, "3": FAILURE_MISSING}
+        assert result.returncode == 0
+        assert result.killed is None
+        assert [event.state for event in events] == ["downloading", "progress", "success", "failed"]
+        # 进度行没有 item ID，归属于当前正在下载的 item
+        assert events[1].item_id == "1"
+
+    def test_last_result_wins(self):
+        """测试同一 item 有多条结果时以最后一条为准，并忽略不在本次下载列表中的 item 与无关的 failed 字样"""
+        script = (
+            "print('Loading Steam API...failed')\n"
+            "print('ERROR! Download item 1 failed (Timeout).')\n"
+            "print('Success. Downloaded item 1 to \"/tmp/1\" (1 bytes)')\n"
+            "print('Success. Downloaded item 9 to \"/tmp/9\" (1 bytes)')\n"
+        )
+        result = SteamCMDRunner().run(python_command(script), ["1", "2"])
+
+        assert result.results == {"1": True, "2": False}
+        assert result.failures == {"2": FAILURE_MISSING}
+
+    def test_kills_stalled_process(self):
+        """测试无进展超时后终止进程"""
+        script = "import time\nprint('Downloading item 1 ...')\ntime.sleep(30)\n"
+        start = time.monotonic()
+        result = SteamCMDRunner(stall_timeout=0.5, probe_interval=0.1).run(python_command(script), ["1"])
+
+        assert time.monotonic() - start < 10
+        assert result.killed == FAILURE_STALLED
+        assert result.failures == {"1": FAILURE_STALLED}
+
+    def test_probe_activity_prevents_stall(self):
+        """测试探测值持续变化时不会判定为卡死"""
+        counter = iter(range(1000))
+        script = "import time\ntime.sleep(1.0)\nprint('Success. Downloaded item 1 to \"/tmp/1\"')\n"
+        runner = SteamCMDRunner(stall_timeout=0.5, activity_probe=lambda: next(counter), probe_interval=0.1)
+        result = runner.run(python_command(script), ["1"])
+
+        assert result.killed is None
+        assert result.results == {"1": True}
+
+    def test_total_timeout(self):
+        """测试总超时"""
+        script = "import time\nwhile True:\n    print('still working')\n    time.sleep(0.1)\n"
+        result = SteamCMDRunner(stall_timeout=0, timeout=0.5).run(python_command(script), ["1"])
+
+        assert result.killed == FAILURE_TIMEOUT
+        assert result.failures == {"1": FAILURE_TIMEOUT}
+        assert result.tail[-1] == "still working"
+
+    def test_login_failure_applies_to_all_items(self):
+        """测试登录失败时所有 item 归类为登录失败"""
+        script = "print('FAILED login with result code Invalid Password')\n"
+        result = SteamCMDRunner().run(python_command(script), ["1", "2"])
+
+        assert result.failures == {"1": FAILURE_LOGIN, "2": FAILURE_LOGIN}
@@ -0,0 +1,73 @@
+"""
+测试 downloader.store 模块中的内容寻址存储。
+"""
+
+import os
+
+from downloader.store import ContentStore
+
+
+def make_mod(directory, files: dict[str, bytes]):
+    """在 directory 下创建 mod 文件"""
+    for relative, content in files.items():
+        path = directory / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+    return directory
+
+
+class TestContentStore:
+    """测试 ContentStore 类"""
+
+    def test_ingest_deduplicates_files(self, tmp_path):
+        """测试不同 mod 中相同的文件共享同一个 blob"""
+        store = ContentStore(str(tmp_path / "store"))
+        first = store.ingest("1", make_mod(tmp_path / "a", {"shared.bin": b"same", "one.txt": b"1"}))
+        second = store.ingest("2", make_mod(tmp_path / "b", {"data/shared.bin": b"same"}))
+
+        assert os.path.samefile(first / "shared.bin", second / "data" / "shared.bin")
+        assert (first / "one.txt").read_bytes() == b"1"
+        assert not (tmp_path / "a").exists()
+        assert len(list(store.blobs_dir.glob("*/*"))) == 2
+
+    def test_identical_version_reused(self, tmp_path):
+        """测试内容相同的版本复用已有版本目录"""
+        store = ContentStore(str(tmp_path / "store"))
+        first = store.ingest("1", make_mod(tmp_path / "a", {"x": b"x"}))
+        second = store.ingest("1", make_mod(tmp_path / "b", {"x": b"x"}))
+
+        assert first == second
+        assert store.versions("1") == [first]
+
+    def test_activate_swaps_symlink(self, tmp_path):
+        """测试切换版本时替换符号链接，并兼容已有的普通目录"""
+        store = ContentStore(str(tmp_path / "store"))
+        link = make_mod(tmp_path / "downloads" / "1", {"old": b"legacy"})
+
+        first = store.ingest("1", make_mod(tmp_path / "a", {"x": b"v1"}))
+        store.activate(first, link)
+        assert link.is_symlink()
+        assert (link / "x").read_bytes() == b"v1"
+
+        second = store.ingest("1", make_mod(tmp_path / "b", {"x": b"v2"}))
+        store.activate(second, link)
+        assert (link / "x").read_bytes() == b"v2"
+        assert [path.name for path in link.parent.iterdir()] == ["1"]
+
+    def test_prune_and_gc(self, tmp_path):
+        """测试只保留最近的版本，并回收不再引用的 blob"""
+        store = ContentStore(str(tmp_path / "store"), keep_versions=2)
+        versions = []
+        for index in range(3):
+            version = store.ingest("1", make_mod(tmp_path / f"v{index}", {"x": f"v{index}".encode(), "s": b"s"}))
+            # 保证 mtime 有先后
+            os.utime(version, (index, index))
+            versions.append(version)
+
+        assert store.prune("1", current=versions[-1]) == 1
+        assert not versions[0].exists()
+
+        count, freed = store.gc()
+        assert (count, freed) == (1, 2)
+        assert (versions[1] / "s").read_bytes() == b"s"
+        assert store.gc() == (0, 0)
@@ -0,0 +1,123 @@
+"""
+测试 utils.tracing 模块中的追踪与轮次采样。
+"""
+
+import json
+
+import pytest
+from utils import tracing
+from utils.tracing import CycleProfiler, traced
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    tracing.configure("jsonl", str(path))
+    yield path
+    tracing.shutdown()
+
+
+def read_spans(path):
+    tracing.shutdown()
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+class TestTracing:
+    """测试 span 的记录"""
+
+    def test_disabled_is_noop(self, tmp_path):
+        """关闭时返回共享的空 span，装饰的函数照常执行"""
+        tracing.configure("off")
+        assert not tracing.enabled()
+        with tracing.span("x", a=1) as span:
+            span.set_attribute("b", 2)
+        assert tracing.span("y") is tracing.span("z")
+
+        @traced("double")
+        def double(value):
+            return value * 2
+
+        assert double(3) == 6
+
+    def test_nested_spans(self, trace_file):
+        """嵌套的 span 共享 trace_id，并记录父 span"""
+
+        @traced("parse")
+        def parse():
+            return 1
+
+        with tracing.span("page", page=2) as span:
+            parse()
+            span.set_attribute("items", 30)
+
+        child, parent = read_spans(trace_file)
+        assert child["name"] == "parse"
+        assert parent["name"] == "page"
+        assert child["trace_id"] == parent["trace_id"]
+        assert child["parent_id"] == parent["span_id"]
+        assert parent["parent_id"] is None
+        assert parent["attributes"] == {"page": 2, "items": 30}
+        assert parent["end_time_unix_nano"] >= parent["start_time_unix_nano"]
+
+    def test_error_recorded(self, trace_file):
+        """异常被记录到 span 中并继续抛出"""
+        with pytest.raises(RuntimeError):
+            with tracing.span("request"):
+                raise RuntimeError("boom")
+
+        (span,) = read_spans(trace_file)
+        assert span["status"] == "error"
+        assert span["error"] == "RuntimeError: boom"
+
+    def test_unknown_mode(self):
+        """未知的追踪模式直接报错"""
+        with pytest.raises(ValueError):
+            tracing.configure("zipkin")
+
+
+class TestCycleProfiler:
+    """测试爬取轮次的性能采样"""
+
+    @staticmethod
+    def cycle(pages):
+        for page in range(pages):
+            sum(range(1000 * (page + 1)))
+            yield
+
+    def test_not_sampled(self, tmp_path):
+        """未抽中的轮次原样返回，不写出文件"""
+        profiler = CycleProfiler(0.0, str(tmp_path))
+        cycle = self.cycle(3)
+        assert profiler.wrap(cycle, "1") is cycle
+        assert not tmp_path.exists() or not list(tmp_path.iterdir())
+
+    def test_sampled(self, tmp_path):
+        """抽中的轮次行为不变，结束后写出 .prof 与文本摘要"""
+        profiler = CycleProfiler(1.0, str(tmp_path / "profiles"))
+        assert len(list(profiler.wrap(self.cycle(3), "294100"))) == 3
+
+        files = sorted(path.suffix for path in (tmp_path / "profiles").iterdir())
+        assert files == [".prof", ".txt"]
+        summary = next((tmp_path / "profiles").glob("*.txt")).read_text(encoding="utf-8")
+        assert "cycle" in summary
+
+    def test_force_next(self, tmp_path):
+        """force_next 只强制采样接下来的一轮"""
+        profiler = CycleProfiler(0.0, str(tmp_path))
+        profiler.force_next.set()
+        assert profiler.should_profile()
+        assert not profiler.should_profile()
+
+    def test_error_still_dumped(self, tmp_path):
+        """轮次中途出错时仍写出采样结果"""
+
+        def failing():
+            yield
+            raise RuntimeError("boom")
+
+        profiler = CycleProfiler(1.0, str(tmp_path))
+        cycle = profiler.wrap(failing(), "1")
+        next(cycle)
+        with pytest.raises(RuntimeError):
+            next(cycle)
+        assert len(list(tmp_path.glob("*.prof"))) == 1
@@ -0,0 +1,146 @@
+"""
+测试 spiders.transport 模块中的 HTTP 传输层。
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+
+import pytest
+import requests
+from spiders import transport as transport_module
+from spiders.proxy import ProxyPool
+from spiders.transport import Transport, TransportConfig, TransportStats, accept_encoding, ensure_encoding
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """返回固定页面的 keep-alive 服务"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.encodings.append(self.headers.get("Accept-Encoding"))
+        body = "创意工坊".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.encodings = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestAcceptEncoding:
+    """测试压缩格式协商"""
+
+    def test_gzip_always(self):
+        """总是声明 gzip 与 deflate"""
+        assert accept_encoding().startswith("gzip, deflate")
+
+    def test_br_only_when_installed(self, monkeypatch):
+        """未安装 brotli 时不声明 br"""
+        monkeypatch.setattr(transport_module, "_has_module", lambda name: False)
+        assert "br" not in accept_encoding()
+        monkeypatch.setattr(transport_module, "_has_module", lambda name: name == "brotli")
+        assert accept_encoding() == "gzip, deflate, br"
+
+
+class TestEnsureEncoding:
+    """测试响应编码设置"""
+
+    def _response(self, content_type: str) -> requests.Response:
+        response = requests.Response()
+        response.headers["Content-Type"] = content_type
+        response._content = "创意工坊".encode()
+        return response
+
+    def test_default_utf8(self):
+        """没有 charset 时按 UTF-8 解码"""
+        response = self._response("text/html")
+        ensure_encoding(response)
+        assert response.text == "创意工坊"
+
+    def test_keep_declared_charset(self):
+        """Content-Type 中声明的 charset 保持不变"""
+        response = self._response("text/html; charset=gbk")
+        response.encoding = "gbk"
+        ensure_encoding(response)
+        assert response.encoding == "gbk"
+
+
+class TestTransportConfig:
+    """测试环境变量配置"""
+
+    def test_from_env(self, monkeypatch):
+        """读取连接池与超时配置"""
+        monkeypatch.setenv("STEAM_WORKSHOP_SYNC_POOL_MAXSIZE", "32")
+        monkeypatch.setenv("STEAM_WORKSHOP_SYNC_CONNECT_TIMEOUT", "3")
+        monkeypatch.setenv("STEAM_WORKSHOP_SYNC_TIMEOUT", "12")
+        monkeypatch.setenv("STEAM_WORKSHOP_SYNC_HTTP2", "true")
+        config = TransportConfig.from_env()
+        assert config.pool_maxsize == 32
+        assert config.connect_timeout == 3
+        assert config.read_timeout == 12
+        assert config.http2 is True
+
+    def test_read_timeout_override(self, monkeypatch):
+        """READ_TIMEOUT 优先于 TIMEOUT"""
+        monkeypatch.setenv("STEAM_WORKSHOP_SYNC_TIMEOUT", "12")
+        monkeypatch.setenv("STEAM_WORKSHOP_SYNC_READ_TIMEOUT", "45")
+        assert TransportConfig.from_env().read_timeout == 45
+
+
+class TestTransport:
+    """测试请求发送与连接复用统计"""
+
+    def test_connection_reuse(self, server):
+        """同一 host 的请求复用 keep-alive 连接"""
+        transport = Transport(TransportConfig())
+        url = f"http://127.0.0.1:{server.server_port}/"
+        for _ in range(5):
+            response = transport.get(url)
+            ensure_encoding(response)
+            assert response.text == "创意工坊"
+
+        stats = transport.stats()
+        assert stats.requests == 5
+        assert stats.connections == 1
+        assert stats.reuse_ratio == pytest.approx(0.8)
+        assert server.encodings[0] == accept_encoding()
+        transport.close()
+
+    def test_proxied_connection_reuse(self, server):
+        """经由代理发出的请求与新建连接同样计入统计"""
+        proxy_pool = ProxyPool([f"http://127.0.0.1:{server.server_port}"], rate=100)
+        transport = Transport(TransportConfig(), proxy_pool=proxy_pool)
+        for _ in range(4):
+            assert transport.get("http://steamcommunity.invalid/").content == "创意工坊".encode()
+
+        stats = transport.stats()
+        assert stats.requests == 4
+        assert stats.connections == 1
+        assert stats.reuse_ratio == pytest.approx(0.75)
+        transport.close()
+
+    def test_http2_fallback(self, monkeypatch):
+        """未安装 httpx 时退回 requests"""
+        monkeypatch.setattr(transport_module, "_has_module", lambda name: False)
+        transport = Transport(TransportConfig(http2=True))
+        assert transport.client is None
+        assert transport.http_version == "HTTP/1.1"
+
+    def test_empty_stats(self):
+        """没有请求时复用率为 0"""
+        assert TransportStats().reuse_ratio == 0.0
+        assert Transport().stats().requests == 0
@@ -0,0 +1,143 @@
+"""
+测试 workers.update_feed 模块中的 lastupdated 更新流。
+"""
+
+from datetime import datetime
+
+from models.workshop import Pagination, WorkshopItem
+from tests.conftest import make_item
+from workers.update_feed import UpdateFeed
+
+
+class FakeWorkshop:
+    """按页返回固定内容、详情中带有更新时间的 Workshop 替身"""
+
+    def __init__(self, pages: list[list[tuple[str, datetime]]], listed_times: bool = False):
+        self.pages = pages
+        self.updated_at = {item_id: updated_at for page in pages for item_id, updated_at in page}
+        # 列表中是否带有更新时间
+        self.listed_times = listed_times
+        # 详情请求失败的次数 {item_id: 剩余失败次数}
+        self.failures: dict[str, int] = {}
+        self.requested_pages = []
+        self.detail_requests = []
+
+    def get_updated_items(self, page: int = 1):
+        self.requested_pages.append(page)
+        items = [
+            make_item(item_id, updated_at=updated_at if self.listed_times else None)
+            for item_id, updated_at in self.pages[page - 1]
+        ]
+        return {"pagination": Pagination(total_pages=len(self.pages)), "items": items}
+
+    def get_items_info(self, item: WorkshopItem):
+        self.detail_requests.append(item.id)
+        if self.failures.get(item.id, 0) > 0:
+            self.failures[item.id] -= 1
+            raise RuntimeError("timeout")
+        return make_item(item.id, updated_at=self.updated_at[item.id])
+
+
+class TestUpdateFeed:
+    """测试 UpdateFeed 的水位线与提前终止"""
+
+    def test_first_poll_reads_max_pages(self):
+        """测试首次轮询读取 max_pages 页并建立水位线"""
+        workshop = FakeWorkshop(
+            [
+                [("3", datetime(2024, 1, 3)), ("2", datetime(2024, 1, 2))],
+                [("1", datetime(2024, 1, 1))],
+                [("0", datetime(2023, 1, 1))],
+            ]
+        )
+        saved = []
+        feed = UpdateFeed(workshop, saved.append, max_pages=2)
+
+        assert feed.poll() == 3
+        assert workshop.requested_pages == [1, 2]
+        assert feed.watermark == datetime(2024, 1, 3)
+
+    def test_stop_at_watermark(self):
+        """测试遇到早于水位线的项目即停止"""
+        workshop = FakeWorkshop(
+            [
+                [("4", datetime(2024, 1, 5)), ("3", datetime(2024, 1, 3)), ("2", datetime(2024, 1, 2))],
+                [("1", datetime(2024, 1, 1))],
+            ]
+        )
+        saved = []
+        feed = UpdateFeed(workshop, saved.append, max_pages=5)
+        feed.watermark = datetime(2024, 1, 3)
+
+        assert feed.poll() == 2
+        assert [item.id for item in saved] == ["4", "3"]
+        assert workshop.requested_pages == [1]
+        assert workshop.detail_requests == ["4", "3", "2"]
+        assert feed.watermark == datetime(2024, 1, 5)
+
+    def test_resume_when_changes_exceed_max_pages(self):
+        """测试变更多于 max_pages 页时水位线不前移，下次轮询从未读到的页继续"""
+        workshop = FakeWorkshop(
+            [
+                [("6", datetime(2024, 1, 6)), ("5", datetime(2024, 1, 5))],
+                [("4", datetime(2024, 1, 4)), ("3", datetime(2024, 1, 3))],
+                [("2", datetime(2024, 1, 2)), ("1", datetime(2024, 1, 1, 12))],
+                [("0", datetime(2023, 1, 1))],
+            ]
+        )
+        saved = []
+        feed = UpdateFeed(workshop, saved.append, max_pages=2)
+        feed.watermark = datetime(2024, 1, 1)
+
+        assert feed.poll() == 4
+        assert workshop.requested_pages == [1, 2]
+        assert feed.watermark == datetime(2024, 1, 1)
+
+        assert feed.poll() == 2
+        assert workshop.requested_pages == [1, 2, 3, 4]
+        assert [item.id for item in saved] == ["6", "5", "4", "3", "2", "1"]
+        assert feed.watermark == datetime(2024, 1, 6)
+        assert feed.resume_page == 1
+
+    def test_listed_time_checked_before_details(self):
+        """测试列表中带有更新时间时，早于水位线的项目不再请求详情"""
+        workshop = FakeWorkshop(
+            [[("4", datetime(2024, 1, 5)), ("3", datetime(2024, 1, 3)), ("2", datetime(2024, 1, 2))]],
+            listed_times=True,
+        )
+        saved = []
+        feed = UpdateFeed(workshop, saved.append)
+        feed.watermark = datetime(2024, 1, 3)
+
+        assert feed.poll() == 2
+        assert workshop.detail_requests == ["4", "3"]
+
+    def test_failed_item_retried(self):
+        """测试处理失败的项目在水位线越过它之后仍会在下次轮询时重试"""
+        workshop = FakeWorkshop(
+            [[("5", datetime(2024, 1, 5)), ("4", datetime(2024, 1, 4)), ("3", datetime(2024, 1, 3))]]
+        )
+        workshop.failures["4"] = 1
+        saved = []
+        feed = UpdateFeed(workshop, saved.append)
+
+        assert feed.poll() == 2
+        assert feed.watermark == datetime(2024, 1, 5)
+        assert list(feed.failed) == ["4"]
+
+        # 第二次轮询在 4 处停止（早于水位线），但 4 仍作为待重试项目被处理
+        assert feed.poll() == 2
+        assert [item.id for item in saved] == ["5", "3", "5", "4"]
+        assert feed.failed == {}
+
+    def test_give_up_after_max_attempts(self):
+        """测试超过最大尝试次数后放弃重试"""
+        workshop = FakeWorkshop([[("1", datetime(2024, 1, 1))]])
+        workshop.failures["1"] = 10
+        feed = UpdateFeed(workshop, lambda item: None, max_attempts=2)
+
+        feed.poll()
+        assert list(feed.failed) == ["1"]
+        feed.poll()
+        assert feed.failed == {}
+        assert workshop.detail_requests == ["1", "1"]
@@ -1,7 +1,12 @@
-from datetime import datetime
+from datetime import UTC, datetime
 import re
 
 
+def utcnow() -> datetime:
+    """当前 UTC 时间（不带时区，与数据库中保存的时间一致）"""
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
 def date_formater(date_str: str | None) -> datetime | None:
     """
     解析 Steam Workshop 的多种日期格式并转换为 datetime 对象。
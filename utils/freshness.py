@@ -0,0 +1,202 @@
+from collections import deque
+from datetime import datetime, timedelta
+import math
+import os
+import threading
+
+from models.workshop import WorkshopItem
+from utils import metrics
+from utils.formater import utcnow
+
+# 发现变更的通道，按发现速度从快到慢
+TIER_FAST_LANE = "fast_lane"
+TIER_UPDATE_FEED = "update_feed"
+TIER_FULL_CRAWL = "full_crawl"
+# 首次同步到的历史项目（变更早于上一轮开始），不反映同步延迟，单独统计
+TIER_BACKFILL = "backfill"
+TIERS = (TIER_FAST_LANE, TIER_UPDATE_FEED, TIER_FULL_CRAWL, TIER_BACKFILL)
+
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+def percentile(values: list[float], quantile: float) -> float:
+    """
+    最近秩法计算分位数
+
+    Args:
+        values: 已排序的样本
+        quantile: 分位（0-1）
+
+    Returns:
+        float: 分位数，没有样本时为 nan
+    """
+    if not values:
+        return math.nan
+    rank = max(math.ceil(quantile * len(values)), 1)
+    return values[rank - 1]
+
+
+def format_lag(seconds: float) -> str:
+    """把延迟格式化为便于阅读的字符串，例如 42秒、15.2分钟、3.1小时"""
+    if math.isnan(seconds):
+        return "-"
+    if seconds < 60:
+        return f"{seconds:.0f}秒"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f}分钟"
+    if seconds < 86400:
+        return f"{seconds / 3600:.1f}小时"
+    return f"{seconds / 86400:.1f}天"
+
+
+class FreshnessTracker:
+    """
+    数据新鲜度追踪
+
+    新鲜度延迟是 Steam 上的更新时间（updated_at，未更新过的项目为 created_at）到本服务同步入库的时间差，
+    只在项目新增或 updated_at 发生变化时记录。每个通道保留最近 window 个样本，用于计算分位数；
+    全量样本同时写入 steam_workshop_sync_freshness_lag_seconds 直方图。
+
+    首次同步、且变更时间早于上一轮开始（第一轮时为追踪开始）的项目是补录的历史数据，
+    例如首次运行或新增 App 时的全量同步，记在 backfill 通道，不计入合并的分位数。
+    """
+
+    def __init__(self, app_id: str, window: int = 1000, utc_offset: float = 0.0) -> None:
+        """
+        Args:
+            app_id: Steam Workshop APP ID
+            window: 每个通道保留的最近样本数
+            utc_offset: Steam 页面时间相对 UTC 的偏移（小时），synced_at 使用 UTC
+        """
+        self.app_id = app_id
+        self.window = window
+        self.utc_offset = timedelta(hours=utc_offset)
+        # 列表页显示的总条目数与数据库中该 App 的项目数，用于估计尚未同步过的项目数
+        self.total_entries: int | None = None
+        self.known_items: int | None = None
+        self._samples: dict[str, deque[float]] = {}
+        self._counts: dict[str, int] = {}
+        self._started = utcnow()
+        self._cycle_started: datetime | None = None
+        self.previous_cycle_started: datetime | None = None
+        self._lock = threading.Lock()
+        metrics.UNSEEN_ITEMS.labels(app_id).set_function(lambda: math.nan if self.unseen is None else self.unseen)
+
+    @classmethod
+    def from_env(cls, app_id: str) -> "FreshnessTracker":
+        return cls(
+            app_id,
+            window=int(os.environ.get("STEAM_WORKSHOP_SYNC_FRESHNESS_WINDOW", 1000)),
+            utc_offset=float(os.environ.get("STEAM_WORKSHOP_SYNC_STEAM_UTC_OFFSET", 0)),
+        )
+
+    def start_cycle(self, started: datetime | None = None) -> None:
+        """一轮完整爬取开始时调用，记录上一轮的开始时间（UTC）"""
+        self.previous_cycle_started = self._cycle_started
+        self._cycle_started = started or utcnow()
+
+    def changed_at(self, item: WorkshopItem) -> datetime | None:
+        """项目在 Steam 上的变更时间（换算为 UTC），没有时间时返回 None"""
+        changed_at = item.updated_at or item.created_at
+        if changed_at is None:
+            return None
+        return changed_at - self.utc_offset
+
+    def lag(self, item: WorkshopItem, synced_at: datetime) -> float | None:
+        """项目的新鲜度延迟（秒），没有 Steam 时间时返回 None；时钟误差导致的负值按 0 计"""
+        changed_at = self.changed_at(item)
+        if changed_at is None:
+            return None
+        return max((synced_at - changed_at).total_seconds(), 0.0)
+
+    def observe(
+        self, item: WorkshopItem, tier: str, synced_at: datetime | None = None, first_sync: bool = False
+    ) -> float | None:
+        """
+        记录一次变更的新鲜度延迟
+
+        Args:
+            item: 已入库的项目
+            tier: 发现该变更的通道
+            synced_at: 入库时间（UTC，不带时区），默认为当前时间
+            first_sync: 是否为首次同步该项目，变更早于上一轮开始时改记在 backfill 通道
+
+        Returns:
+            float: 延迟（秒），无法计算时为 None
+        """
+        lag = self.lag(item, synced_at or utcnow())
+        if lag is None:
+            return None
+        if first_sync and self.changed_at(item) < (self.previous_cycle_started or self._started):
+            tier = TIER_BACKFILL
+
+        with self._lock:
+            samples = self._samples.get(tier)
+            if samples is None:
+                samples = self._samples[tier] = deque(maxlen=self.window)
+                self._register(tier)
+            samples.append(lag)
+            self._counts[tier] = self._counts.get(tier, 0) + 1
+        metrics.FRESHNESS_LAG_SECONDS.labels(self.app_id, tier).observe(lag)
+        return lag
+
+    def _register(self, tier: str) -> None:
+        for quantile in QUANTILES:
+            metrics.FRESHNESS_LAG.labels(self.app_id, tier, str(quantile)).set_function(
+                lambda tier=tier, quantile=quantile: self.percentiles(tier)[quantile]
+            )
+
+    def percentiles(self, tier: str | None = None) -> dict[float, float]:
+        """
+        最近样本的分位数
+
+        Args:
+            tier: 通道，None 表示合并除 backfill 外的所有通道
+
+        Returns:
+            dict: {分位: 延迟（秒）}，没有样本时为 nan
+        """
+        with self._lock:
+            if tier is None:
+                values = [
+                    lag for name, samples in self._samples.items() if name != TIER_BACKFILL for lag in samples
+                ]
+            else:
+                values = list(self._samples.get(tier, ()))
+        values.sort()
+        return {quantile: percentile(values, quantile) for quantile in QUANTILES}
+
+    @property
+    def unseen(self) -> int | None:
+        """估计尚未同步过的项目数，列表总数未知时为 None"""
+        if self.total_entries is None or self.known_items is None:
+            return None
+        return max(self.total_entries - self.known_items, 0)
+
+    def report(self) -> dict:
+        """按通道汇总的新鲜度报告"""
+        with self._lock:
+            tiers = [tier for tier in TIERS if tier in self._samples] + sorted(set(self._samples) - set(TIERS))
+            counts = dict(self._counts)
+        return {
+            "app_id": self.app_id,
+            "unseen": self.unseen,
+            "tiers": {
+                tier: {
+                    "observed": counts[tier],
+                    **{f"p{round(quantile * 100)}": lag for quantile, lag in self.percentiles(tier).items()},
+                }
+                for tier in tiers
+            },
+        }
+
+    def summary(self) -> str:
+        """一行文本摘要，用于每轮结束时的日志"""
+        report = self.report()
+        parts = [
+            f"{tier} p50={format_lag(stats['p50'])} p90={format_lag(stats['p90'])} p99={format_lag(stats['p99'])}"
+            f"（{stats['observed']} 次）"
+            for tier, stats in report["tiers"].items()
+        ]
+        unseen = "未知" if report["unseen"] is None else f"{report['unseen']} 个"
+        return f"{'；'.join(parts) or '暂无变更'}；估计未同步项目 {unseen}"
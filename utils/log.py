@@ -1,14 +1,141 @@
+import atexit
+from datetime import datetime
+import json
 import logging
+from logging.handlers import QueueHandler, QueueListener
+import os
+import queue
+import threading
+import time
 
+TEXT_FORMAT = "[%(levelname)s] %(message)s"
+
+# LogRecord 自带的属性，其余属性视为通过 extra 传入的结构化字段
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON，extra 传入的字段原样保留"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    按调用位置限制 INFO 及以下日志的频率
+
+    每个 logger.info(...) 所在的代码行有独立的令牌桶，超出部分直接丢弃（不会格式化消息），
+    下一条放行的日志末尾注明省略的条数。WARNING 及以上的日志不受限制。
+    """
+
+    def __init__(self, rate: float = 10.0, burst: float | None = None) -> None:
+        """
+        Args:
+            rate: 每个调用位置每秒放行的日志数，0 表示不限制
+            burst: 令牌桶容量，默认与 rate 相同
+        """
+        super().__init__()
+        self.rate = rate
+        self.burst = burst or max(rate, 1.0)
+        self._sites: dict[tuple[str, int], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno > logging.INFO:
+            return True
+
+        now = time.monotonic()
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            # [令牌数, 上次补充时间, 省略条数]
+            site = self._sites.get(key)
+            if site is None:
+                site = self._sites[key] = [self.burst, now, 0]
+            site[0] = min(self.burst, site[0] + (now - site[1]) * self.rate)
+            site[1] = now
+            if site[0] < 1:
+                site[2] += 1
+                return False
+            site[0] -= 1
+            suppressed, site[2] = site[2], 0
+
+        if suppressed:
+            record.msg = f"{record.msg}（此前省略 {suppressed} 条）"
+        return True
+
+
+# 实际输出到终端的 handler，在后台线程中由 listener 调用
 handler = logging.StreamHandler()
 handler.setLevel(logging.DEBUG)
-formatter = logging.Formatter("[%(levelname)s] %(message)s")
-handler.setFormatter(formatter)
+handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+# 各模块的 logger 只把日志放入队列，格式化输出与写 stderr 不占用爬取线程
+_queue: queue.SimpleQueue = queue.SimpleQueue()
+queue_handler = QueueHandler(_queue)
+listener = QueueListener(_queue, handler, respect_handler_level=True)
+listener.start()
+atexit.register(listener.stop)
+
+rate_limit = RateLimitFilter(0)
 
+_level = logging.INFO
+_loggers: list[logging.Logger] = []
 
-def get_logger(name: str):
-    logger = logging.Logger(name)
-    logger.setLevel(logging.DEBUG)
-    logger.addHandler(handler)
+
+def get_logger(name: str) -> logging.Logger:
+    logger = logging.getLogger(name)
+    if queue_handler not in logger.handlers:
+        logger.setLevel(_level)
+        logger.addHandler(queue_handler)
+        logger.addFilter(rate_limit)
+        logger.propagate = False
+        _loggers.append(logger)
 
     return logger
+
+
+def configure_logging(level: str | None = None, fmt: str | None = None, rate: float | None = None) -> None:
+    """
+    按环境变量配置日志级别、格式与限频，应在 load_dotenv() 之后调用
+
+    级别在 logger 上判断，被过滤掉的日志不会创建记录也不会格式化。
+
+    Args:
+        level: 日志级别，为空时读取 STEAM_WORKSHOP_SYNC_LOG_LEVEL（默认 INFO）
+        fmt: text 或 json，为空时读取 STEAM_WORKSHOP_SYNC_LOG_FORMAT（默认 text）
+        rate: 每个调用位置每秒最多输出的 INFO 日志数，为空时读取 STEAM_WORKSHOP_SYNC_LOG_RATE_LIMIT（默认 10）
+    """
+    global _level
+
+    level = level or os.environ.get("STEAM_WORKSHOP_SYNC_LOG_LEVEL", "INFO")
+    fmt = (fmt or os.environ.get("STEAM_WORKSHOP_SYNC_LOG_FORMAT", "text")).strip().lower()
+    if rate is None:
+        rate = float(os.environ.get("STEAM_WORKSHOP_SYNC_LOG_RATE_LIMIT", 10))
+
+    _level = logging.getLevelName(level.strip().upper())
+    if not isinstance(_level, int):
+        raise ValueError(f"未知的日志级别: {level}")
+    for logger in _loggers:
+        logger.setLevel(_level)
+
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    elif fmt == "text":
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    else:
+        raise ValueError(f"未知的日志格式: {fmt}")
+
+    rate_limit.rate = rate
+    rate_limit.burst = max(rate, 1.0)
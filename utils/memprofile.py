@@ -0,0 +1,256 @@
+from collections import Counter
+import contextlib
+from datetime import datetime
+import gc
+import json
+import os
+from pathlib import Path
+import threading
+import tracemalloc
+
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# 不计入分配统计的帧
+_IGNORED_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>")
+
+
+def format_bytes(size: float) -> str:
+    """把字节数格式化为 MB，带符号的差值保留正负号"""
+    return f"{size / 1024 / 1024:+.2f} MB" if size < 0 else f"{size / 1024 / 1024:.2f} MB"
+
+
+def count_objects() -> Counter:
+    """按类型统计 GC 追踪的对象数（容器对象，例如 BeautifulSoup 节点、SQLModel 实例、字典）"""
+    return Counter(type(obj).__qualname__ for obj in gc.get_objects())
+
+
+class _Stage:
+    __slots__ = ("name", "baseline", "peak")
+
+    def __init__(self, name: str, baseline: int) -> None:
+        self.name = name
+        self.baseline = baseline
+        self.peak = baseline
+
+
+class MemoryProfiler:
+    """
+    长时间运行时的内存诊断
+
+    开启后用 tracemalloc 追踪分配，每 every 轮爬取结束时拍一次快照，与上一次快照比较，
+    输出增长最多的分配位置与 GC 对象数增长最多的类型；stage() 记录各阶段相对进入时的内存峰值。
+    设置 directory 时同时把报告（JSON）与快照（可用 tracemalloc.Snapshot.load 读取）写入该目录。
+    """
+
+    def __init__(self, every: int = 10, top: int = 10, frames: int = 1, directory: str | None = None) -> None:
+        """
+        Args:
+            every: 每隔多少轮拍一次快照
+            top: 报告中列出的分配位置与类型数
+            frames: tracemalloc 记录的调用栈深度，越深越准确，开销也越大
+            directory: 报告与快照的输出目录，None 表示只写日志
+        """
+        self.every = every
+        self.top = top
+        self.frames = frames
+        self.directory = Path(directory) if directory else None
+        self.cycles = 0
+        self.stage_peaks: dict[str, int] = {}
+        self.stage_calls: dict[str, int] = {}
+        self._snapshot: tracemalloc.Snapshot | None = None
+        self._objects: Counter | None = None
+        self._stack: list[_Stage] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "MemoryProfiler | None":
+        """按 STEAM_WORKSHOP_SYNC_MEMPROFILE_EVERY 创建，未设置或为 0 时返回 None"""
+        every = int(os.environ.get("STEAM_WORKSHOP_SYNC_MEMPROFILE_EVERY", 0))
+        if every <= 0:
+            return None
+        return cls(
+            every=every,
+            top=int(os.environ.get("STEAM_WORKSHOP_SYNC_MEMPROFILE_TOP", 10)),
+            frames=int(os.environ.get("STEAM_WORKSHOP_SYNC_MEMPROFILE_FRAMES", 1)),
+            directory=os.environ.get("STEAM_WORKSHOP_SYNC_MEMPROFILE_DIR") or None,
+        )
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self._snapshot = self.take_snapshot()
+        self._objects = count_objects()
+
+    def stop(self) -> None:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def take_snapshot(self) -> tracemalloc.Snapshot:
+        snapshot = tracemalloc.take_snapshot()
+        return snapshot.filter_traces([tracemalloc.Filter(False, filename) for filename in _IGNORED_FILES])
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """
+        记录一个阶段的内存峰值（相对进入时的增长）
+
+        tracemalloc 的峰值是全局的，只在主线程上统计，嵌套的阶段会把峰值向外层传递。
+        """
+        if threading.current_thread() is not threading.main_thread():
+            yield
+            return
+
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            self._stack[-1].peak = max(self._stack[-1].peak, peak)
+        tracemalloc.reset_peak()
+        stage = _Stage(name, current)
+        self._stack.append(stage)
+        try:
+            yield
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            stage.peak = max(stage.peak, peak)
+            self._stack.pop()
+            if self._stack:
+                self._stack[-1].peak = max(self._stack[-1].peak, stage.peak)
+            with self._lock:
+                self.stage_peaks[name] = max(self.stage_peaks.get(name, 0), stage.peak - stage.baseline)
+                self.stage_calls[name] = self.stage_calls.get(name, 0) + 1
+
+    def cycle_finished(self) -> dict | None:
+        """
+        一轮爬取结束，每 every 轮生成一次报告
+
+        Returns:
+            dict: 本次的报告，未到报告轮次时为 None
+        """
+        self.cycles += 1
+        if self.cycles % self.every:
+            return None
+        report = self.report()
+        self.log(report)
+        if self.directory is not None:
+            self.export(report)
+        return report
+
+    def report(self) -> dict:
+        """与上一次快照比较，返回内存增长报告"""
+        snapshot = self.take_snapshot()
+        objects = count_objects()
+        current, peak = tracemalloc.get_traced_memory()
+
+        growth = []
+        if self._snapshot is not None:
+            for stat in snapshot.compare_to(self._snapshot, "lineno")[: self.top]:
+                frame = stat.traceback[0]
+                growth.append(
+                    {
+                        "site": f"{frame.filename}:{frame.lineno}",
+                        "size": stat.size,
+                        "size_diff": stat.size_diff,
+                        "count": stat.count,
+                        "count_diff": stat.count_diff,
+                    }
+                )
+
+        object_growth = []
+        if self._objects is not None:
+            diff = objects.copy()
+            diff.subtract(self._objects)
+            object_growth = [
+                {"type": name, "count": objects[name], "diff": change}
+                for name, change in diff.most_common(self.top)
+                if change > 0
+            ]
+
+        self._snapshot = snapshot
+        self._objects = objects
+        with self._lock:
+            stages = {
+                name: {"peak_bytes": self.stage_peaks[name], "calls": self.stage_calls[name]}
+                for name in sorted(self.stage_peaks)
+            }
+        return {
+            "cycle": self.cycles,
+            "current_bytes": current,
+            "peak_bytes": peak,
+            "allocation_growth": growth,
+            "object_growth": object_growth,
+            "stages": stages,
+        }
+
+    def log(self, report: dict) -> None:
+        logger.info(
+            f"🧠 内存诊断（第 {report['cycle']} 轮）: 当前 {format_bytes(report['current_bytes'])}，"
+            f"峰值 {format_bytes(report['peak_bytes'])}"
+        )
+        for entry in report["allocation_growth"][:5]:
+            logger.info(
+                f"   {entry['site']}: {format_bytes(entry['size'])}（{format_bytes(entry['size_diff'])}），"
+                f"{entry['count']} 个（{entry['count_diff']:+d}）"
+            )
+        if report["object_growth"]:
+            growth = "，".join(f"{entry['type']} {entry['diff']:+d}" for entry in report["object_growth"][:5])
+            logger.info(f"   对象增长: {growth}")
+        if report["stages"]:
+            peaks = "，".join(f"{name} {format_bytes(stats['peak_bytes'])}" for name, stats in report["stages"].items())
+            logger.info(f"   各阶段峰值: {peaks}")
+
+    def export(self, report: dict) -> Path:
+        """把报告与最近一次快照写入输出目录，返回报告文件路径"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"memprofile-{report['cycle']:06d}-{datetime.now():%Y%m%d-%H%M%S}"
+        if self._snapshot is not None:
+            self._snapshot.dump(str(self.directory / f"{name}.tracemalloc"))
+        path = self.directory / f"{name}.json"
+        path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        return path
+
+
+_profiler: MemoryProfiler | None = None
+_NOOP = contextlib.nullcontext()
+
+
+def configure(profiler: MemoryProfiler | None = None) -> MemoryProfiler | None:
+    """
+    开启内存诊断
+
+    Args:
+        profiler: 使用的诊断器，为空时按环境变量创建（未开启时为 None）
+
+    Returns:
+        当前的诊断器，未开启时为 None
+    """
+    global _profiler
+
+    shutdown()
+    _profiler = profiler or MemoryProfiler.from_env()
+    if _profiler is not None:
+        _profiler.start()
+        logger.info(f"🧠 内存诊断已开启，每 {_profiler.every} 轮输出一次报告")
+    return _profiler
+
+
+def shutdown() -> None:
+    global _profiler
+
+    if _profiler is not None:
+        _profiler.stop()
+        _profiler = None
+
+
+def stage(name: str):
+    """阶段内存峰值的上下文管理器，未开启时返回空的上下文管理器"""
+    if _profiler is None:
+        return _NOOP
+    return _profiler.stage(name)
+
+
+def cycle_finished() -> dict | None:
+    """一轮爬取结束时调用，未开启时不做任何事"""
+    if _profiler is None:
+        return None
+    return _profiler.cycle_finished()
@@ -0,0 +1,370 @@
+from collections.abc import Callable, Iterable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import math
+import os
+import threading
+
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+# 请求、解析、数据库等单次操作的默认分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# 下载耗时的分桶（秒）
+DOWNLOAD_BUCKETS = (1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+# 新鲜度延迟的分桶（秒），从 1 分钟到 30 天
+FRESHNESS_BUCKETS = (
+    60.0, 300.0, 900.0, 1800.0, 3600.0, 7200.0, 21600.0, 43200.0, 86400.0, 259200.0, 604800.0, 2592000.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterChild:
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        if amount < 0:
+            raise ValueError("计数器只能增加")
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild:
+    def __init__(self) -> None:
+        self.value = 0.0
+        self.function: Callable[[], float] | None = None
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """抓取时调用 function 取值（例如队列长度），热路径上没有任何开销"""
+        self.function = function
+
+    def get(self) -> float:
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception as e:
+                logger.debug(f"读取指标值失败: {e}")
+                return math.nan
+        return self.value
+
+
+class _HistogramChild:
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        # 分桶只有十几个，线性查找即可；超出最后一个分桶的值只计入 +Inf
+        index = len(self.buckets)
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = position
+                break
+        with self._lock:
+            if index < len(self.buckets):
+                self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+class _Metric:
+    """带标签的指标，labels() 返回的子指标会被缓存，热路径上只有一次字典查找"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **kwargs):
+        """
+        获取指定标签值的子指标
+
+        Args:
+            *values: 按 labelnames 顺序的标签值
+            **kwargs: 或者按名称指定标签值
+        """
+        if kwargs:
+            values = tuple(str(kwargs[name]) for name in self.labelnames)
+        else:
+            values = tuple(str(value) for value in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"指标 {self.name} 需要标签 {self.labelnames}")
+
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"指标 {self.name} 带有标签，需要先调用 labels()")
+        return self.labels()
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+            for values, child in list(self._children.items())
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default().dec(amount)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._default().set_function(function)
+
+    def samples(self) -> list[str]:
+        samples = []
+        for values, child in list(self._children.items()):
+            value = child.get()
+            if not math.isnan(value):
+                samples.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}")
+        return samples
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+    def samples(self) -> list[str]:
+        samples = []
+        for values, child in list(self._children.items()):
+            with child._lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts, strict=True):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+                samples.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, values, 'le="+Inf"')
+            samples.append(f"{self.name}_bucket{labels} {count}")
+            samples.append(f"{self.name}_sum{_format_labels(self.labelnames, values)} {_format_value(total)}")
+            samples.append(f"{self.name}_count{_format_labels(self.labelnames, values)} {count}")
+        return samples
+
+
+class Registry:
+    """指标注册表，按 Prometheus 文本格式（0.0.4）输出"""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标 {metric.name} 已注册")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> _Metric | None:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+# 爬取
+REQUEST_SECONDS = REGISTRY.histogram(
+    "steam_workshop_sync_request_seconds", "页面请求耗时（秒），按页面类型与状态码", ["endpoint", "status"]
+)
+THROTTLED = REGISTRY.counter("steam_workshop_sync_throttled_total", "收到的 429 响应数", ["endpoint"])
+RETRIES = REGISTRY.counter("steam_workshop_sync_retries_total", "重试次数，按函数与原因", ["func", "reason"])
+PARSE_SECONDS = REGISTRY.histogram("steam_workshop_sync_parse_seconds", "页面解析耗时（秒）", ["page"])
+DB_UPSERT_SECONDS = REGISTRY.histogram("steam_workshop_sync_db_upsert_seconds", "单个项目入库耗时（秒）")
+ITEMS = REGISTRY.counter(
+    "steam_workshop_sync_items_total", "处理的项目数（processed、skipped、failed）", ["app_id", "result"]
+)
+CYCLE_SECONDS = REGISTRY.gauge("steam_workshop_sync_cycle_seconds", "最近一轮完整爬取的耗时（秒）", ["app_id"])
+QUEUE_DEPTH = REGISTRY.gauge("steam_workshop_sync_queue_depth", "队列长度", ["queue"])
+
+# 新鲜度
+FRESHNESS_LAG_SECONDS = REGISTRY.histogram(
+    "steam_workshop_sync_freshness_lag_seconds",
+    "Steam 更新时间到同步入库的延迟（秒），按发现变更的通道",
+    ["app_id", "tier"],
+    FRESHNESS_BUCKETS,
+)
+FRESHNESS_LAG = REGISTRY.gauge(
+    "steam_workshop_sync_freshness_lag_quantile_seconds", "最近变更的新鲜度延迟分位数（秒）", ["app_id", "tier", "quantile"]
+)
+UNSEEN_ITEMS = REGISTRY.gauge("steam_workshop_sync_unseen_items", "估计尚未同步过的项目数", ["app_id"])
+
+# 下载
+DOWNLOADS = REGISTRY.counter("steam_workshop_sync_downloads_total", "下载的 mod 数", ["method", "result"])
+DOWNLOAD_BYTES = REGISTRY.counter("steam_workshop_sync_download_bytes_total", "下载完成的 mod 大小（字节）", ["method"])
+DOWNLOAD_SECONDS = REGISTRY.histogram(
+    "steam_workshop_sync_download_seconds", "下载耗时（秒），Steam CMD 按会话计", ["method"], DOWNLOAD_BUCKETS
+)
+
+
+def endpoint_of(url: str) -> str:
+    """请求地址对应的页面类型，用作指标标签（避免把 item ID 等高基数值写进标签）"""
+    if "/workshop/browse" in url:
+        return "browse"
+    if "/sharedfiles/filedetails" in url:
+        return "details"
+    if "/GetPublishedFileDetails" in url:
+        return "file_details"
+    return "other"
+
+
+def record_retry(event) -> None:
+    """retry_on_error 的 on_retry 回调，统计重试次数"""
+    reason = str(event.status) if event.status is not None else (event.error or "error").split(":", 1)[0]
+    RETRIES.labels(event.func, reason).inc()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0", registry: Registry = REGISTRY) -> ThreadingHTTPServer:
+    """
+    在后台线程中启动 /metrics 服务
+
+    Args:
+        port: 监听端口，0 表示随机端口
+        host: 监听地址
+        registry: 输出的注册表
+
+    Returns:
+        ThreadingHTTPServer: 服务实例，server_address 为实际监听的地址
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.registry = registry
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+
+def start_from_env() -> ThreadingHTTPServer | None:
+    """按 STEAM_WORKSHOP_SYNC_METRICS_PORT 启动 /metrics 服务，未设置或为 0 时不启动"""
+    port = int(os.environ.get("STEAM_WORKSHOP_SYNC_METRICS_PORT", 0))
+    if port <= 0:
+        return None
+    host = os.environ.get("STEAM_WORKSHOP_SYNC_METRICS_HOST", "0.0.0.0")
+    server = start_metrics_server(port, host)
+    logger.info(f"📈 指标服务已启动: http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,72 @@
+from models.workshop import WorkshopItem
+
+
+class PaginationDriftTracker:
+    """
+    单轮爬取的翻页漂移追踪器
+
+    按 mostrecent 翻页时，页面之间的延迟内可能有新项目上传或旧项目被删除：
+        - 新增：所有项目整体下移，下一页开头会重复出现上一页末尾的项目
+        - 删除：所有项目整体上移，原本位于下一页开头的项目被挤到上一页，从而被跳过
+
+    追踪器记录本轮已见过的项目 ID 以跳过重复项，并通过列表总条目数的变化判断是否出现了上移缺口。
+    """
+
+    def __init__(self) -> None:
+        self.seen_ids: set[str] = set()
+        self.duplicates = 0
+        self._last_total: int | None = None
+
+    def reset(self) -> None:
+        """开始新一轮爬取时清空状态"""
+        self.seen_ids.clear()
+        self.duplicates = 0
+        self._last_total = None
+
+    def filter_unseen(self, items: list[WorkshopItem]) -> tuple[list[WorkshopItem], int]:
+        """
+        过滤本轮已经见过的项目，并将剩余项目标记为已见
+
+        Args:
+            items: 当前页解析出的项目列表
+
+        Returns:
+            tuple: (未见过的项目列表, 重复项目数)
+        """
+        unseen = []
+        duplicates = 0
+        for item in items:
+            if item.id in self.seen_ids:
+                duplicates += 1
+                continue
+            self.seen_ids.add(item.id)
+            unseen.append(item)
+
+        self.duplicates += duplicates
+        return unseen, duplicates
+
+    def detect_gap(self, total_entries: int | None, duplicates: int) -> int:
+        """
+        根据总条目数的变化判断是否有项目因列表上移而被跳过
+
+        列表上移时总条目数必然减少；若同时当前页没有出现任何重复项目，
+        说明上一页与当前页之间存在缺口，需要回读上一页。
+
+        Args:
+            total_entries: 当前页显示的总条目数（无法解析时为 None）
+            duplicates: 当前页中重复项目的数量
+
+        Returns:
+            int: 可能被跳过的项目数，0 表示无需回读
+        """
+        if total_entries is None:
+            return 0
+
+        previous, self._last_total = self._last_total, total_entries
+        if previous is None:
+            return 0
+
+        shift = total_entries - previous
+        if shift < 0 and duplicates == 0:
+            return -shift
+        return 0
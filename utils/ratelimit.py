@@ -0,0 +1,52 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    线程安全的令牌桶限流器
+
+    以 rate 个/秒的速度补充令牌，最多积累 capacity 个。多个爬虫实例共享同一个桶时，
+    它们的请求总速率不会超过 rate。
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        """
+        Args:
+            rate: 每秒补充的令牌数
+            capacity: 桶容量（允许的突发请求数），默认等于 rate 且至少为 1
+        """
+        if rate <= 0:
+            raise ValueError("rate 必须大于 0")
+
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        尝试取出令牌
+
+        Returns:
+            float: 0 表示已取出；否则为令牌足够前还需等待的秒数
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """阻塞直到取出令牌"""
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
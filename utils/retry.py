@@ -1,45 +1,380 @@
+import asyncio
 from collections.abc import Callable
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 import functools
+import inspect
+import random
+import threading
 import time
 from typing import Any
+from urllib.parse import urlsplit
 
+from pydantic import BaseModel, ConfigDict
+import requests
 from utils.log import get_logger
 
 logger = get_logger(__name__)
 
+# 表示服务端在限流的状态码，会触发按 host 共享的熔断
+THROTTLE_STATUS = (429,)
 
-def _calculate_wait_time(retry_count: int, base: float, maximum: float) -> float:
-    """计算指数退避等待时间"""
-    return min(base * (2 ** (retry_count - 1)), maximum)
 
+def parse_retry_after(value: str | None, now: datetime | None = None) -> float | None:
+    """
+    解析 Retry-After 响应头
+
+    Args:
+        value: 秒数或 HTTP 日期
+        now: 当前时间（用于测试），默认使用当前 UTC 时间
+
+    Returns:
+        float | None: 需要等待的秒数，无法解析时为 None
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - (now or datetime.now(timezone.utc))).total_seconds(), 0.0)
+
+
+def _status_of(result: Any = None, exception: BaseException | None = None) -> int | None:
+    """从返回值或异常附带的 response 中取出真实的状态码"""
+    response = result if exception is None else getattr(exception, "response", None)
+    status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _retry_after_of(result: Any = None, exception: BaseException | None = None) -> float | None:
+    response = result if exception is None else getattr(exception, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    return parse_retry_after(headers.get("Retry-After"))
 
-def _should_retry_status(status_code: int, retry_config: dict, default_retry: bool) -> bool:
-    """判断状态码是否需要重试"""
-    if status_code in retry_config:
-        return True
-    return default_retry and status_code >= 400
 
+class RetryPolicy(BaseModel):
+    """
+    重试策略
 
-def _get_max_retry_for_status(status_code: int, retry_config: dict, default_max: int) -> int | None:
-    """获取状态码对应的最大重试次数"""
-    return retry_config.get(status_code, default_max)
+    retry_on_status 中的次数为 None 表示不限次数，但仍受 budget（总等待时间）约束。
+    """
 
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    max_retries: int | None = 3
+    backoff_base: float = 1.0
+    backoff_max: float = 300.0
+    retry_on_status: dict[int, int | None] = {}
+    default_retry: bool = True
+    # 单次调用中所有重试与熔断等待时间之和的上限（秒），None 表示不限制
+    budget: float | None = None
+    respect_retry_after: bool = True
+    # 没有状态码的网络异常也按 max_retries 重试
+    retry_exceptions: tuple[type[BaseException], ...] = (requests.ConnectionError, requests.Timeout)
+
+    def should_retry_status(self, status_code: int) -> bool:
+        """判断状态码是否需要重试"""
+        if status_code in self.retry_on_status:
+            return True
+        return self.default_retry and status_code >= 400
+
+    def max_retries_for(self, status_code: int | None) -> int | None:
+        """状态码对应的最大重试次数，None 表示网络异常"""
+        if status_code is None:
+            return self.max_retries
+        return self.retry_on_status.get(status_code, self.max_retries)
+
+    def next_wait(self, previous: float, retry_after: float | None = None) -> float:
+        """
+        计算下一次等待时间（decorrelated jitter）
+
+        在 [backoff_base, previous * 3] 中随机取值，使并发的调用方错开重试时间。
+        服务端给出 Retry-After 时至少等待该时间。
+        """
+        wait = min(self.backoff_max, random.uniform(self.backoff_base, max(previous * 3, self.backoff_base)))
+        if retry_after is not None and self.respect_retry_after:
+            wait = max(wait, retry_after)
+        return wait
+
+
+class CircuitBreaker:
+    """
+    按 host 共享的熔断器
 
-def _log_retry(error_key: str, current: int, maximum: int | None, wait: float):
-    """记录重试日志"""
-    max_str = "" if maximum is None else f"/{maximum}"
-    logger.warning(f"{error_key} 错误，第 {current} 次重试{max_str}，等待 {wait:.1f} 秒...")
+    连续收到限流响应达到阈值时打开熔断，在冷却期内所有访问该 host 的调用方一起暂停；
+    每次重新打开冷却时间翻倍（且不短于服务端给出的 Retry-After），成功一次后复位。
+    单次响应的 Retry-After 只约束该请求自己的重试等待，不会单独打开熔断。
+    """
+
+    def __init__(self, threshold: int = 3, cooldown: float = 30.0, max_cooldown: float = 600.0) -> None:
+        """
+        Args:
+            threshold: 触发熔断的连续限流次数
+            cooldown: 初始冷却时间（秒）
+            max_cooldown: 最大冷却时间（秒）
+        """
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+        self._throttled = 0
+        self._trips = 0
+        self._open_until = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return self.remaining() > 0
+
+    def remaining(self) -> float:
+        """距熔断关闭的剩余秒数"""
+        with self._lock:
+            return max(self._open_until - time.monotonic(), 0.0)
+
+    def record_throttle(self, retry_after: float | None = None) -> float:
+        """
+        记录一次限流响应
+
+        Args:
+            retry_after: 响应中的 Retry-After（秒），熔断打开时作为冷却时间的下限
+
+        Returns:
+            float: 熔断打开时的冷却时间（秒），未打开时为 0
+        """
+        with self._lock:
+            self._throttled += 1
+            if self._throttled < self.threshold:
+                return 0.0
+
+            cooldown = min(self.cooldown * (2**self._trips), self.max_cooldown)
+            if retry_after is not None:
+                cooldown = max(cooldown, retry_after)
+            self._trips += 1
+            self._throttled = 0
+            self._open_until = max(self._open_until, time.monotonic() + cooldown)
+            return cooldown
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._throttled = 0
+            self._trips = 0
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(host: str) -> CircuitBreaker:
+    """获取 host 对应的熔断器（进程内共享）"""
+    with _breakers_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker()
+        return _breakers[host]
+
+
+def _find_host(args: tuple, kwargs: dict) -> str | None:
+    """从被装饰函数的参数中找出请求的 host"""
+    url = kwargs.get("url")
+    if url is None:
+        url = next((arg for arg in args if isinstance(arg, str) and arg.startswith(("http://", "https://"))), None)
+    if not isinstance(url, str):
+        return None
+    return urlsplit(url).netloc or None
+
+
+class RetryEvent(BaseModel):
+    """一次重试的结构化记录，传给 on_retry 回调"""
+
+    # 被装饰函数的名称
+    func: str
+    host: str | None = None
+    # 本次调用的第几次重试（从 1 开始）
+    attempt: int
+    # 同类错误的第几次重试与上限（None 表示不限次数）
+    retry: int
+    max_retries: int | None = None
+    status: int | None = None
+    error: str | None = None
+    retry_after: float | None = None
+    wait: float
+    # 含本次在内已累计的等待时间（秒）
+    waited: float
+
+
+class RetryState:
+    """单次调用的重试状态：各类错误的重试计数、上一次等待时间与已消耗的等待预算"""
+
+    def __init__(
+        self,
+        policy: RetryPolicy,
+        breaker: CircuitBreaker | None = None,
+        deadline: float | None = None,
+        on_retry: Callable[[RetryEvent], None] | None = None,
+        func: str = "",
+        host: str | None = None,
+    ) -> None:
+        """
+        Args:
+            policy: 重试策略
+            breaker: host 对应的熔断器
+            deadline: 整个调用的截止时间（time.monotonic()），超过后不再重试
+            on_retry: 每次决定重试时调用
+            func: 被装饰函数的名称（用于事件）
+            host: 请求的 host（用于事件）
+        """
+        self.policy = policy
+        self.breaker = breaker
+        self.deadline = deadline
+        self.on_retry = on_retry
+        self.func = func
+        self.host = host
+        self.counts: dict[int | str, int] = {}
+        self.attempts = 0
+        self.previous_wait = policy.backoff_base
+        self.waited = 0.0
+
+    def breaker_pause(self) -> float:
+        """
+        调用前因熔断需要等待的秒数，计入等待预算与截止时间
+
+        Returns:
+            float: 需要等待的秒数，熔断未打开时为 0
+
+        Raises:
+            TimeoutError: 等待会超过等待预算或调用截止时间
+        """
+        if self.breaker is None:
+            return 0.0
+        pause = self.breaker.remaining()
+        if pause <= 0:
+            return 0.0
+        if self.policy.budget is not None and self.waited + pause > self.policy.budget:
+            raise TimeoutError(f"{self.host} 熔断中（剩余 {pause:.1f} 秒），超过重试等待预算 {self.policy.budget:.0f} 秒")
+        if self.deadline is not None and time.monotonic() + pause > self.deadline:
+            raise TimeoutError(f"{self.host} 熔断中（剩余 {pause:.1f} 秒），等待后将超过调用截止时间")
+        self.waited += pause
+        logger.info(f"{self.host} 熔断中，等待 {pause:.1f} 秒")
+        return pause
+
+    def decide(self, result: Any = None, exception: BaseException | None = None) -> float | None:
+        """
+        根据返回值或异常决定是否重试
+
+        Returns:
+            float | None: 重试前需要等待的秒数；None 表示不重试（返回结果或抛出异常）
+        """
+        status = _status_of(result, exception)
+        if exception is None and status is None:
+            return None
+
+        if status is None:
+            if not isinstance(exception, self.policy.retry_exceptions):
+                return None
+            key: int | str = type(exception).__name__
+        else:
+            if status < 400:
+                if self.breaker is not None:
+                    self.breaker.record_success()
+                return None
+            if not self.policy.should_retry_status(status):
+                return None
+            key = status
+
+        retry_after = _retry_after_of(result, exception) if status is not None else None
+        if status in THROTTLE_STATUS and self.breaker is not None:
+            cooldown = self.breaker.record_throttle(retry_after)
+            if cooldown:
+                logger.warning(f"⛔ 持续收到 HTTP {status}，所有请求暂停 {cooldown:.0f} 秒")
+
+        self.counts[key] = self.counts.get(key, 0) + 1
+        current = self.counts[key]
+        maximum = self.policy.max_retries_for(status)
+        if maximum is not None and current > maximum:
+            return None
+
+        wait = self.policy.next_wait(self.previous_wait, retry_after)
+        if self.breaker is not None:
+            # 熔断打开时重试前至少等到冷却结束，这段时间同样计入预算与截止时间
+            wait = max(wait, self.breaker.remaining())
+        if self.policy.budget is not None and self.waited + wait > self.policy.budget:
+            logger.warning(f"重试等待已达预算 {self.policy.budget:.0f} 秒，停止重试")
+            return None
+        if self.deadline is not None and time.monotonic() + wait > self.deadline:
+            logger.warning("等待后将超过调用截止时间，停止重试")
+            return None
+
+        self.previous_wait = wait
+        self.waited += wait
+        self.attempts += 1
+        label = f"HTTP {status}" if status is not None else key
+        max_str = "" if maximum is None else f"/{maximum}"
+        logger.warning(f"{label} 错误，第 {current} 次重试{max_str}，等待 {wait:.1f} 秒...")
+
+        if self.on_retry is not None:
+            event = RetryEvent(
+                func=self.func,
+                host=self.host,
+                attempt=self.attempts,
+                retry=current,
+                max_retries=maximum,
+                status=status,
+                error=None if exception is None else f"{type(exception).__name__}: {exception}",
+                retry_after=retry_after,
+                wait=wait,
+                waited=self.waited,
+            )
+            try:
+                self.on_retry(event)
+            except Exception as e:
+                logger.error(f"重试回调失败: {e}")
+        return wait
+
+
+def _build_policy(
+    policy: RetryPolicy | None,
+    max_retries: int | None,
+    backoff_base: float,
+    backoff_max: float,
+    retry_on_status: dict | None,
+    default_retry: bool,
+    budget: float | None,
+) -> RetryPolicy:
+    if policy is not None:
+        return policy
+    return RetryPolicy(
+        max_retries=max_retries,
+        backoff_base=backoff_base,
+        backoff_max=backoff_max,
+        retry_on_status=retry_on_status or {},
+        default_retry=default_retry,
+        budget=budget,
+    )
 
 
 def retry_on_error(
-    max_retries: int = 3,
+    max_retries: int | None = 3,
     backoff_base: float = 1.0,
     backoff_max: float = 300.0,
     retry_on_status: dict | None = None,
     default_retry: bool = True,
+    budget: float | None = None,
+    policy: RetryPolicy | None = None,
+    circuit_breaker: bool = True,
+    deadline: float | None = None,
+    on_retry: Callable[[RetryEvent], None] | None = None,
 ):
     """
-    通用重试装饰器
+    通用重试装饰器，同时支持普通函数与协程函数
+
+    状态码取自返回值或异常附带的 response（requests.HTTPError），遵循 Retry-After，
+    等待时间带随机抖动。请求同一 host 的所有调用方共享熔断器，服务端持续限流时一起暂停。
+    装饰协程函数时使用 asyncio.sleep 等待，不会阻塞事件循环；任务被取消时 CancelledError 直接向上传播。
 
     Args:
         max_retries: 默认最大重试次数（None表示无限重试）
@@ -47,95 +382,83 @@ def retry_on_error(
         backoff_max: 最大退避时间（秒）
         retry_on_status: HTTP状态码重试策略 {状态码: 重试次数}，None表示无限重试
         default_retry: 对于未指定的状态码，是否使用默认重试次数
+        budget: 单次调用的总重试等待时间上限（秒，含熔断等待），None 表示不限制
+        policy: 直接指定重试策略，设置后忽略上面的参数
+        circuit_breaker: 是否使用按 host 共享的熔断器
+        deadline: 单次调用（含所有重试）的总时限（秒）。协程超时抛出 TimeoutError；
+            普通函数无法中断正在执行的调用，只保证不会因等待重试或熔断而超时；
+            熔断等待会超过预算或时限时抛出 TimeoutError
+        on_retry: 每次重试前调用，参数为 RetryEvent
 
     示例:
         @retry_on_error(
             max_retries=3,
-            retry_on_status={429: None, 500: 5},  # 429无限重试，500重试5次
+            retry_on_status={429: None, 500: 5},  # 429无限重试（受 budget 约束），500重试5次
+            budget=600,
         )
-        def my_request():
+        def my_request(url):
             ...
     """
-    retry_config = retry_on_status or {}
+    retry_policy = _build_policy(policy, max_retries, backoff_base, backoff_max, retry_on_status, default_retry, budget)
+
+    def new_state(func: Callable, args: tuple, kwargs: dict) -> RetryState:
+        host = _find_host(args, kwargs) if circuit_breaker else None
+        return RetryState(
+            retry_policy,
+            breaker=get_circuit_breaker(host) if host else None,
+            deadline=time.monotonic() + deadline if deadline is not None else None,
+            on_retry=on_retry,
+            func=func.__qualname__,
+            host=host,
+        )
 
     def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs) -> Any:
+                state = new_state(func, args, kwargs)
+                async with asyncio.timeout(deadline):
+                    while True:
+                        if (pause := state.breaker_pause()) > 0:
+                            await asyncio.sleep(pause)
+
+                        try:
+                            result = await func(*args, **kwargs)
+                        except Exception as e:
+                            wait = state.decide(exception=e)
+                            if wait is None:
+                                raise
+                        else:
+                            wait = state.decide(result=result)
+                            if wait is None:
+                                return result
+
+                        await asyncio.sleep(wait)
+
+            return async_wrapper
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs) -> Any:
-            retry_counts = {}
+            state = new_state(func, args, kwargs)
 
             while True:
+                if (pause := state.breaker_pause()) > 0:
+                    time.sleep(pause)
+
                 try:
                     result = func(*args, **kwargs)
-
-                    # 非 Response 对象直接返回
-                    if not hasattr(result, "status_code"):
-                        return result
-
-                    status_code = result.status_code
-
-                    # 不需要重试，直接返回
-                    if not _should_retry_status(status_code, retry_config, default_retry):
-                        return result
-
-                    # 初始化并递增重试计数
-                    retry_counts[status_code] = retry_counts.get(status_code, 0) + 1
-                    current_retry = retry_counts[status_code]
-
-                    # 获取最大重试次数
-                    max_retry = _get_max_retry_for_status(status_code, retry_config, max_retries)
-
-                    # 超过最大重试次数
-                    if max_retry is not None and current_retry > max_retry:
-                        return result
-
-                    # 等待并重试
-                    wait_time = _calculate_wait_time(current_retry, backoff_base, backoff_max)
-                    _log_retry(f"HTTP {status_code}", current_retry, max_retry, wait_time)
-                    time.sleep(wait_time)
-
                 except Exception as e:
-                    if not _handle_exception(e, retry_counts, retry_config, backoff_base, backoff_max):
+                    wait = state.decide(exception=e)
+                    if wait is None:
                         raise
+                else:
+                    wait = state.decide(result=result)
+                    if wait is None:
+                        return result
+
+                time.sleep(wait)
 
         return wrapper
 
     return decorator
-
-
-def _handle_exception(
-    exception: Exception,
-    retry_counts: dict,
-    retry_config: dict,
-    backoff_base: float,
-    backoff_max: float,
-) -> bool:
-    """
-    处理异常，判断是否需要重试
-
-    Returns:
-        bool: True表示已处理并需要重试，False表示未处理需要抛出
-    """
-    error_type = type(exception).__name__
-    exception_str = str(exception)
-
-    # 查找异常中包含的状态码
-    for status_code, max_retry in retry_config.items():
-        if str(status_code) not in exception_str:
-            continue
-
-        # 初始化并递增重试计数
-        retry_counts[error_type] = retry_counts.get(error_type, 0) + 1
-        current_retry = retry_counts[error_type]
-
-        # 超过最大重试次数
-        if max_retry is not None and current_retry > max_retry:
-            return False
-
-        # 等待并重试
-        wait_time = _calculate_wait_time(current_retry, backoff_base, backoff_max)
-        _log_retry(f"{error_type} (HTTP {status_code})", current_retry, max_retry, wait_time)
-        time.sleep(wait_time)
-        return True
-
-    # 未找到匹配的状态码
-    return False
@@ -0,0 +1,80 @@
+import threading
+import time
+
+
+class AdaptiveScheduler:
+    """
+    根据观测到的变更速率自适应调整循环间隔
+
+    将新增/更新项目视为泊松到达，用 EWMA 估计到达速率 λ（个/秒）。
+    间隔 T 内平均积累 λT 个变更，平均待同步数约为 λT/2，
+    因此取 T = 2 * target_stale / λ，并限制在 [min_interval, max_interval] 之间：
+    冷门 App 不再浪费请求，热门 App 则轮询得更勤。
+    """
+
+    def __init__(
+        self,
+        min_interval: float,
+        max_interval: float,
+        default_interval: float,
+        target_stale: float = 1.0,
+        alpha: float = 0.3,
+    ) -> None:
+        """
+        Args:
+            min_interval: 最小循环间隔（秒）
+            max_interval: 最大循环间隔（秒）
+            default_interval: 尚无速率估计时使用的间隔（秒）
+            target_stale: 目标平均待同步项目数
+            alpha: EWMA 平滑系数，越大越偏向最近的观测
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.default_interval = default_interval
+        self.target_stale = target_stale
+        self.alpha = alpha
+
+        self.rate: float | None = None
+        self._changes = 0
+        self._last_cycle_at: float | None = None
+        self._lock = threading.Lock()
+
+    def record_changes(self, count: int = 1) -> None:
+        """记录新增或更新的项目数（线程安全）"""
+        with self._lock:
+            self._changes += count
+
+    def end_cycle(self, now: float | None = None) -> float:
+        """
+        结束一轮爬取，更新速率估计并返回下一轮前的等待时间
+
+        首轮的变更包含程序启动前积压的数据，只作为基准，不参与速率估计。
+
+        Args:
+            now: 当前时间（time.monotonic()），默认取当前值
+
+        Returns:
+            float: 下一轮前应等待的秒数
+        """
+        now = time.monotonic() if now is None else now
+
+        with self._lock:
+            changes, self._changes = self._changes, 0
+            last_cycle_at, self._last_cycle_at = self._last_cycle_at, now
+
+        if last_cycle_at is not None and now > last_cycle_at:
+            sample = changes / (now - last_cycle_at)
+            self.rate = sample if self.rate is None else self.alpha * sample + (1 - self.alpha) * self.rate
+
+        return self.next_interval()
+
+    def next_interval(self) -> float:
+        """根据当前速率估计计算循环间隔"""
+        if self.rate is None:
+            interval = self.default_interval
+        elif self.rate <= 0:
+            interval = self.max_interval
+        else:
+            interval = 2 * self.target_stale / self.rate
+
+        return min(max(interval, self.min_interval), self.max_interval)
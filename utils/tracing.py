@@ -0,0 +1,288 @@
+from collections.abc import Callable, Iterator
+import contextlib
+import contextvars
+import cProfile
+from datetime import datetime
+import functools
+import importlib.util
+import io
+import json
+import os
+from pathlib import Path
+import pstats
+import random
+import threading
+import time
+
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+MODE_OFF = "off"
+MODE_JSONL = "jsonl"
+MODE_OTEL = "otel"
+
+
+class Span:
+    """一个本地记录的 span，字段与 OpenTelemetry 的 span 对应（trace_id/span_id 为十六进制）"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "attributes", "start_ns", "error")
+
+    def __init__(self, name: str, parent: "Span | None", attributes: dict) -> None:
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.error: str | None = None
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def record_exception(self, exception: BaseException) -> None:
+        self.error = f"{type(exception).__name__}: {exception}"
+
+
+class _NoopSpan:
+    """关闭追踪时使用的空 span，所有方法都不做任何事"""
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+    def set_attribute(self, key: str, value) -> None:
+        pass
+
+    def record_exception(self, exception: BaseException) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class JsonlTracer:
+    """
+    把 span 追加写入本地 JSONL 文件
+
+    每个 span 结束时写入一行；同一线程内嵌套的 span 通过 contextvars 关联父子关系。
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._current: contextvars.ContextVar[Span | None] = contextvars.ContextVar("span", default=None)
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        parent = self._current.get()
+        span = Span(name, parent, attributes)
+        token = self._current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            self._current.reset(token)
+            self._export(span, time.time_ns())
+
+    def _export(self, span: Span, end_ns: int) -> None:
+        record = {
+            "name": span.name,
+            "trace_id": span.trace_id,
+            "span_id": span.span_id,
+            "parent_id": span.parent_id,
+            "start_time_unix_nano": span.start_ns,
+            "end_time_unix_nano": end_ns,
+            "duration_ms": round((end_ns - span.start_ns) / 1e6, 3),
+            "status": "error" if span.error else "ok",
+            "attributes": span.attributes,
+        }
+        if span.error:
+            record["error"] = span.error
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class OtelTracer:
+    """通过 OpenTelemetry API 创建 span，导出方式由应用配置的 OpenTelemetry SDK 决定"""
+
+    def __init__(self) -> None:
+        from opentelemetry import trace
+
+        self._tracer = trace.get_tracer("steam-workshop-sync")
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes):
+        with self._tracer.start_as_current_span(name, attributes=attributes) as span:
+            yield span
+
+    def shutdown(self) -> None:
+        pass
+
+
+_tracer: JsonlTracer | OtelTracer | None = None
+
+
+def configure(mode: str | None = None, path: str | None = None) -> JsonlTracer | OtelTracer | None:
+    """
+    按 STEAM_WORKSHOP_SYNC_TRACING 开启追踪
+
+    Args:
+        mode: off（默认）、jsonl 或 otel，为空时读取环境变量
+        path: jsonl 模式的输出文件，为空时读取 STEAM_WORKSHOP_SYNC_TRACE_FILE
+
+    Returns:
+        当前的 tracer，关闭时为 None
+    """
+    global _tracer
+
+    shutdown()
+    mode = (mode or os.environ.get("STEAM_WORKSHOP_SYNC_TRACING", MODE_OFF)).strip().lower()
+    if mode == MODE_OTEL and importlib.util.find_spec("opentelemetry") is None:
+        logger.warning("未安装 opentelemetry-api，追踪改为写入本地 JSONL 文件")
+        mode = MODE_JSONL
+
+    if mode == MODE_OTEL:
+        _tracer = OtelTracer()
+    elif mode == MODE_JSONL:
+        path = path or os.environ.get("STEAM_WORKSHOP_SYNC_TRACE_FILE", "./data/traces/spans.jsonl")
+        _tracer = JsonlTracer(path)
+        logger.info(f"🔍 追踪已开启，span 写入 {_tracer.path}")
+    elif mode != MODE_OFF:
+        raise ValueError(f"未知的 STEAM_WORKSHOP_SYNC_TRACING: {mode}")
+    return _tracer
+
+
+def shutdown() -> None:
+    """关闭追踪并写出缓冲的 span"""
+    global _tracer
+
+    if _tracer is not None:
+        _tracer.shutdown()
+        _tracer = None
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, **attributes):
+    """
+    创建一个 span（上下文管理器），关闭追踪时返回共享的空 span
+
+    Args:
+        name: span 名称，例如 http.request
+        **attributes: span 属性
+    """
+    if _tracer is None:
+        return _NOOP
+    return _tracer.span(name, **attributes)
+
+
+def traced(name: str) -> Callable:
+    """把函数调用包在一个 span 中的装饰器，关闭追踪时只多一次全局变量检查"""
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with _tracer.span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class CycleProfiler:
+    """
+    按比例对爬取轮次做 cProfile 采样
+
+    被抽中的轮次只在推进该轮生成器时启用 profiler（多个 App 轮转时不会混入其他 App 的耗时），
+    结束后把 .prof 文件与按累计耗时排序的文本摘要写入输出目录。未抽中的轮次原样返回，没有任何开销。
+    """
+
+    def __init__(self, fraction: float = 0.0, directory: str = "./data/profiles", top: int = 40) -> None:
+        """
+        Args:
+            fraction: 被采样的轮次比例（0-1）
+            directory: 输出目录
+            top: 文本摘要中的函数数
+        """
+        self.fraction = fraction
+        self.directory = Path(directory)
+        self.top = top
+        # 由信号等外部触发，强制采样接下来的一轮
+        self.force_next = threading.Event()
+        self._random = random.Random()
+
+    @classmethod
+    def from_env(cls) -> "CycleProfiler":
+        return cls(
+            fraction=float(os.environ.get("STEAM_WORKSHOP_SYNC_PROFILE_FRACTION", 0)),
+            directory=os.environ.get("STEAM_WORKSHOP_SYNC_PROFILE_DIR", "./data/profiles"),
+        )
+
+    def should_profile(self) -> bool:
+        if self.force_next.is_set():
+            self.force_next.clear()
+            return True
+        return self.fraction > 0 and self._random.random() < self.fraction
+
+    def wrap(self, cycle: Iterator, label: str) -> Iterator:
+        """
+        按采样比例包装一轮爬取的生成器
+
+        Args:
+            cycle: crawl_cycle() 返回的生成器
+            label: 输出文件名中的标签（例如 App ID）
+        """
+        if not self.should_profile():
+            return cycle
+        return self._profiled(cycle, label)
+
+    def _profiled(self, cycle: Iterator, label: str) -> Iterator:
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            while True:
+                try:
+                    profile.enable()
+                except ValueError:
+                    # 已有其他 profiler 在运行
+                    logger.warning("已有其他 profiler 在运行，跳过本轮采样")
+                    yield from cycle
+                    return
+                try:
+                    next(cycle)
+                except StopIteration:
+                    return
+                finally:
+                    profile.disable()
+                yield
+        finally:
+            self.dump(profile, label, time.perf_counter() - started)
+
+    def dump(self, profile: cProfile.Profile, label: str, seconds: float) -> Path:
+        """写出 .prof 文件与文本摘要"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"cycle-{label}-{datetime.now():%Y%m%d-%H%M%S}.prof"
+        profile.dump_stats(path)
+
+        summary = io.StringIO()
+        pstats.Stats(profile, stream=summary).sort_stats("cumulative").print_stats(self.top)
+        path.with_suffix(".txt").write_text(summary.getvalue(), encoding="utf-8")
+        logger.info(f"🔬 [{label}] 本轮性能采样（{seconds:.1f}秒）已写入 {path}")
+        return path
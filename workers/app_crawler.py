@@ -0,0 +1,305 @@
+from collections.abc import Iterator
+from datetime import datetime
+import functools
+import math
+import threading
+import time
+
+from database import count_workshop_items, sync_workshop_item
+from downloader.scheduler import DownloadScheduler
+from models.workshop import Pagination, WorkshopItem
+from pydantic import BaseModel
+from spiders.proxy import ProxyPool
+from spiders.workshop import Wrokshop
+from utils import memprofile, metrics, tracing
+from utils.freshness import TIER_FAST_LANE, TIER_FULL_CRAWL, TIER_UPDATE_FEED, FreshnessTracker
+from utils.log import get_logger
+from utils.pagination import PaginationDriftTracker
+from utils.ratelimit import TokenBucket
+from utils.scheduler import AdaptiveScheduler
+from workers.fast_lane import FastLane, KnownItems
+from workers.update_feed import UpdateFeed
+
+logger = get_logger(__name__)
+
+
+class AppStats(BaseModel):
+    """单个 App 的累计爬取统计"""
+
+    cycles: int = 0
+    pages: int = 0
+    processed: int = 0
+    changes: int = 0
+    failed: int = 0
+    duplicates: int = 0
+    last_cycle_seconds: float = 0.0
+
+
+class AppCrawler:
+    """
+    单个 App 的爬取状态与流程
+
+    每个 App 拥有独立的翻页漂移追踪器、更新流水位线、调度器和统计，
+    共享已知项目集合与请求限流器。crawl_cycle() 以生成器形式逐页推进，
+    便于主循环在多个 App 之间公平地轮转。
+    """
+
+    def __init__(
+        self,
+        appid: str,
+        known: KnownItems,
+        rate_limiter: TokenBucket | None = None,
+        proxy_pool: ProxyPool | None = None,
+        page_delay: float = 5.0,
+        cycle_delay: float = 60.0,
+        update_feed_pages: int = 3,
+        scheduler: AdaptiveScheduler | None = None,
+        download_scheduler: DownloadScheduler | None = None,
+    ) -> None:
+        """
+        Args:
+            appid: Steam Workshop APP ID
+            known: 已知项目 ID 集合
+            rate_limiter: 共享的请求限流器（可选）
+            proxy_pool: 共享的出口代理池（可选）
+            page_delay: 回读与更新流中的页面间延迟（秒）
+            cycle_delay: 固定循环间隔（秒），未启用自适应调度时使用
+            update_feed_pages: 更新流单次最多读取页数，0 表示关闭
+            scheduler: 自适应调度器，None 表示使用固定循环间隔
+            download_scheduler: 自动下载队列，None 表示只同步不下载
+        """
+        self.appid = appid
+        self.known = known
+        self.rate_limiter = rate_limiter
+        self.proxy_pool = proxy_pool
+        self.page_delay = page_delay
+        self.cycle_delay = cycle_delay
+        self.scheduler = scheduler
+        self.download_scheduler = download_scheduler
+
+        self.workshop = Wrokshop(appid, rate_limiter=rate_limiter, proxy_pool=proxy_pool)
+        self.tracker = PaginationDriftTracker()
+        self.update_feed = UpdateFeed(
+            self.workshop,
+            functools.partial(self.save_item, tier=TIER_UPDATE_FEED),
+            max_pages=update_feed_pages,
+            page_delay=page_delay,
+        )
+        self.freshness = FreshnessTracker.from_env(appid)
+        self.stats = AppStats()
+        # 快速通道在独立线程中调用 save_item/process_items，统计的读写需要加锁
+        self._stats_lock = threading.Lock()
+        # 热路径上使用的指标子项
+        self._processed = metrics.ITEMS.labels(appid, "processed")
+        self._failed = metrics.ITEMS.labels(appid, "failed")
+        self._skipped = metrics.ITEMS.labels(appid, "skipped")
+        self.fast_lane: FastLane | None = None
+        # 下一轮开始的时间（time.monotonic()）
+        self.next_cycle_at = 0.0
+
+    def _count(self, **counts: int) -> None:
+        """累加统计计数"""
+        with self._stats_lock:
+            for name, value in counts.items():
+                setattr(self.stats, name, getattr(self.stats, name) + value)
+
+    def stats_snapshot(self) -> AppStats:
+        """统计的一致副本，用于日志与报告"""
+        with self._stats_lock:
+            return self.stats.model_copy()
+
+    def start_fast_lane(self, interval: float) -> None:
+        """启动首页快速通道（使用独立的爬虫实例）"""
+        workshop = Wrokshop(self.appid, rate_limiter=self.rate_limiter, proxy_pool=self.proxy_pool)
+        process_items = functools.partial(self.process_items, tier=TIER_FAST_LANE)
+        self.fast_lane = FastLane(workshop, self.known, process_items, interval)
+        self.fast_lane.start()
+
+    def save_item(self, item_info: WorkshopItem, tier: str = TIER_FULL_CRAWL) -> WorkshopItem:
+        """
+        保存项目详情，标记为已知并记录变更
+
+        Args:
+            item_info: 项目详情
+            tier: 发现该项目的通道，用于按通道统计新鲜度
+        """
+        started = time.perf_counter()
+        with (
+            tracing.span("db.save_workshop_item", app_id=self.appid, item_id=item_info.id),
+            memprofile.stage("db_upsert"),
+        ):
+            saved, changed, created = sync_workshop_item(item_info)
+        metrics.DB_UPSERT_SECONDS.observe(time.perf_counter() - started)
+        self.known.add(item_info.id)
+        if changed:
+            self._count(changes=1)
+            self.freshness.observe(item_info, tier, first_sync=created)
+            if self.scheduler is not None:
+                self.scheduler.record_changes()
+            if self.download_scheduler is not None:
+                self.download_scheduler.enqueue(item_info)
+        return saved
+
+    def process_items(self, workshop: Wrokshop, items: list[WorkshopItem], tier: str = TIER_FULL_CRAWL) -> int:
+        """
+        获取项目详情并入库
+
+        Args:
+            workshop: Workshop 爬虫实例（快速通道使用自己的实例）
+            items: 待处理的项目列表
+            tier: 发现这些项目的通道
+
+        Returns:
+            int: 处理成功的项目数
+        """
+        processed_count = 0
+        for idx, item in enumerate(items, 1):
+            logger.info("  [%d/%d] 处理项目: %s", idx, len(items), item.title)
+
+            try:
+                with memprofile.stage("details"):
+                    item_info = workshop.get_items_info(item)
+                self.save_item(item_info, tier)
+                processed_count += 1
+                self._processed.inc()
+            except Exception as e:
+                self._count(failed=1)
+                self._failed.inc()
+                logger.error(f"  处理项目 {item.id} 失败: {e}")
+                continue
+
+        self._count(processed=processed_count)
+        return processed_count
+
+    def recover_gap(self, page: int, gap: int, page_size: int) -> int:
+        """
+        回读因列表上移而被跳过的项目
+
+        被跳过的项目会出现在当前页之前的页面末尾，从上一页开始向前回读，只处理本轮未见过的项目。
+
+        Args:
+            page: 当前页码
+            gap: 可能被跳过的项目数
+            page_size: 每页项目数
+
+        Returns:
+            int: 回读后处理成功的项目数
+        """
+        pages_back = min(page - 1, math.ceil(gap / page_size)) if page_size else 1
+        logger.warning(f"⚠️  [{self.appid}] 检测到列表上移 {gap} 项，回读第 {page - pages_back}-{page - 1} 页")
+
+        processed_count = 0
+        for back_page in range(page - 1, page - 1 - pages_back, -1):
+            time.sleep(self.page_delay)
+            result = self.workshop.get_new_items(back_page)
+            items, _ = self.tracker.filter_unseen(result["items"])
+            logger.info(f"  回读第 {back_page} 页，发现 {len(items)} 个遗漏项目")
+            processed_count += self.process_items(self.workshop, items)
+
+        return processed_count
+
+    def process_page(self, page: int) -> tuple[int, int]:
+        """
+        处理单个页面的数据
+
+        Args:
+            page: 页码
+
+        Returns:
+            tuple: (总页数, 处理的项目数)
+        """
+        with tracing.span("crawl.page", app_id=self.appid, page=page) as span:
+            total_pages, processed_count = self._process_page(page)
+            span.set_attribute("items.processed", processed_count)
+        return total_pages, processed_count
+
+    def _process_page(self, page: int) -> tuple[int, int]:
+        try:
+            with memprofile.stage("listing"):
+                result = self.workshop.get_new_items(page)
+            pagination: Pagination = result["pagination"]
+            items: list[WorkshopItem] = result["items"]
+            self._count(pages=1)
+            if page == 1:
+                self.freshness.total_entries = pagination.total_entries
+
+            logger.info(
+                f"📄 [{self.appid}] 第 {pagination.current_page}/{pagination.total_pages} 页 - "
+                f"找到 {pagination.items_count} 个项目"
+            )
+
+            items, duplicates = self.tracker.filter_unseen(items)
+            gap = self.tracker.detect_gap(pagination.total_entries, duplicates)
+            if duplicates:
+                self._skipped.inc(duplicates)
+                logger.info(f"  跳过 {duplicates} 个本轮已处理的重复项目")
+
+            processed_count = self.process_items(self.workshop, items)
+
+            if gap and page > 1:
+                processed_count += self.recover_gap(page, gap, pagination.items_count)
+
+            logger.info(f"✅ [{self.appid}] 第 {page} 页处理完成，成功: {processed_count}/{pagination.items_count}")
+            return pagination.total_pages, processed_count
+
+        except Exception as e:
+            logger.error(f"❌ [{self.appid}] 处理第 {page} 页失败: {e}")
+            raise
+
+    def crawl_cycle(self) -> Iterator[None]:
+        """
+        执行一轮完整爬取，每处理完一个列表页就让出一次控制权
+
+        结束时根据调度器计算 next_cycle_at。
+        """
+        self._count(cycles=1)
+        cycle_start_time = datetime.now()
+        self.tracker.reset()
+        self.freshness.start_cycle()
+
+        started = cycle_start_time.strftime("%Y-%m-%d %H:%M:%S")
+        logger.info(f"🔄 [{self.appid}] 开始第 {self.stats.cycles} 轮监控 - {started}")
+
+        # 先读取更新流，捕获旧项目的更新
+        if self.update_feed.max_pages > 0:
+            self.update_feed.poll()
+            yield
+
+        # 首先获取第一页以确定总页数，再处理剩余页面
+        total_pages, _ = self.process_page(1)
+        for page in range(2, total_pages + 1):
+            yield
+            self.process_page(page)
+
+        last_cycle_seconds = (datetime.now() - cycle_start_time).total_seconds()
+        self._count(duplicates=self.tracker.duplicates)
+        with self._stats_lock:
+            self.stats.last_cycle_seconds = last_cycle_seconds
+        metrics.CYCLE_SECONDS.labels(self.appid).set(last_cycle_seconds)
+        logger.info(f"✅ [{self.appid}] 本轮监控完成（共 {total_pages} 页）")
+        logger.info(f"⏱️  [{self.appid}] 本轮耗时: {last_cycle_seconds:.2f}秒")
+        if self.tracker.duplicates:
+            logger.info(f"♻️  [{self.appid}] 本轮跳过重复项目: {self.tracker.duplicates} 个")
+        self.freshness.known_items = count_workshop_items(self.appid)
+        logger.info(f"🕒 [{self.appid}] 新鲜度: {self.freshness.summary()}")
+
+        self.schedule_next_cycle()
+
+    def schedule_next_cycle(self, delay: float | None = None) -> float:
+        """
+        安排下一轮开始的时间
+
+        Args:
+            delay: 指定的等待时间（秒），默认由调度器决定
+
+        Returns:
+            float: 下一轮前的等待时间（秒）
+        """
+        if delay is None:
+            delay = self.scheduler.end_cycle() if self.scheduler is not None else self.cycle_delay
+            if self.scheduler is not None and self.scheduler.rate is not None:
+                logger.info(f"📈 [{self.appid}] 估计变更速率: {self.scheduler.rate * 3600:.2f} 个/小时")
+
+        self.next_cycle_at = time.monotonic() + delay
+        logger.info(f"💤 [{self.appid}] 等待 {delay:.0f}秒后开始下一轮")
+        return delay
@@ -0,0 +1,129 @@
+from collections.abc import Callable, Iterable
+import queue
+import threading
+
+from models.workshop import WorkshopItem
+from spiders.workshop import Wrokshop
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class KnownItems:
+    """线程安全的已知项目 ID 集合，由完整爬取与快速通道共享"""
+
+    def __init__(self, item_ids: Iterable[str] = ()) -> None:
+        self._ids = set(item_ids)
+        self._lock = threading.Lock()
+
+    def __contains__(self, item_id: str) -> bool:
+        with self._lock:
+            return item_id in self._ids
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._ids)
+
+    def add(self, item_id: str) -> None:
+        with self._lock:
+            self._ids.add(item_id)
+
+    def update(self, item_ids: Iterable[str]) -> None:
+        with self._lock:
+            self._ids.update(item_ids)
+
+    def discard(self, item_id: str) -> None:
+        with self._lock:
+            self._ids.discard(item_id)
+
+    def claim(self, item_id: str) -> bool:
+        """
+        原子地将项目标记为已知
+
+        Returns:
+            bool: 项目此前未知时返回 True
+        """
+        with self._lock:
+            if item_id in self._ids:
+                return False
+            self._ids.add(item_id)
+            return True
+
+
+class FastLane:
+    """
+    首页快速通道
+
+    以较短的间隔轮询第 1 页，只把未知的新项目推送给详情获取线程，
+    使新上传项目的发现延迟不再受完整一轮爬取耗时的限制。完整爬取照常独立运行。
+    """
+
+    def __init__(
+        self,
+        workshop: Wrokshop,
+        known: KnownItems,
+        process_items: Callable[[Wrokshop, list[WorkshopItem]], int],
+        interval: float,
+    ) -> None:
+        """
+        Args:
+            workshop: 快速通道专用的 Workshop 爬虫实例（不与完整爬取共享会话）
+            known: 已知项目 ID 集合
+            process_items: 获取详情并入库的函数，返回处理成功的数量
+            interval: 首页轮询间隔（秒）
+        """
+        self.workshop = workshop
+        self.known = known
+        self.process_items = process_items
+        self.interval = interval
+        self.queue: queue.Queue[WorkshopItem] = queue.Queue()
+
+        self._stop_event = threading.Event()
+        self._poller = threading.Thread(target=self._poll_loop, name="fast-lane-poller", daemon=True)
+        self._fetcher = threading.Thread(target=self._fetch_loop, name="fast-lane-fetcher", daemon=True)
+
+    def start(self) -> None:
+        logger.info(f"⚡ 快速通道已启动，首页轮询间隔: {self.interval}秒")
+        self._poller.start()
+        self._fetcher.start()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def poll_once(self) -> int:
+        """
+        拉取一次首页并将新项目放入详情队列
+
+        Returns:
+            int: 新发现的项目数
+        """
+        result = self.workshop.get_new_items(1)
+        new_items = [item for item in result["items"] if self.known.claim(item.id)]
+
+        for item in new_items:
+            self.queue.put(item)
+
+        if new_items:
+            logger.info(f"⚡ 快速通道发现 {len(new_items)} 个新项目")
+        return len(new_items)
+
+    def _poll_loop(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.error(f"⚡ 快速通道轮询失败: {e}")
+
+    def _fetch_loop(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                item = self.queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+
+            try:
+                if not self.process_items(self.workshop, [item]):
+                    # 处理失败时允许下一次轮询重新发现该项目
+                    self.known.discard(item.id)
+            finally:
+                self.queue.task_done()
@@ -0,0 +1,141 @@
+from collections.abc import Callable
+from datetime import datetime
+import time
+
+from models.workshop import WorkshopItem
+from spiders.workshop import Wrokshop
+from utils.log import get_logger
+
+logger = get_logger(__name__)
+
+
+class UpdateFeed:
+    """
+    lastupdated 更新流
+
+    mostrecent 按创建时间排序，旧项目的更新只有在完整遍历到它时才会被发现。
+    更新流按最后更新时间读取列表，并维护自己的 updated_at 水位线：
+    一旦遇到早于水位线的项目即停止，通常只需读取前几页即可捕获全部变更。
+    变更多于 max_pages 页时水位线保持不变，下次轮询从未读到的页继续，直到越过水位线后再前移。
+    处理失败的项目会在之后的轮询中重试，不会因水位线前移而被跳过。
+    """
+
+    def __init__(
+        self,
+        workshop: Wrokshop,
+        save_item: Callable[[WorkshopItem], object],
+        max_pages: int = 3,
+        page_delay: float = 0.0,
+        max_attempts: int = 5,
+    ) -> None:
+        """
+        Args:
+            workshop: Workshop 爬虫实例
+            save_item: 保存项目详情的函数
+            max_pages: 单次轮询最多读取的页数
+            page_delay: 页面间延迟（秒）
+            max_attempts: 单个项目最多尝试的次数，超过后放弃重试
+        """
+        self.workshop = workshop
+        self.save_item = save_item
+        self.max_pages = max_pages
+        self.page_delay = page_delay
+        self.max_attempts = max_attempts
+        # 已同步到的最后更新时间；None 表示尚未建立水位线，首次轮询读取 max_pages 页
+        self.watermark: datetime | None = None
+        # 变更多于 max_pages 页时，下次轮询开始的页码与已读到的最新更新时间
+        self.resume_page = 1
+        self.pending_watermark: datetime | None = None
+        # 处理失败、等待重试的项目 {item_id: (列表中的项目, 已失败次数)}
+        self.failed: dict[str, tuple[WorkshopItem, int]] = {}
+
+    def _before_watermark(self, changed_at: datetime | None) -> bool:
+        # Steam 的时间只精确到分钟，与水位线相等的项目仍需处理
+        return bool(self.watermark and changed_at and changed_at < self.watermark)
+
+    def _record_failure(self, item: WorkshopItem, attempts: int, message: str) -> None:
+        attempts += 1
+        if attempts >= self.max_attempts:
+            logger.error(f"  {message}（已失败 {attempts} 次，放弃重试）")
+            return
+        logger.error(f"  {message}（将在下次轮询时重试）")
+        self.failed[item.id] = (item, attempts)
+
+    def poll(self) -> int:
+        """
+        读取更新流直到越过水位线
+
+        Returns:
+            int: 处理成功的项目数
+        """
+        newest = self.pending_watermark or self.watermark
+        processed_count = 0
+        retry = self.failed
+        self.failed = {}
+        first_page = page = self.resume_page
+        completed = False
+
+        for page in range(first_page, first_page + self.max_pages):
+            if page > first_page:
+                time.sleep(self.page_delay)
+
+            result = self.workshop.get_updated_items(page)
+            reached_watermark = False
+
+            for item in result["items"]:
+                # 列表中带有时间时，先用它判断是否越过水位线，省去一次详情请求
+                if self._before_watermark(item.updated_at or item.created_at):
+                    reached_watermark = True
+                    break
+
+                _, attempts = retry.get(item.id, (item, 0))
+                try:
+                    item_info = self.workshop.get_items_info(item)
+                except Exception as e:
+                    retry.pop(item.id, None)
+                    self._record_failure(item, attempts, f"处理更新项目 {item.id} 失败: {e}")
+                    continue
+
+                changed_at = item_info.updated_at or item_info.created_at
+                if self._before_watermark(changed_at):
+                    # 等待重试的项目留在 retry 中，在下面单独处理
+                    reached_watermark = True
+                    break
+
+                retry.pop(item.id, None)
+                try:
+                    self.save_item(item_info)
+                    processed_count += 1
+                except Exception as e:
+                    self._record_failure(item, attempts, f"保存更新项目 {item.id} 失败: {e}")
+                    continue
+
+                if changed_at and (newest is None or changed_at > newest):
+                    newest = changed_at
+
+            if reached_watermark or page >= result["pagination"].total_pages:
+                completed = True
+                break
+
+        # 之前失败、本次未在列表中处理到的项目，水位线已越过它们，单独重试
+        for item, attempts in retry.values():
+            try:
+                self.save_item(self.workshop.get_items_info(item))
+                processed_count += 1
+            except Exception as e:
+                self._record_failure(item, attempts, f"重试更新项目 {item.id} 失败: {e}")
+
+        if completed or self.watermark is None:
+            # 首次轮询没有可越过的水位线，之前的项目由完整爬取覆盖
+            self.watermark = newest
+            self.pending_watermark = None
+            self.resume_page = 1
+        else:
+            self.pending_watermark = newest
+            self.resume_page = page + 1
+            logger.warning(f"⚠️  更新流 {self.max_pages} 页内未越过水位线，下次轮询从第 {self.resume_page} 页继续")
+
+        logger.info(
+            f"🔁 更新流处理完成，成功: {processed_count}，待重试: {len(self.failed)}，水位线: {self.watermark}"
+        )
+        return processed_count